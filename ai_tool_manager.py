@@ -1,17 +1,32 @@
+import time
+# 程序启动时间（用于统计首次绘制和可交互的耗时）
+STARTUP_TIME = time.perf_counter()
+
 import sys
 import json
 import os
-import webbrowser
-import requests
+import hashlib
+import threading
+import uuid
+import sqlite3
+import struct
+import mmap
+from itertools import islice
+from collections import OrderedDict, deque
+from functools import wraps
+from contextlib import contextmanager
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QGridLayout, QPushButton, QLabel, QLineEdit, QTextEdit,
-    QFileDialog, QMessageBox, QScrollArea, QFrame, QDialog,
-    QMenu, QProgressBar, QDialogButtonBox
+    QPushButton, QLabel, QLineEdit, QTextEdit,
+    QFileDialog, QMessageBox, QFrame, QDialog,
+    QMenu, QProgressBar, QDialogButtonBox,
+    QListView, QAbstractItemView, QStyledItemDelegate, QStyle
+)
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QPainter, QBrush, QColor, QPen
+from PyQt5.QtCore import (
+    Qt, QThread, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal,
+    QAbstractListModel, QModelIndex, QSize, QRect, QRectF
 )
-from PyQt5.QtGui import QPixmap, QIcon, QPainter, QBrush
-from PyQt5.QtSvg import QSvgWidget
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 ##
 # 功能：BingZ工具包主窗口
@@ -50,30 +65,979 @@ def resource_path(relative_path):
     # 开发环境
     return os.path.join(os.path.abspath('.'), relative_path)
 
+# 打开网址
+def open_url(url):
+    """用默认浏览器打开网址（webbrowser在第一次使用时才导入，加快启动）"""
+    import webbrowser
+    webbrowser.open(url)
+
+# 处理工具图标路径
+def resolve_icon_path(icon_path):
+    """将工具中保存的图标路径转换为实际文件路径"""
+    if icon_path.startswith("./"):
+        return resource_path(icon_path[2:])
+    return icon_path
+
+class NullSpan:
+    """跟踪关闭时使用的空区间"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class TraceSpan:
+    """一段计时区间，结束时记录到跟踪器"""
+    __slots__ = ("tracer", "name", "args", "start")
+    
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+class Tracer:
+    """热点路径耗时跟踪，默认关闭；记录的区间可导出为Chrome trace格式（chrome://tracing或Perfetto中打开）"""
+    def __init__(self, max_events=200000, recent_size=60):
+        self.enabled = False
+        # 导出路径
+        self.output = None
+        # 是否在窗口中显示最近的耗时
+        self.overlay = False
+        self.events = deque(maxlen=max_events)
+        # 区间名称 -> 最近的耗时（毫秒），用于界面中的耗时显示
+        self.recent = {}
+        self.recent_size = recent_size
+        self.thread_names = {}
+    
+    def enable(self, output=None, overlay=False):
+        self.enabled = True
+        self.output = output
+        self.overlay = overlay
+    
+    def span(self, name, **args):
+        """计时区间：with tracer.span("名称"): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return TraceSpan(self, name, args)
+    
+    def record(self, name, start, end, args=None):
+        """记录一段区间（可在任意线程中调用）"""
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        self.events.append((name, start, end, thread.ident, args))
+        recent = self.recent.get(name)
+        if recent is None:
+            recent = self.recent.setdefault(name, deque(maxlen=self.recent_size))
+        recent.append((end - start) * 1000)
+    
+    def to_chrome_trace(self):
+        """转换为Chrome trace-event格式（时间单位为微秒，从程序启动开始）"""
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        for name, start, end, tid, args in list(self.events):
+            event = {
+                "name": name, "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((start - STARTUP_TIME) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    
+    def export(self, file_path=None):
+        """导出为Chrome trace JSON文件"""
+        write_json_atomic(file_path or self.output, self.to_chrome_trace())
+
+# 全局跟踪器（环境变量BINGZ_TRACE或命令行参数--trace开启）
+tracer = Tracer()
+
+# 根据环境变量和命令行参数开启跟踪
+def configure_tracing(argv):
+    """BINGZ_TRACE=1或--trace开启跟踪，退出时导出到用户数据目录的trace.json，
+    BINGZ_TRACE=文件或--trace=文件指定导出路径；BINGZ_TRACE_OVERLAY=1或--trace-overlay同时在窗口中显示最近的耗时
+    
+    返回去掉跟踪参数后的命令行参数
+    """
+    output = os.getenv("BINGZ_TRACE") or None
+    overlay = os.getenv("BINGZ_TRACE_OVERLAY", "") not in ("", "0")
+    remaining = []
+    for arg in argv:
+        if arg == "--trace":
+            output = output or "1"
+        elif arg.startswith("--trace="):
+            output = arg.split("=", 1)[1]
+        elif arg == "--trace-overlay":
+            overlay = True
+        else:
+            remaining.append(arg)
+    if output or overlay:
+        if output in (None, "1"):
+            output = os.path.join(get_user_data_dir(), "trace.json")
+        tracer.enable(output, overlay)
+    return remaining
+
+# 跟踪函数耗时的装饰器
+def traced(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class IconCache:
+    """进程内共享的图标缓存，按内存预算进行LRU淘汰"""
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+    
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        """估算图标占用的内存大小"""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+    
+    def get(self, key):
+        """读取缓存，命中时移到最近使用的位置"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def put(self, key, pixmap):
+        """写入缓存，超出内存预算时淘汰最久未使用的图标"""
+        cost = self.pixmap_bytes(pixmap)
+        if cost > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        self._entries[key] = (pixmap, cost)
+        self.current_bytes += cost
+        self.trim()
+    
+    def trim(self):
+        """淘汰图标直到满足内存预算"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, cost) = self._entries.popitem(last=False)
+            self.current_bytes -= cost
+            self.evictions += 1
+    
+    def set_max_bytes(self, max_bytes):
+        """调整内存预算"""
+        self.max_bytes = max_bytes
+        self.trim()
+    
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self.current_bytes = 0
+    
+    def stats(self):
+        """获取缓存统计信息"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+# 全局图标缓存（内存预算可通过环境变量BINGZ_ICON_CACHE_MB配置）
+icon_cache = IconCache(int(os.getenv("BINGZ_ICON_CACHE_MB", "32")) * 1024 * 1024)
+
+class ThumbnailCache:
+    """磁盘缩略图缓存，按图标内容哈希保存预渲染的小图"""
+    # 预渲染的缩略图规格：(尺寸, 是否圆角)，分别用于网格工具项和详情页
+    VARIANTS = ((50, True), (80, False))
+    # 索引修改后延迟保存的秒数，冷启动时大量新图标的哈希合并为一次写入
+    SAVE_DELAY = 1.0
+    
+    def __init__(self, thumbs_dir):
+        self.thumbs_dir = thumbs_dir
+        self.index_file = os.path.join(thumbs_dir, "index.json")
+        self._index = None
+        # 缩略图可能在后台线程中生成，索引读写需要加锁
+        self._lock = threading.Lock()
+        # 索引文件在锁外写入，写入之间用单独的锁串行
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        # 索引的修改次数和已保存到文件的修改次数
+        self._version = 0
+        self._saved_version = 0
+    
+    def load_index(self):
+        """读取图标路径到内容哈希的索引"""
+        if self._index is None:
+            self._index = {}
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                pass
+        return self._index
+    
+    def save_index(self, index):
+        """保存索引（先写临时文件再替换）"""
+        try:
+            if not os.path.exists(self.thumbs_dir):
+                os.makedirs(self.thumbs_dir)
+            temp_file = self.index_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+        except OSError:
+            pass
+    
+    def schedule_save(self):
+        """索引修改后延迟保存（调用时需持有_lock）"""
+        self._version += 1
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def flush(self):
+        """立即保存尚未写入的索引，只在复制索引时持有_lock，不阻塞解码线程"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._index is None or self._version == self._saved_version:
+                return
+            index = dict(self._index)
+            version = self._version
+        with self._save_lock:
+            # 已有更新的索引写入
+            if version <= self._saved_version:
+                return
+            self.save_index(index)
+            self._saved_version = version
+    
+    def content_hash(self, icon_path):
+        """获取图标文件的内容哈希，文件未变化时直接使用索引中的结果"""
+        try:
+            stat = os.stat(icon_path)
+        except OSError:
+            return None
+        real_path = os.path.realpath(icon_path)
+        with self._lock:
+            entry = self.load_index().get(real_path)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["hash"]
+        
+        # 源文件新增或已变化，重新计算哈希
+        digest = hashlib.sha1()
+        try:
+            with open(icon_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        content_hash = digest.hexdigest()
+        
+        with self._lock:
+            index = self.load_index()
+            entry = index.pop(real_path, None)
+            # 旧内容的缩略图不再被引用时删除
+            if entry and entry["hash"] != content_hash:
+                old_hash = entry["hash"]
+                if not any(e["hash"] == old_hash for e in index.values()):
+                    self.remove_thumbnails(old_hash)
+            
+            index[real_path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash}
+            self.schedule_save()
+        return content_hash
+    
+    def thumbnail_path(self, content_hash, size, rounded, dpr):
+        """获取缩略图文件路径"""
+        suffix = "r" if rounded else "s"
+        return os.path.join(self.thumbs_dir, f"{content_hash}_{size}{suffix}@{dpr:g}x.png")
+    
+    def remove_thumbnails(self, content_hash):
+        """删除指定内容哈希的全部缩略图"""
+        try:
+            for name in os.listdir(self.thumbs_dir):
+                if name.startswith(content_hash + "_"):
+                    os.remove(os.path.join(self.thumbs_dir, name))
+        except OSError:
+            pass
+    
+    def save_thumbnail(self, image, thumb_path):
+        """保存缩略图（先写临时文件再替换，避免并发写入产生残缺文件）"""
+        temp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        try:
+            if image.save(temp_path, "PNG"):
+                os.replace(temp_path, thumb_path)
+        except OSError:
+            pass
+    
+    def load(self, icon_path, size, rounded, dpr):
+        """读取缩略图，缓存未命中时解码源图并生成所有规格的缩略图"""
+        content_hash = self.content_hash(icon_path)
+        if content_hash is None:
+            return None
+        thumb_path = self.thumbnail_path(content_hash, size, rounded, dpr)
+        if os.path.exists(thumb_path):
+            image = QImage(thumb_path)
+            if not image.isNull():
+                image.setDevicePixelRatio(dpr)
+                return image
+        
+        # 源图只解码一次，同时生成网格和详情页使用的缩略图
+        is_svg = os.path.splitext(icon_path)[1].lower() == ".svg"
+        source = None if is_svg else load_source_image(icon_path)
+        if source is None and not is_svg:
+            return None
+        variants = set(self.VARIANTS)
+        variants.add((size, rounded))
+        result = None
+        try:
+            if not os.path.exists(self.thumbs_dir):
+                os.makedirs(self.thumbs_dir)
+        except OSError:
+            pass
+        for variant_size, variant_rounded in variants:
+            if is_svg:
+                # SVG按每个规格的实际像素尺寸栅格化，与原来一样不加圆角
+                svg_image = rasterize_svg(icon_path, int(round(variant_size * dpr)))
+                if svg_image is None:
+                    return None
+                image = render_tool_image(svg_image, variant_size, False, dpr)
+            else:
+                image = render_tool_image(source, variant_size, variant_rounded, dpr)
+            self.save_thumbnail(image, self.thumbnail_path(content_hash, variant_size, variant_rounded, dpr))
+            if (variant_size, variant_rounded) == (size, rounded):
+                result = image
+        return result
+
+# 全局磁盘缩略图缓存
+thumbnail_cache = ThumbnailCache(os.path.join(get_user_data_dir(), "thumbs"))
+
+# 图标路径到实际路径的映射，避免每次绘制都解析符号链接
+real_icon_paths = {}
+
+# 图标缓存键
+def icon_cache_key(icon_path, size, rounded=False, dpr=1.0):
+    """生成图标缓存键(实际路径, 修改时间, 尺寸, 是否圆角, 像素比)，图标不存在时返回None"""
+    icon_path = resolve_icon_path(icon_path or "")
+    if not icon_path:
+        return None
+    try:
+        mtime = os.stat(icon_path).st_mtime_ns
+    except OSError:
+        return None
+    real_path = real_icon_paths.get(icon_path)
+    if real_path is None:
+        real_path = real_icon_paths[icon_path] = os.path.realpath(icon_path)
+    return (real_path, mtime, size, rounded, dpr)
+
+# 加载工具图标
+def load_tool_pixmap(icon_path, size, rounded=False, dpr=1.0):
+    """依次从内存缓存、磁盘缩略图加载工具图标，图标不存在或无法解析时返回None"""
+    key = icon_cache_key(icon_path, size, rounded, dpr)
+    if key is None:
+        return None
+    
+    pixmap = icon_cache.get(key)
+    if pixmap is None:
+        image = thumbnail_cache.load(key[0], size, rounded, dpr)
+        if image is None:
+            return None
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(dpr)
+        icon_cache.put(key, pixmap)
+    return pixmap
+
+# 共享的SVG解析结果，键为(实际路径, 修改时间)
+svg_renderers = {}
+# QSvgRenderer不能被多个线程同时使用，栅格化时加锁
+svg_lock = threading.Lock()
+
+# 获取共享的SVG渲染器
+def shared_svg_renderer(icon_path):
+    """每个SVG文件只解析一次，文件变化后重新解析，无法解析时返回None"""
+    try:
+        mtime = os.stat(icon_path).st_mtime_ns
+    except OSError:
+        return None
+    key = (os.path.realpath(icon_path), mtime)
+    renderer = svg_renderers.get(key)
+    if renderer is None:
+        # QtSvg只在遇到SVG图标时导入
+        from PyQt5.QtSvg import QSvgRenderer
+        renderer = QSvgRenderer(icon_path)
+        if not renderer.isValid():
+            return None
+        # 渲染器可能在线程池中创建，移到主线程避免随工作线程退出
+        app = QApplication.instance()
+        if app is not None:
+            renderer.moveToThread(app.thread())
+        svg_renderers[key] = renderer
+    return renderer
+
+# SVG栅格化
+def rasterize_svg(icon_path, pixel_size):
+    """使用共享渲染器将SVG渲染为指定像素尺寸的QImage，无法解析时返回None"""
+    with svg_lock:
+        renderer = shared_svg_renderer(icon_path)
+        if renderer is None:
+            return None
+        image = QImage(pixel_size, pixel_size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        renderer.render(painter)
+        painter.end()
+    return image
+
+# 解码源图标
+def load_source_image(icon_path):
+    """解码图片文件为QImage，无法解析时返回None"""
+    image = QImage(icon_path)
+    if image.isNull():
+        return None
+    return image
+
+# 渲染工具图标
+def render_tool_image(source, size, rounded, dpr=1.0):
+    """将源图缩放到目标尺寸，网格图标额外添加圆角遮罩"""
+    pixel_size = int(round(size * dpr))
+    scaled_image = source.scaled(pixel_size, pixel_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    if not rounded:
+        scaled_image.setDevicePixelRatio(dpr)
+        return scaled_image
+    
+    # 创建圆角矩形遮罩
+    rounded_image = QImage(scaled_image.size(), QImage.Format_ARGB32_Premultiplied)
+    rounded_image.fill(Qt.transparent)
+    painter = QPainter(rounded_image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setBrush(QBrush(scaled_image))
+    painter.setPen(Qt.NoPen)
+    radius = 10 * dpr
+    painter.drawRoundedRect(0, 0, scaled_image.width(), scaled_image.height(), radius, radius)
+    painter.end()
+    rounded_image.setDevicePixelRatio(dpr)
+    return rounded_image
+
+class IconLoadTask(QRunnable):
+    """后台图标解码任务"""
+    def __init__(self, loader, key):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.loader = loader
+        self.key = key
+    
+    def run(self):
+        icon_path, _, size, rounded, dpr = self.key
+        try:
+            with tracer.span("decode icon", path=icon_path, size=size):
+                image = thumbnail_cache.load(icon_path, size, rounded, dpr)
+        except Exception:
+            image = None
+        try:
+            self.loader.task_finished.emit(self.key, image if image is not None else QImage())
+        except RuntimeError:
+            # 视图已关闭，解码结果不再需要
+            pass
+
+class IconLoader(QObject):
+    """在线程池中解码图标，完成后放入图标缓存"""
+    icon_loaded = pyqtSignal()
+    task_finished = pyqtSignal(object, QImage)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        # 未完成的任务（同时保持Python引用，避免任务对象在线程中运行时被回收）
+        self.tasks = {}
+        # 未完成的任务 -> 请求该图标的工具项标识
+        self.owners = {}
+        # 无法解码的图标不再重复请求
+        self.failed = set()
+        self.task_finished.connect(self.on_task_finished)
+    
+    def request(self, key, owner=None):
+        """请求解码图标，相同图标的请求只提交一次；owner为请求图标的工具项标识"""
+        if key in self.failed:
+            return
+        if owner is not None:
+            self.owners.setdefault(key, set()).add(owner)
+        if key in self.tasks:
+            return
+        task = IconLoadTask(self, key)
+        self.tasks[key] = task
+        self.pool.start(task)
+    
+    def cancel_pending(self, keep=None):
+        """取消尚未开始的解码任务（例如网格重新过滤时）
+        
+        keep为刷新后仍然显示的工具项标识，这些工具项请求的图标不取消（对比刷新时未变化的工具项不会重绘，不会再次请求）
+        """
+        for key, task in list(self.tasks.items()):
+            if keep is not None and not self.owners.get(key, set()).isdisjoint(keep):
+                continue
+            if self.pool.tryTake(task):
+                del self.tasks[key]
+                self.owners.pop(key, None)
+    
+    def on_task_finished(self, key, image):
+        """解码完成（在GUI线程中执行）"""
+        self.tasks.pop(key, None)
+        self.owners.pop(key, None)
+        if image.isNull():
+            self.failed.add(key)
+            return
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(key[4])
+        icon_cache.put(key, pixmap)
+        self.icon_loaded.emit()
+
+class NetworkService:
+    """共享的网络访问层：所有HTTP请求都通过它发出。
+    
+    持有一个带连接池的requests.Session，按主机限制并发请求数，统一超时和重试，
+    并记录每个请求的延迟和字节数（开启跟踪时同时记录为http区间）；
+    submit在共享线程池中运行并发的网络任务。
+    """
+    # 默认超时（连接, 读取），单位秒
+    TIMEOUT = (10, 30)
+    # 连接失败、超时或RETRY_STATUSES时的重试次数，第一次重试前等待RETRY_DELAY秒，之后每次加倍
+    RETRIES = 2
+    RETRY_DELAY = 0.5
+    RETRY_STATUSES = (500, 502, 503, 504)
+    # 每个主机的最大并发请求数，可通过环境变量BINGZ_NET_HOST_LIMIT配置
+    MAX_PER_HOST = int(os.getenv("BINGZ_NET_HOST_LIMIT", "6"))
+    
+    def __init__(self, max_workers=16, history=500):
+        self.session = None
+        self.executor = None
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        # 主机 -> 并发请求数的信号量
+        self.host_slots = {}
+        # 最近请求的记录
+        self.metrics = deque(maxlen=history)
+    
+    def get_session(self):
+        """第一次使用时创建会话（requests在这时才导入，加快启动）"""
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.MAX_PER_HOST)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+    
+    def host_slot(self, host):
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(self.MAX_PER_HOST)
+            return slot
+    
+    def submit(self, function, *args, **kwargs):
+        """在共享的网络线程池中运行function，返回Future"""
+        with self.lock:
+            if self.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="network")
+        return self.executor.submit(function, *args, **kwargs)
+    
+    def get(self, url, headers=None, timeout=None, retries=None):
+        """GET请求并读取全部内容，返回响应"""
+        with self.stream(url, headers, timeout, retries) as response:
+            response.content
+        return response
+    
+    @contextmanager
+    def stream(self, url, headers=None, timeout=None, retries=None):
+        """流式GET请求：with network.stream(url) as response: ...，退出时关闭响应并记录。
+        在响应交给调用方之前，连接失败、超时或RETRY_STATUSES状态码会自动重试"""
+        import requests
+        from urllib.parse import urlsplit
+        host = urlsplit(url).netloc
+        retries = self.RETRIES if retries is None else retries
+        metric = {"method": "GET", "host": host, "url": url, "status": None, "attempts": 0,
+                  "latency_ms": None, "duration_ms": None, "bytes": 0, "error": None}
+        slot = self.host_slot(host)
+        start = time.perf_counter()
+        slot.acquire()
+        response = None
+        try:
+            while True:
+                metric["attempts"] += 1
+                try:
+                    response = self.get_session().get(url, headers=headers, stream=True, timeout=timeout or self.TIMEOUT)
+                except (requests.ConnectionError, requests.Timeout):
+                    if metric["attempts"] > retries:
+                        raise
+                else:
+                    if response.status_code not in self.RETRY_STATUSES or metric["attempts"] > retries:
+                        break
+                    response.close()
+                    response = None
+                time.sleep(self.RETRY_DELAY * 2 ** (metric["attempts"] - 1))
+            metric["status"] = response.status_code
+            # 延迟：从发出请求到收到响应头
+            metric["latency_ms"] = (time.perf_counter() - start) * 1000
+            yield response
+        except Exception as e:
+            metric["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            if response is not None:
+                # 实际接收的字节数（压缩前）
+                metric["bytes"] = response.raw.tell()
+                response.close()
+            slot.release()
+            self.record(metric, start)
+    
+    def record(self, metric, start):
+        end = time.perf_counter()
+        metric["duration_ms"] = (end - start) * 1000
+        self.metrics.append(metric)
+        if tracer.enabled:
+            tracer.record(f"http {metric['method']}", start, end, {
+                name: metric[name] for name in ("host", "status", "attempts", "bytes", "error")
+            })
+    
+    def summary(self):
+        """按主机汇总最近的请求：次数、失败次数、字节数、平均和最大延迟（毫秒）"""
+        hosts = {}
+        for metric in list(self.metrics):
+            stats = hosts.setdefault(metric["host"], {"requests": 0, "errors": 0, "bytes": 0, "latency_ms_avg": 0.0, "latency_ms_max": 0.0})
+            stats["requests"] += 1
+            stats["bytes"] += metric["bytes"]
+            if metric["error"] is not None or (metric["status"] or 500) >= 400:
+                stats["errors"] += 1
+            latency = metric["latency_ms"] or 0.0
+            stats["latency_ms_avg"] += (latency - stats["latency_ms_avg"]) / stats["requests"]
+            stats["latency_ms_max"] = max(stats["latency_ms_max"], latency)
+        return hosts
+
+# 全局网络访问层
+network = NetworkService()
+
+# 条件请求JSON
+def fetch_json_conditional(url, cache, headers=None):
+    """GET请求JSON，带上缓存中的ETag/Last-Modified；服务器返回304时使用缓存的内容。
+    新内容及其ETag/Last-Modified写入cache["data"]等字段，返回内容"""
+    headers = dict(headers or {})
+    if cache.get("data") is not None:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+    response = network.get(url, headers=headers, timeout=10)
+    if response.status_code == 304 and cache.get("data") is not None:
+        # 内容没有变化，缓存仍然有效
+        return cache["data"]
+    response.raise_for_status()
+    cache["data"] = response.json()
+    cache["etag"] = response.headers.get("ETag")
+    cache["last_modified"] = response.headers.get("Last-Modified")
+    return cache["data"]
+
+class Ed25519:
+    """Ed25519签名（RFC 8032），用于校验镜像和共享目录中的更新清单；不依赖第三方加密库"""
+    P = 2 ** 255 - 19
+    L = 2 ** 252 + 27742317777372353535851937790883648493
+    D = -121665 * pow(121666, P - 2, P) % P
+    # -1的平方根
+    I = pow(2, (P - 1) // 4, P)
+    
+    @classmethod
+    def add(cls, a, b):
+        """扩展坐标(X, Y, Z, T)下的点加法"""
+        p = cls.P
+        x1, y1, z1, t1 = a
+        x2, y2, z2, t2 = b
+        e1 = (y1 - x1) * (y2 - x2) % p
+        e2 = (y1 + x1) * (y2 + x2) % p
+        c = 2 * t1 * t2 * cls.D % p
+        d = 2 * z1 * z2 % p
+        e, f, g, h = e2 - e1, d - c, d + c, e2 + e1
+        return e * f % p, g * h % p, f * g % p, e * h % p
+    
+    @classmethod
+    def multiply(cls, scalar, point):
+        result = (0, 1, 1, 0)
+        while scalar > 0:
+            if scalar & 1:
+                result = cls.add(result, point)
+            point = cls.add(point, point)
+            scalar >>= 1
+        return result
+    
+    @classmethod
+    def equal(cls, a, b):
+        p = cls.P
+        return (a[0] * b[2] - b[0] * a[2]) % p == 0 and (a[1] * b[2] - b[1] * a[2]) % p == 0
+    
+    @classmethod
+    def recover_x(cls, y, sign):
+        p = cls.P
+        if y >= p:
+            return None
+        x2 = (y * y - 1) * pow(cls.D * y * y + 1, p - 2, p) % p
+        if x2 == 0:
+            return None if sign else 0
+        x = pow(x2, (p + 3) // 8, p)
+        if (x * x - x2) % p:
+            x = x * cls.I % p
+        if (x * x - x2) % p:
+            return None
+        if x & 1 != sign:
+            x = p - x
+        return x
+    
+    @classmethod
+    def base(cls):
+        y = 4 * pow(5, cls.P - 2, cls.P) % cls.P
+        x = cls.recover_x(y, 0)
+        return x, y, 1, x * y % cls.P
+    
+    @classmethod
+    def compress(cls, point):
+        z_inv = pow(point[2], cls.P - 2, cls.P)
+        x = point[0] * z_inv % cls.P
+        y = point[1] * z_inv % cls.P
+        return (y | (x & 1) << 255).to_bytes(32, "little")
+    
+    @classmethod
+    def decompress(cls, data):
+        if len(data) != 32:
+            return None
+        y = int.from_bytes(data, "little")
+        sign = y >> 255
+        y &= (1 << 255) - 1
+        x = cls.recover_x(y, sign)
+        if x is None:
+            return None
+        return x, y, 1, x * y % cls.P
+    
+    @classmethod
+    def hash_int(cls, data):
+        return int.from_bytes(hashlib.sha512(data).digest(), "little") % cls.L
+    
+    @classmethod
+    def expand(cls, seed):
+        digest = hashlib.sha512(seed).digest()
+        scalar = int.from_bytes(digest[:32], "little")
+        scalar &= (1 << 254) - 8
+        scalar |= 1 << 254
+        return scalar, digest[32:]
+    
+    @classmethod
+    def public_key(cls, seed):
+        """由32字节私钥种子计算公钥"""
+        return cls.compress(cls.multiply(cls.expand(seed)[0], cls.base()))
+    
+    @classmethod
+    def sign(cls, seed, message):
+        """签名（发布时使用），返回64字节签名"""
+        scalar, prefix = cls.expand(seed)
+        public_key = cls.compress(cls.multiply(scalar, cls.base()))
+        r = cls.hash_int(prefix + message)
+        encoded_r = cls.compress(cls.multiply(r, cls.base()))
+        s = (r + cls.hash_int(encoded_r + public_key + message) * scalar) % cls.L
+        return encoded_r + s.to_bytes(32, "little")
+    
+    @classmethod
+    def verify(cls, public_key, message, signature):
+        """校验签名"""
+        if len(signature) != 64:
+            return False
+        point = cls.decompress(public_key)
+        r = cls.decompress(signature[:32])
+        if point is None or r is None:
+            return False
+        s = int.from_bytes(signature[32:], "little")
+        if s >= cls.L:
+            return False
+        h = cls.hash_int(signature[:32] + public_key + message)
+        return cls.equal(cls.multiply(s, cls.base()), cls.add(r, cls.multiply(h, point)))
+
+# 更新清单签名公钥（Ed25519，十六进制），用python build.py keygen生成密钥对后填入；
+# 可通过环境变量BINGZ_UPDATE_PUBLIC_KEY配置。配置后镜像和共享目录中的更新清单必须带有有效签名
+UPDATE_PUBLIC_KEY = os.getenv("BINGZ_UPDATE_PUBLIC_KEY", "")
+
+# 更新清单的签名内容
+def manifest_payload(manifest):
+    """去掉signature字段后按键排序的紧凑JSON（UTF-8），与清单文件的格式和缩进无关"""
+    data = {key: value for key, value in manifest.items() if key != "signature"}
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+# 校验更新清单
+def verify_manifest(manifest, public_key=None):
+    """配置了公钥时校验更新清单的签名，且每个资产都要有SHA-256（下载后据此校验文件），不通过时抛出ValueError"""
+    public_key = UPDATE_PUBLIC_KEY if public_key is None else public_key
+    if not public_key:
+        return
+    try:
+        signature = bytes.fromhex(manifest.get("signature") or "")
+    except (TypeError, ValueError):
+        signature = b""
+    if not Ed25519.verify(bytes.fromhex(public_key), manifest_payload(manifest), signature):
+        raise ValueError("更新清单签名无效")
+    if not all(asset.get("sha256") for asset in manifest.get("assets", [])):
+        raise ValueError("更新清单中的资产缺少SHA-256")
+
+# 更新清单转换为GitHub版本信息的格式
+def manifest_to_release(manifest, asset_url):
+    """更新清单（releases/version.json的格式）转换为与GitHub最新版本接口相同的结构，
+    asset_url(name)返回资产的下载地址"""
+    return {
+        "tag_name": str(manifest["version"]),
+        "body": manifest.get("notes", ""),
+        "assets": [
+            {
+                "name": asset["name"],
+                "platform": asset.get("platform"),
+                "size": asset.get("size"),
+                "digest": f"sha256:{asset['sha256']}" if asset.get("sha256") else None,
+                "browser_download_url": asset_url(asset["name"]),
+            }
+            for asset in manifest.get("assets", [])
+        ],
+    }
+
+class GitHubSource:
+    """更新源：GitHub Releases"""
+    cacheable = True
+    
+    def __init__(self, repo_owner, repo_name):
+        self.name = "GitHub"
+        self.url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
+    
+    def fetch(self, cache):
+        return fetch_json_conditional(self.url, cache, {"Accept": "application/vnd.github+json"})
+    
+    def to_release(self, data):
+        return data
+
+class MirrorSource:
+    """更新源：HTTP镜像，目录下有更新清单version.json和各个资产文件
+    
+    不加密的http镜像中更新清单（包括SHA-256）和文件都可能被篡改，
+    只有配置了更新清单签名公钥，或设置环境变量BINGZ_ALLOW_HTTP_MIRRORS=1时才使用
+    """
+    cacheable = True
+    
+    def __init__(self, base_url):
+        self.name = base_url
+        self.base_url = base_url.rstrip("/") + "/"
+        self.url = self.base_url + "version.json"
+    
+    def fetch(self, cache):
+        if self.base_url.lower().startswith("http://") and not UPDATE_PUBLIC_KEY and os.getenv("BINGZ_ALLOW_HTTP_MIRRORS") != "1":
+            raise IOError(f"{self.name}使用不加密的http，请改用https或配置更新清单签名公钥")
+        return fetch_json_conditional(self.url, cache)
+    
+    def to_release(self, data):
+        from urllib.parse import quote
+        verify_manifest(data)
+        return manifest_to_release(data, lambda name: self.base_url + quote(name))
+
+class DirectorySource:
+    """更新源：本地或局域网共享目录，目录下有更新清单version.json和各个资产文件"""
+    # 读取本地文件很快，每次检查都重新读取
+    cacheable = False
+    
+    def __init__(self, path):
+        from pathlib import Path
+        self.name = path
+        self.path = Path(os.path.expanduser(path)).absolute()
+        self.url = (self.path / "version.json").as_uri()
+    
+    def fetch(self, cache):
+        with open(self.path / "version.json", 'r', encoding='utf-8') as f:
+            cache["data"] = json.load(f)
+        return cache["data"]
+    
+    def to_release(self, data):
+        verify_manifest(data)
+        return manifest_to_release(data, lambda name: (self.path / name).as_uri())
+
+# 更新源配置
+def create_update_sources(repo_owner, repo_name):
+    """根据环境变量BINGZ_UPDATE_SOURCES（逗号分隔，github、http(s)镜像地址或目录）创建更新源，默认只使用GitHub"""
+    sources = []
+    for entry in os.getenv("BINGZ_UPDATE_SOURCES", "github").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.lower() == "github":
+            sources.append(GitHubSource(repo_owner, repo_name))
+        elif entry.startswith(("http://", "https://")):
+            sources.append(MirrorSource(entry))
+        else:
+            sources.append(DirectorySource(entry))
+    return sources or [GitHubSource(repo_owner, repo_name)]
+
 class UpdateChecker(QThread):
-    """更新检查线程"""
+    """更新检查线程。
+    
+    可以配置多个更新源（GitHub、HTTP镜像或本地目录），同时检查，使用最先响应的更新源。
+    各更新源的版本信息连同ETag/Last-Modified缓存在用户数据目录中：缓存未过期时直接使用，
+    过期后发送条件请求（未修改时服务器返回304，不计入GitHub的访问次数限制）；
+    请求失败后按指数退避，退避期间不再访问网络，有缓存时使用缓存的结果。
+    """
     update_available = pyqtSignal(dict)
     no_update = pyqtSignal()
     error = pyqtSignal(str)
     progress = pyqtSignal(int, str)
-    download_progress = pyqtSignal(int, str)
-    download_complete = pyqtSignal(str)
     
-    def __init__(self, current_version, repo_owner, repo_name):
+    # 缓存有效期（秒），可通过环境变量BINGZ_RELEASE_CACHE_TTL配置
+    CACHE_TTL = int(os.getenv("BINGZ_RELEASE_CACHE_TTL", "600"))
+    # 失败后的退避时间：从RETRY_BASE秒开始每次加倍，最长RETRY_MAX秒
+    RETRY_BASE = 30
+    RETRY_MAX = 3600
+    
+    def __init__(self, current_version, repo_owner, repo_name, sources=None):
         super().__init__()
         self.current_version = current_version
         self.repo_owner = repo_owner
         self.repo_name = repo_name
-        self.api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
+        self.sources = sources or create_update_sources(repo_owner, repo_name)
+        self.cache_dir = os.path.join(get_user_data_dir(), "update_cache")
+        self.source = None
     
+    @traced("UpdateChecker.run")
     def run(self):
         try:
             # 检查更新
             self.progress.emit(20, "正在检查更新...")
-            response = requests.get(self.api_url, timeout=10)
-            response.raise_for_status()
+            release_info, self.source = self.fetch_fastest()
             self.progress.emit(50, "正在解析更新信息...")
-            release_info = response.json()
             
             latest_version = release_info["tag_name"]
             
@@ -88,7 +1052,8 @@ class UpdateChecker(QThread):
                     update_data = {
                         "version": latest_version,
                         "release_notes": release_info["body"],
-                        "asset": asset_info
+                        "asset": asset_info,
+                        "source": self.source.name
                     }
                     self.progress.emit(100, "准备下载更新...")
                     self.update_available.emit(update_data)
@@ -100,6 +1065,91 @@ class UpdateChecker(QThread):
         except Exception as e:
             self.error.emit(f"检查更新失败: {str(e)}")
     
+    def fetch_fastest(self):
+        """同时向所有更新源请求版本信息，返回(最先成功的版本信息, 更新源)；全部失败时抛出第一个更新源的错误"""
+        if len(self.sources) == 1:
+            return self.fetch_release(self.sources[0]), self.sources[0]
+        from concurrent.futures import as_completed
+        futures = {network.submit(self.fetch_release, source): source for source in self.sources}
+        errors = {}
+        # 不等待较慢的更新源，它们在后台完成后更新缓存
+        for future in as_completed(futures):
+            try:
+                return future.result(), futures[future]
+            except Exception as e:
+                errors[futures[future]] = e
+        raise errors[self.sources[0]]
+    
+    def cache_file(self, source):
+        return os.path.join(self.cache_dir, hashlib.sha1(source.url.encode('utf-8')).hexdigest()[:16] + ".json")
+    
+    def load_cache(self, source):
+        """读取更新源的缓存，缓存属于其他地址或已损坏时返回空缓存"""
+        try:
+            with open(self.cache_file(source), 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("url") == source.url:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {"url": source.url}
+    
+    def save_cache(self, source, cache):
+        """保存更新源的缓存；缓存只用于减少请求，保存失败时忽略"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_json_atomic(self.cache_file(source), cache)
+        except OSError:
+            pass
+    
+    def fetch_release(self, source):
+        """返回更新源的最新版本信息：优先使用未过期的缓存，否则重新请求"""
+        cache = self.load_cache(source)
+        cached = cache.get("data")
+        now = time.time()
+        if source.cacheable and cached is not None and now - cache.get("checked_at", 0) < self.CACHE_TTL:
+            return source.to_release(cached)
+        
+        retry_at = cache.get("retry_at", 0)
+        if now < retry_at:
+            # 退避期间不访问更新源，有缓存时使用缓存
+            if cached is not None:
+                return source.to_release(cached)
+            raise IOError(f"{source.name}暂时不可用，请在{format_duration(retry_at - now)}后重试")
+        
+        try:
+            release = source.to_release(source.fetch(cache))
+        except Exception as e:
+            # 内容无效时不覆盖缓存
+            cache["data"] = cached
+            self.back_off(source, cache, getattr(e, "response", None))
+            # 有缓存时使用上次的结果
+            if cached is not None:
+                return source.to_release(cached)
+            raise
+        cache["checked_at"] = now
+        cache["failures"] = 0
+        cache["retry_at"] = 0
+        self.save_cache(source, cache)
+        return release
+    
+    def back_off(self, source, cache, response=None):
+        """记录一次失败，计算下次允许请求的时间"""
+        failures = cache.get("failures", 0) + 1
+        delay = min(self.RETRY_BASE * 2 ** (failures - 1), self.RETRY_MAX)
+        if response is not None:
+            # 服务器要求的等待时间（Retry-After或GitHub访问次数限制的重置时间）
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset = response.headers.get("X-RateLimit-Reset", "")
+                if reset.isdigit():
+                    delay = max(delay, int(reset) - time.time())
+        cache["failures"] = failures
+        cache["retry_at"] = time.time() + delay
+        self.save_cache(source, cache)
+    
     def is_newer_version(self, latest, current):
         """比较版本号，判断是否为新版本"""
         try:
@@ -126,174 +1176,2789 @@ class UpdateChecker(QThread):
         except Exception:
             return False
     
-    def get_platform_asset(self, assets):
-        """获取适合当前平台的资产"""
-        current_platform = sys.platform
-        
-        for asset in assets:
-            asset_name = asset["name"].lower()
-            
-            if current_platform == "darwin":  # macOS
-                if "mac" in asset_name or "darwin" in asset_name:
-                    return asset
-            elif current_platform == "win32":  # Windows
-                if "win" in asset_name or "windows" in asset_name:
-                    return asset
-            elif current_platform == "linux":  # Linux
-                if "linux" in asset_name:
-                    return asset
+    def get_platform_asset(self, assets):
+        """获取适合当前平台的资产；有从当前版本到新版本的增量更新包时，放在返回资产的delta字段中"""
+        current_platform = sys.platform
+        
+        for asset in assets:
+            asset_name = asset["name"].lower()
+            if asset_name.endswith(DELTA_SUFFIX):
+                continue
+            
+            # 更新清单中的资产注明了平台
+            if asset.get("platform"):
+                if asset["platform"] == current_platform:
+                    return self.with_delta(asset, assets)
+                continue
+            
+            if current_platform == "darwin":  # macOS
+                if "mac" in asset_name or "darwin" in asset_name:
+                    return self.with_delta(asset, assets)
+            elif current_platform == "win32":  # Windows
+                if "win" in asset_name or "windows" in asset_name:
+                    return self.with_delta(asset, assets)
+            elif current_platform == "linux":  # Linux
+                if "linux" in asset_name:
+                    return self.with_delta(asset, assets)
+        
+        return None
+    
+    def with_delta(self, asset, assets):
+        """查找“完整更新包文件名-from-当前版本.bzdelta”，找到时返回带delta字段的资产副本"""
+        prefix = asset["name"] + "-from-"
+        for delta in assets:
+            name = delta["name"]
+            if name.startswith(prefix) and name.endswith(DELTA_SUFFIX):
+                version = name[len(prefix):-len(DELTA_SUFFIX)]
+                if self.version_tuple(version) == self.version_tuple(self.current_version):
+                    return dict(asset, delta=delta)
+        return asset
+    
+    @staticmethod
+    def version_tuple(version):
+        """版本号转换为去掉末尾0的数字元组（v1.1和1.1.0相同），无法解析时返回原字符串"""
+        try:
+            parts = list(map(int, version.lstrip('vV').split('.')))
+        except ValueError:
+            return version
+        while parts and parts[-1] == 0:
+            parts.pop()
+        return tuple(parts)
+
+# 格式化文件大小
+def format_size(size):
+    """字节数转换为便于阅读的大小"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+# 格式化剩余时间
+def format_duration(seconds):
+    """秒数转换为分:秒"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+
+class RangeNotSupported(IOError):
+    """服务器不支持分段下载"""
+
+class UpdateDownloader(QThread):
+    """后台下载更新文件：可以取消，未完成的下载保存为.part文件，下次通过HTTP Range继续。
+    
+    服务器支持Range且文件足够大时，把文件分成几段并发下载到预分配的.part文件中，
+    各段的进度保存在.part.json中用于续传；否则单连接下载，同时流式计算SHA-256。
+    """
+    # 进度百分比（文件大小未知时为-1）和状态文字
+    progress = pyqtSignal(int, str)
+    # 下载完成的文件路径和SHA-256
+    downloaded = pyqtSignal(str, str)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    CHUNK_SIZE = 64 * 1024
+    # 进度信号的最小间隔（秒）
+    PROGRESS_INTERVAL = 0.2
+    # 分段下载的最大并发数和每段的最小大小
+    SEGMENT_COUNT = 4
+    MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+    
+    def __init__(self, url, save_path, expected_sha256=None, expected_size=None, parent=None, segment_count=None):
+        super().__init__(parent)
+        self.url = url
+        self.save_path = save_path
+        self.part_path = save_path + ".part"
+        self.state_path = save_path + ".part.json"
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.expected_size = expected_size or None
+        self.segment_count = segment_count or self.SEGMENT_COUNT
+        # cancel_event表示用户取消；stop_event让所有连接停止（取消或某一段失败）
+        self.cancel_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.responses = set()
+        self.segments = []
+        self.segment_bytes = 0
+    
+    def cancel(self):
+        """取消下载（可在任意线程中调用），已下载的部分保留"""
+        self.cancel_event.set()
+        self.stop()
+    
+    def stop(self):
+        """停止所有连接，关闭响应使正在等待的读取立即返回"""
+        self.stop_event.set()
+        with self.lock:
+            responses = list(self.responses)
+        for response in responses:
+            response.close()
+    
+    def track(self, response):
+        """记录正在读取的响应，停止时关闭"""
+        with self.lock:
+            self.responses.add(response)
+        if self.stop_event.is_set():
+            raise DownloadCancelled()
+    
+    def untrack(self, response):
+        with self.lock:
+            self.responses.discard(response)
+    
+    @traced("download_update")
+    def run(self):
+        try:
+            digest = self.download()
+        except Exception as e:
+            if self.cancel_event.is_set():
+                self.cancelled.emit()
+            else:
+                self.error.emit(f"下载失败: {str(e)}")
+            return
+        if self.expected_sha256 and digest != self.expected_sha256:
+            # 文件内容有误，删除后下次重新下载
+            os.remove(self.part_path)
+            self.error.emit("下载失败: 文件校验失败（SHA-256不一致）")
+            return
+        os.replace(self.part_path, self.save_path)
+        self.downloaded.emit(self.save_path, digest)
+    
+    def download(self):
+        """下载到.part文件，返回文件的SHA-256"""
+        if self.url.startswith("file:"):
+            return self.copy_local()
+        state = self.load_state()
+        if state is not None:
+            try:
+                return self.download_segments(*state)
+            except RangeNotSupported:
+                # 服务器不再支持分段下载，丢弃进度后单连接下载
+                if self.cancel_event.is_set():
+                    raise DownloadCancelled()
+                self.stop_event.clear()
+                self.segments = []
+                os.remove(self.state_path)
+                os.remove(self.part_path)
+        
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        if self.expected_size and offset > self.expected_size:
+            offset = 0
+        sha256 = hashlib.sha256()
+        # 总是带Range请求头，同时探测服务器是否支持分段下载
+        with network.stream(self.url, headers={"Range": f"bytes={offset}-"}) as response:
+            self.track(response)
+            try:
+                if offset and response.status_code == 416:
+                    if self.expected_size is None or offset == self.expected_size:
+                        # 上次已下载完整
+                        self.hash_file(sha256, offset)
+                        self.report(offset, offset, offset, final=True)
+                        return sha256.hexdigest()
+                    # .part比服务器上的文件还长（服务器上的文件已更换），删除后从头下载
+                    restart = True
+                else:
+                    restart = False
+                    response.raise_for_status()
+                    if response.status_code != 206 or self.range_start(response) != offset:
+                        # 服务器不支持断点续传，从头下载
+                        offset = 0
+                    total = self.total_size(response, offset)
+                    if response.status_code == 206 and offset == 0 and total and total >= 2 * self.MIN_SEGMENT_SIZE and self.segment_count > 1:
+                        segmented = True
+                    else:
+                        segmented = False
+                        digest = self.download_stream(response, sha256, offset, total)
+            finally:
+                self.untrack(response)
+        if restart:
+            os.remove(self.part_path)
+            return self.download()
+        if segmented:
+            return self.download_segments(total, self.split(total))
+        return digest
+    
+    def download_stream(self, response, sha256, offset, total):
+        """单连接下载：从offset处追加写入，同时计算SHA-256"""
+        if offset:
+            self.hash_file(sha256, offset)
+        downloaded = offset
+        self.start_time = self.last_report = time.perf_counter()
+        with open(self.part_path, 'ab' if offset else 'wb') as f:
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                if self.stop_event.is_set():
+                    raise DownloadCancelled()
+                f.write(chunk)
+                sha256.update(chunk)
+                downloaded += len(chunk)
+                self.report(downloaded, total, offset)
+        if self.stop_event.is_set():
+            raise DownloadCancelled()
+        if total is not None and downloaded != total:
+            raise IOError(f"下载不完整（{downloaded}/{total}字节）")
+        self.report(downloaded, total, offset, final=True)
+        return sha256.hexdigest()
+    
+    def copy_local(self):
+        """从本地或局域网共享目录（file:地址）复制更新文件，同时计算SHA-256"""
+        from urllib.parse import urlparse
+        from urllib.request import url2pathname
+        parsed = urlparse(self.url)
+        # file://server/share/...为局域网共享路径
+        source_path = url2pathname(f"//{parsed.netloc}{parsed.path}" if parsed.netloc else parsed.path)
+        total = os.path.getsize(source_path)
+        sha256 = hashlib.sha256()
+        copied = 0
+        self.start_time = self.last_report = time.perf_counter()
+        with open(source_path, 'rb') as source, open(self.part_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(self.CHUNK_SIZE * 16), b""):
+                if self.stop_event.is_set():
+                    raise DownloadCancelled()
+                f.write(chunk)
+                sha256.update(chunk)
+                copied += len(chunk)
+                self.report(copied, total, 0)
+        self.report(copied, total, 0, final=True)
+        return sha256.hexdigest()
+    
+    def split(self, total):
+        """把文件分成若干段，每段为[下一个要下载的位置, 结束位置（含）]"""
+        count = max(1, min(self.segment_count, total // self.MIN_SEGMENT_SIZE))
+        size = -(-total // count)
+        return [[start, min(start + size, total) - 1] for start in range(0, total, size)]
+    
+    def download_segments(self, total, segments):
+        """分段并发下载到预分配的文件中，完成后计算SHA-256"""
+        from concurrent.futures import wait, FIRST_EXCEPTION
+        self.segments = segments
+        if not os.path.exists(self.part_path):
+            with open(self.part_path, 'wb') as f:
+                # 预分配文件，各段直接写入自己的位置
+                f.truncate(total)
+        offset = total - sum(end - pos + 1 for pos, end in segments)
+        self.segment_bytes = 0
+        self.save_state(total)
+        
+        self.start_time = self.last_report = time.perf_counter()
+        pending = [segment for segment in segments if segment[0] <= segment[1]]
+        failed = None
+        futures = [network.submit(self.download_segment, segment) for segment in pending]
+        try:
+            while True:
+                done, running = wait(futures, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                self.report(offset + self.segment_bytes, total, offset)
+                self.save_state(total)
+                failed = next((future for future in done if future.exception() is not None), None)
+                if failed is not None:
+                    # 某一段失败，停止其余的连接
+                    self.stop()
+                    break
+                if not running:
+                    break
+        finally:
+            # 等待所有段结束后再保存进度
+            wait(futures)
+            self.save_state(total)
+        if failed is not None and not self.cancel_event.is_set():
+            raise failed.exception()
+        if self.stop_event.is_set():
+            raise DownloadCancelled()
+        os.remove(self.state_path)
+        self.report(total, total, offset, final=True)
+        # 各段乱序到达，无法边下载边计算SHA-256
+        sha256 = hashlib.sha256()
+        self.hash_file(sha256, total)
+        return sha256.hexdigest()
+    
+    def download_segment(self, segment):
+        """下载一段（在线程池中运行），segment[0]随写入进度前移"""
+        start, end = segment
+        with network.stream(self.url, headers={"Range": f"bytes={start}-{end}"}) as response:
+            self.track(response)
+            try:
+                response.raise_for_status()
+                if response.status_code != 206 or self.range_start(response) != start:
+                    raise RangeNotSupported("服务器不支持分段下载")
+                # 不使用缓冲，记录的进度不会超过实际写入的数据
+                with open(self.part_path, 'r+b', buffering=0) as f:
+                    f.seek(start)
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        if self.stop_event.is_set():
+                            raise DownloadCancelled()
+                        chunk = chunk[:end - segment[0] + 1]
+                        f.write(chunk)
+                        with self.lock:
+                            segment[0] += len(chunk)
+                            self.segment_bytes += len(chunk)
+                        if segment[0] > end:
+                            break
+            finally:
+                self.untrack(response)
+        if self.stop_event.is_set():
+            raise DownloadCancelled()
+        if segment[0] <= end:
+            raise IOError(f"分段下载不完整（{start}-{end}）")
+    
+    def save_state(self, total):
+        """保存各段进度，用于续传"""
+        with self.lock:
+            segments = [list(segment) for segment in self.segments]
+        write_json_atomic(self.state_path, {"url": self.url, "total": total, "segments": segments})
+    
+    def load_state(self):
+        """读取上次分段下载的进度，返回(总大小, 各段)；没有或不匹配时返回None"""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            total = state["total"]
+            if state["url"] == self.url and os.path.getsize(self.part_path) == total and (self.expected_size is None or total == self.expected_size):
+                return total, [[int(pos), int(end)] for pos, end in state["segments"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # 进度与当前下载不匹配，从头下载
+        for path in (self.state_path, self.part_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return None
+    
+    @staticmethod
+    def range_start(response):
+        """206响应中Content-Range的起始位置"""
+        try:
+            return int(response.headers.get("content-range", "").split()[1].split("-")[0])
+        except (IndexError, ValueError):
+            return None
+    
+    def total_size(self, response, offset):
+        """文件总大小，服务器没有提供时返回None"""
+        content_range = response.headers.get("content-range", "")
+        if response.status_code == 206 and "/" in content_range:
+            total = content_range.rsplit("/", 1)[1]
+            if total.isdigit():
+                return int(total)
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and "gzip" not in response.headers.get("content-encoding", ""):
+            return offset + int(length)
+        return self.expected_size
+    
+    def hash_file(self, sha256, size):
+        """将.part文件的前size字节计入SHA-256"""
+        with open(self.part_path, 'rb') as f:
+            remaining = size
+            while remaining > 0:
+                chunk = f.read(min(self.CHUNK_SIZE * 16, remaining))
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                remaining -= len(chunk)
+    
+    def report(self, downloaded, total, offset, final=False):
+        """发出进度信号（限制频率），包含下载速度和剩余时间"""
+        now = time.perf_counter()
+        if not final and now - self.last_report < self.PROGRESS_INTERVAL:
+            return
+        self.last_report = now
+        elapsed = now - getattr(self, "start_time", now)
+        speed = (downloaded - offset) / elapsed if elapsed > 0 else 0
+        if total:
+            percent = min(100, downloaded * 100 // total)
+            text = f"下载中: {percent}%  {format_size(downloaded)}/{format_size(total)}  {format_size(speed)}/s"
+            if speed > 0 and downloaded < total:
+                text += f"  剩余{format_duration((total - downloaded) / speed)}"
+        else:
+            percent = -1
+            text = f"下载中: {format_size(downloaded)}  {format_size(speed)}/s"
+        self.progress.emit(percent, text)
+
+# 增量更新包：文件头（魔数、基准文件大小、目标文件大小、基准文件和目标文件的SHA-256），
+# 之后是LZMA压缩的指令流：b"C"+偏移+长度表示从基准文件复制，b"I"+长度+数据表示插入新数据
+DELTA_HEADER = struct.Struct("<4sQQ32s32s")
+DELTA_MAGIC = b"BZD1"
+DELTA_COPY = struct.Struct("<QI")
+DELTA_INSERT = struct.Struct("<I")
+# 增量更新包的文件名为“完整更新包文件名-from-版本号.bzdelta”
+DELTA_SUFFIX = ".bzdelta"
+# 匹配基准文件内容的块大小
+DELTA_BLOCK = 256
+
+# 生成增量更新包（发布时使用）
+def make_delta(source, target, block=DELTA_BLOCK):
+    """生成从source（旧版本文件内容）到target（新版本文件内容）的增量更新包。
+    
+    按块索引旧文件，用rsync的滚动校验和在新文件中逐字节查找相同的块，找到后向前后扩展，
+    其余内容作为插入数据，最后整体用LZMA压缩。
+    """
+    import lzma
+    from itertools import accumulate
+    # 旧文件按块建立索引：键由块的字节和与前缀和之和组成
+    index = {}
+    for offset in range(0, len(source) - block + 1, block):
+        chunk = source[offset:offset + block]
+        index.setdefault(sum(accumulate(chunk)) << 16 | sum(chunk), offset)
+    
+    ops = bytearray()
+    def emit_insert(start, end):
+        while start < end:
+            length = min(end - start, 0xFFFFFFFF)
+            ops.extend(b"I" + DELTA_INSERT.pack(length))
+            ops.extend(target[start:start + length])
+            start += length
+    
+    size, source_size = len(target), len(source)
+    position = literal_start = 0
+    a = b = 0
+    if size >= block:
+        chunk = target[:block]
+        a, b = sum(chunk), sum(accumulate(chunk))
+    while position + block <= size:
+        offset = index.get(b << 16 | a)
+        if offset is not None and source[offset:offset + block] == target[position:position + block]:
+            # 向后扩展匹配（先大步比较，再逐渐缩小）
+            length = block
+            for step in (65536, 4096, block, 16, 1):
+                while (offset + length + step <= source_size and position + length + step <= size
+                       and source[offset + length:offset + length + step] == target[position + length:position + length + step]):
+                    length += step
+            # 向前扩展到未匹配的插入数据中
+            while position > literal_start and offset > 0 and source[offset - 1] == target[position - 1]:
+                position -= 1
+                offset -= 1
+                length += 1
+            emit_insert(literal_start, position)
+            while length > 0:
+                part = min(length, 0xFFFFFFFF)
+                ops += b"C" + DELTA_COPY.pack(offset, part)
+                offset += part
+                position += part
+                length -= part
+            literal_start = position
+            if position + block <= size:
+                chunk = target[position:position + block]
+                a, b = sum(chunk), sum(accumulate(chunk))
+            continue
+        # 窗口向后滚动一个字节
+        if position + block < size:
+            removed = target[position]
+            a += target[position + block] - removed
+            b += a - block * removed
+        position += 1
+    emit_insert(literal_start, size)
+    
+    header = DELTA_HEADER.pack(DELTA_MAGIC, source_size, size, hashlib.sha256(source).digest(), hashlib.sha256(target).digest())
+    return header + lzma.compress(bytes(ops), preset=9)
+
+# 应用增量更新包
+def apply_delta(source_path, delta_path, output_path, expected_sha256=None):
+    """用增量更新包将source_path转换为新版本，写入output_path，返回新文件的SHA-256；
+    基准文件不匹配或结果校验失败时抛出ValueError，不会留下不完整的output_path"""
+    import lzma
+    with open(delta_path, 'rb') as f:
+        header = f.read(DELTA_HEADER.size)
+        if len(header) != DELTA_HEADER.size:
+            raise ValueError("增量更新包已损坏")
+        magic, source_size, target_size, source_sha256, target_sha256 = DELTA_HEADER.unpack(header)
+        if magic != DELTA_MAGIC:
+            raise ValueError("不是增量更新包")
+        if expected_sha256 and target_sha256.hex() != expected_sha256.lower():
+            raise ValueError("增量更新包与完整更新包不一致")
+        
+        # 检查基准文件是否就是生成增量更新包时的旧版本
+        if os.path.getsize(source_path) != source_size:
+            raise ValueError("当前程序文件与增量更新包不匹配")
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+        if digest.digest() != source_sha256:
+            raise ValueError("当前程序文件与增量更新包不匹配")
+        
+        temp_path = output_path + ".tmp"
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(source_path, 'rb') as source, lzma.open(f) as ops, open(temp_path, 'wb') as output:
+                while True:
+                    op = ops.read(1)
+                    if not op:
+                        break
+                    if op == b"C":
+                        offset, remaining = DELTA_COPY.unpack(ops.read(DELTA_COPY.size))
+                        if offset + remaining > source_size:
+                            raise ValueError("增量更新包已损坏")
+                        source.seek(offset)
+                        while remaining > 0:
+                            data = source.read(min(remaining, 1024 * 1024))
+                            output.write(data)
+                            digest.update(data)
+                            written += len(data)
+                            remaining -= len(data)
+                    elif op == b"I":
+                        (length,) = DELTA_INSERT.unpack(ops.read(DELTA_INSERT.size))
+                        data = ops.read(length)
+                        if len(data) != length:
+                            raise ValueError("增量更新包已损坏")
+                        output.write(data)
+                        digest.update(data)
+                        written += length
+                    else:
+                        raise ValueError("增量更新包已损坏")
+            if written != target_size or digest.digest() != target_sha256:
+                raise ValueError("增量更新结果校验失败")
+            os.replace(temp_path, output_path)
+        except (lzma.LZMAError, struct.error, EOFError) as e:
+            raise ValueError(f"增量更新包已损坏: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return digest.hexdigest()
+
+class DeltaPatcher(QThread):
+    """后台应用增量更新包"""
+    patched = pyqtSignal(str, str)
+    error = pyqtSignal(str)
+    
+    def __init__(self, source_path, delta_path, output_path, expected_sha256=None, parent=None):
+        super().__init__(parent)
+        self.source_path = source_path
+        self.delta_path = delta_path
+        self.output_path = output_path
+        self.expected_sha256 = expected_sha256
+    
+    @traced("apply_delta")
+    def run(self):
+        try:
+            digest = apply_delta(self.source_path, self.delta_path, self.output_path, self.expected_sha256)
+        except Exception as e:
+            self.error.emit(f"增量更新失败: {str(e)}")
+            return
+        finally:
+            # 增量更新包只使用一次
+            if os.path.exists(self.delta_path):
+                os.remove(self.delta_path)
+        self.patched.emit(self.output_path, digest)
+
+# 更新包的SHA-256
+def asset_sha256(asset):
+    """GitHub资产信息中的SHA-256（digest字段，格式为sha256:...），没有时返回None"""
+    digest = asset.get("digest") or ""
+    return digest[len("sha256:"):] if digest.startswith("sha256:") else None
+
+# 当前程序文件
+def current_executable():
+    """打包后的程序文件路径（增量更新的基准文件），从源码运行时返回None"""
+    if getattr(sys, 'frozen', False):
+        return sys.executable
+    return None
+
+class UpdateDialog(QDialog):
+    """更新对话框"""
+    def __init__(self, parent=None, current_version="1.0.0", repo_owner="Ta1phy", repo_name="bingz_toolkit"):
+        super().__init__(parent)
+        self.current_version = current_version
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.update_checker = None
+        self.downloader = None
+        self.patcher = None
+        self.downloading = False
+        self.init_ui()
+        self.check_for_updates()
+    
+    def init_ui(self):
+        """初始化更新对话框"""
+        self.setWindowTitle("检查更新")
+        self.setFixedSize(400, 200)
+        self.setWindowModality(Qt.ApplicationModal)
+        
+        # 主布局
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+        
+        # 标题
+        title_label = QLabel("BingZ工具包 - 更新检查")
+        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+        
+        # 当前版本
+        version_label = QLabel(f"当前版本: {self.current_version}")
+        version_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(version_label)
+        
+        # 状态标签
+        self.status_label = QLabel("正在检查更新...")
+        self.status_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.status_label)
+        
+        # 进度条
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        
+        # 按钮布局
+        button_layout = QHBoxLayout()
+        
+        # 取消按钮
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.close)
+        button_layout.addWidget(self.cancel_button)
+        
+        # 更新按钮（初始隐藏）
+        self.update_button = QPushButton("立即更新")
+        self.update_button.clicked.connect(self.download_update)
+        self.update_button.hide()
+        button_layout.addWidget(self.update_button)
+        
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+    
+    def check_for_updates(self):
+        """开始检查更新"""
+        self.update_checker = UpdateChecker(self.current_version, self.repo_owner, self.repo_name)
+        self.update_checker.update_available.connect(self.on_update_available)
+        self.update_checker.no_update.connect(self.on_no_update)
+        self.update_checker.error.connect(self.on_error)
+        self.update_checker.progress.connect(self.update_progress)
+        self.update_checker.start()
+    
+    def update_progress(self, progress, status):
+        """更新进度（progress为-1时表示大小未知）"""
+        if progress < 0:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(progress)
+        self.status_label.setText(status)
+    
+    def on_update_available(self, update_data):
+        """发现更新"""
+        self.update_data = update_data
+        self.status_label.setText(f"发现新版本: {update_data['version']}")
+        self.cancel_button.setText("关闭")
+        self.update_button.show()
+    
+    def on_no_update(self):
+        """没有更新"""
+        self.status_label.setText("已是最新版本")
+        self.cancel_button.setText("关闭")
+    
+    def on_error(self, error_msg):
+        """错误处理"""
+        self.status_label.setText(error_msg)
+        self.cancel_button.setText("关闭")
+    
+    def download_update(self):
+        """下载更新"""
+        self.downloading = True
+        self.update_button.hide()
+        self.cancel_button.setText("取消")
+        
+        # 创建下载目录
+        download_dir = os.path.join(get_user_data_dir(), "downloads")
+        if not os.path.exists(download_dir):
+            os.makedirs(download_dir)
+        
+        self.download_dir = download_dir
+        
+        # 有增量更新包且当前是打包后的程序时，先下载增量更新包
+        asset = self.update_data["asset"]
+        if asset.get("delta") and current_executable():
+            self.start_download(asset["delta"], self.on_delta_downloaded, self.fall_back_to_full)
+        else:
+            self.start_download(asset, self.on_download_complete, self.on_download_error)
+    
+    def start_download(self, asset, on_downloaded, on_error):
+        """在后台线程中下载资产到下载目录"""
+        save_path = os.path.join(self.download_dir, asset["name"])
+        self.downloader = UpdateDownloader(asset["browser_download_url"], save_path, asset_sha256(asset), asset.get("size"), self)
+        self.downloader.progress.connect(self.update_progress)
+        self.downloader.downloaded.connect(on_downloaded)
+        self.downloader.error.connect(on_error)
+        self.downloader.start()
+    
+    def on_delta_downloaded(self, delta_path, sha256):
+        """增量更新包下载完成，在后台线程中生成新版本文件"""
+        asset = self.update_data["asset"]
+        self.status_label.setText("正在应用增量更新...")
+        self.progress_bar.setRange(0, 0)
+        save_path = os.path.join(self.download_dir, asset["name"])
+        self.patcher = DeltaPatcher(current_executable(), delta_path, save_path, asset_sha256(asset), self)
+        self.patcher.patched.connect(self.on_download_complete)
+        self.patcher.error.connect(self.fall_back_to_full)
+        self.patcher.start()
+    
+    def fall_back_to_full(self, error_msg):
+        """增量更新不可用，改为下载完整更新包"""
+        self.status_label.setText(f"增量更新不可用（{error_msg}），正在下载完整更新包...")
+        self.start_download(self.update_data["asset"], self.on_download_complete, self.on_download_error)
+    
+    def on_download_error(self, error_msg):
+        """下载失败，可以重新下载（已下载的部分会继续）"""
+        self.downloading = False
+        self.progress_bar.setRange(0, 100)
+        self.on_error(error_msg)
+        self.update_button.setText("重新下载")
+        self.update_button.show()
+    
+    def done(self, result):
+        """关闭对话框时取消下载，已下载的部分保留到下次继续"""
+        if self.downloading:
+            reply = QMessageBox.question(self, "取消下载", "更新还在下载中，确定要取消吗？\n已下载的部分会保留，下次继续下载。",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+            self.downloading = False
+        if self.downloader is not None and self.downloader.isRunning():
+            self.downloader.cancel()
+            self.downloader.wait()
+        if self.patcher is not None:
+            self.patcher.wait()
+        super().done(result)
+    
+    def on_download_complete(self, save_path, sha256):
+        """下载完成"""
+        self.downloading = False
+        self.status_label.setText("更新下载完成！")
+        self.cancel_button.setText("关闭")
+        QMessageBox.information(self, "下载完成", f"更新已下载到: {save_path}\n请手动安装。")
+        self.close()
+
+# 原子写入JSON文件
+def write_json_atomic(file_path, data):
+    """紧凑格式序列化后原子写入JSON文件"""
+    write_file_atomic(file_path, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+
+def write_file_atomic(file_path, content):
+    """写入临时文件，同步到磁盘再替换原文件，写入中途崩溃不会损坏原文件"""
+    # 临时文件名包含进程和线程，多个线程同时写同一文件时互不影响
+    temp_file = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_file, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, file_path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    # 同步目录，确保替换操作本身已写入磁盘
+    if os.name == 'posix':
+        dir_fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+class CatalogSaver(QThread):
+    """后台保存线程：合并短时间内的多次修改，只写入最新的目录快照"""
+    saved = pyqtSignal()
+    error = pyqtSignal(str)
+    
+    def __init__(self, data_file, snapshot, delay=300, parent=None):
+        super().__init__(parent)
+        self.data_file = data_file
+        # 获取目录快照的函数（在GUI线程中调用）
+        self.snapshot = snapshot
+        self.condition = threading.Condition()
+        self.pending = None
+        self.writing = False
+        self.stopping = False
+        
+        # 延迟提交，期间的修改合并为一次写入
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.submit)
+    
+    def schedule(self):
+        """标记目录已修改，稍后在后台写入"""
+        if not self.isRunning() and not self.stopping:
+            self.start()
+        if not self.timer.isActive():
+            self.timer.start()
+    
+    def save_now(self):
+        """立即提交当前目录快照，不等待合并"""
+        if not self.isRunning() and not self.stopping:
+            self.start()
+        self.timer.stop()
+        self.submit()
+    
+    def submit(self):
+        """提交当前目录快照给后台线程写入"""
+        with tracer.span("catalog snapshot"):
+            data = self.snapshot()
+        with self.condition:
+            self.pending = data
+            self.condition.notify_all()
+    
+    def busy(self):
+        """是否有尚未写入完成的修改（等待合并、等待写入或正在写入）"""
+        if self.timer.isActive():
+            return True
+        with self.condition:
+            return self.pending is not None or self.writing
+    
+    def flush(self):
+        """立即提交尚未写入的修改，并等待写入完成"""
+        if self.timer.isActive():
+            self.timer.stop()
+            self.submit()
+        if not self.isRunning():
+            # 后台线程未运行时直接写入
+            with self.condition:
+                data, self.pending = self.pending, None
+            if data is not None:
+                self.write(data)
+            return
+        with self.condition:
+            while self.pending is not None or self.writing:
+                self.condition.wait()
+    
+    def stop(self):
+        """写入所有修改后结束后台线程（程序退出时调用）"""
+        self.flush()
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.wait()
+    
+    def write(self, data):
+        """写入目录快照（在后台线程中调用）"""
+        write_json_atomic(self.data_file, data)
+    
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                data, self.pending = self.pending, None
+                self.writing = True
+            try:
+                with tracer.span("write catalog", file=os.path.basename(self.data_file)):
+                    self.write(data)
+                self.saved.emit()
+            except Exception as e:
+                self.error.emit(f"保存失败: {str(e)}")
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+class ShardSaver(CatalogSaver):
+    """分片存储的后台保存线程，快照为要写入的分片文件和要删除的分片文件"""
+    def write(self, data):
+        files, deleted = data
+        # 按快照中的顺序写入，根清单最后写入
+        for file_path, content in files:
+            write_json_atomic(file_path, content)
+        for file_path in deleted:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+# 工具记录中未设置的字段
+MISSING = object()
+
+class Tool:
+    """工具记录，字段保存在__slots__中，不为每个工具保存一份字段名；兼容字典的读写方式（tool["name"]、tool.get(...)）
+    
+    没有设置的字段视为不存在，不在FIELDS中的字段保存在_extra字典中
+    """
+    FIELDS = ("id", "type", "name", "description", "features", "url", "icon_path")
+    SEARCH_FIELDS = ("name", "description", "features", "url")
+    # 取值重复较多的字段，驻留后相同的字符串只保存一份
+    INTERNED_FIELDS = frozenset(("type", "features", "icon_path"))
+    __slots__ = FIELDS + ("_extra", "_search")
+    is_folder = False
+    
+    def __init__(self, data=None):
+        self._extra = None
+        # 小写后的搜索文本，修改搜索字段时清除
+        self._search = None
+        if data:
+            self.update(data)
+    
+    @staticmethod
+    def from_dict(data):
+        """从ai_tools.json中的字典创建工具或文件夹记录"""
+        cls = Folder if data.get("type") == "folder" else Tool
+        return cls(data)
+    
+    @property
+    def search_key(self):
+        """拼接搜索字段并小写（用\0分隔，避免跨字段匹配）"""
+        if self._search is None:
+            self._search = "\0".join(self.get(field, "") or "" for field in self.SEARCH_FIELDS).lower()
+        return self._search
+    
+    def __getitem__(self, key):
+        if key in Tool.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+    
+    def get(self, key, default=None):
+        if key in Tool.FIELDS:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+    
+    def __setitem__(self, key, value):
+        if key in Tool.FIELDS:
+            if key in Tool.INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+            if key in Tool.SEARCH_FIELDS:
+                self._search = None
+            elif key == "type":
+                self.__class__ = Folder if value == "folder" else Tool
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in Tool.FIELDS:
+            delattr(self, key)
+            if key in Tool.SEARCH_FIELDS:
+                self._search = None
+            elif key == "type":
+                self.__class__ = Tool
+        else:
+            del self._extra[key]
+    
+    def __contains__(self, key):
+        if key in Tool.FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def to_dict(self):
+        """转换为ai_tools.json中的字典"""
+        data = {}
+        for key in Tool.FIELDS:
+            value = getattr(self, key, MISSING)
+            if value is not MISSING:
+                data[key] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+    
+    def keys(self):
+        return list(self.to_dict())
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def items(self):
+        return list(self.to_dict().items())
+    
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+    
+    def update(self, data):
+        for key, value in data.items():
+            self[key] = value
+    
+    def clear(self):
+        for key in self.keys():
+            del self[key]
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class Folder(Tool):
+    """文件夹记录"""
+    __slots__ = ()
+    is_folder = True
+
+class ToolCatalog:
+    """工具目录，按工具ID索引整棵工具树，查找、删除、移动和修改都不需要遍历
+    
+    使用分片存储时文件夹的内容按需加载：启动时只加载顶层，文件夹第一次打开时才通过loader读取其中的工具，
+    已加载的文件夹超过上限时卸载最久未打开的文件夹内容
+    """
+    # 同时保留在内存中的按需加载文件夹数量上限
+    MAX_LOADED_FOLDERS = int(os.getenv("BINGZ_FOLDER_CACHE", "128"))
+    
+    def __init__(self):
+        # 读取文件夹内容的函数（文件夹ID -> 工具列表），为None时所有工具一次加载
+        self.loader = None
+        # 判断文件夹内容能否卸载的函数（有未保存的修改时不能卸载）
+        self.evictable = None
+        # 文件夹内容加载或卸载时通知的对象（搜索索引）
+        self.listeners = []
+        self.clear()
+    
+    def clear(self):
+        """清空目录"""
+        # 工具ID -> 工具（内存中的工具不包含children字段）
+        self.nodes = {}
+        self.ids_assigned = False
+        # 工具ID -> 所在文件夹ID（顶层为None）
+        self.parents = {}
+        # 文件夹ID（顶层为None） -> {子工具ID: 子工具}，保持添加顺序
+        self.children = {None: {}}
+        # 内容尚未加载的文件夹ID
+        self.unloaded = set()
+        # 已按需加载的文件夹ID，按最近打开的顺序排列
+        self.loaded = OrderedDict()
+        # 打开的工具包窗口中的文件夹ID -> 窗口数，不会被卸载
+        self.pinned = {}
+        # 子工具有增删或移动的文件夹ID（顶层为None），分片存储只重新写入这些文件夹
+        self.changed = set()
+    
+    @staticmethod
+    def new_id():
+        """生成新的工具ID"""
+        return uuid.uuid4().hex
+    
+    def load(self, tools, loader=None):
+        """从ai_tools.json的工具列表加载目录，返回是否为工具分配了新ID
+        
+        指定loader时tools中的文件夹不包含子工具，文件夹内容在第一次访问时加载
+        """
+        self.clear()
+        self.loader = loader
+        self.ids_assigned = False
+        for tool in tools:
+            self.insert(tool, None, loader is not None)
+        return self.ids_assigned
+    
+    def insert(self, tool, folder_id, lazy=False):
+        """插入工具及其子工具（字典转换为工具记录），返回工具记录（lazy为True时文件夹内容留待按需加载）"""
+        children = None
+        if not isinstance(tool, Tool):
+            children = tool.pop("children", None)
+            tool = Tool.from_dict(tool)
+        if not tool.get("id") or tool["id"] in self.nodes:
+            tool["id"] = self.new_id()
+            self.ids_assigned = True
+        tool_id = tool["id"]
+        self.nodes[tool_id] = tool
+        self.parents[tool_id] = folder_id
+        self.children[folder_id][tool_id] = tool
+        if tool.is_folder or children is not None:
+            self.children[tool_id] = {}
+            if lazy and children is None:
+                self.unloaded.add(tool_id)
+            for child in children or []:
+                self.insert(child, tool_id, lazy)
+        return tool
+    
+    def ensure_loaded(self, folder_id):
+        """加载文件夹的内容（已加载时不做任何事）"""
+        if folder_id not in self.unloaded:
+            return
+        self.unloaded.discard(folder_id)
+        tools = [self.insert(tool, folder_id, True) for tool in self.loader(folder_id)]
+        self.loaded[folder_id] = True
+        for listener in self.listeners:
+            listener.tools_loaded(tools)
+    
+    def load_all(self, folder=None):
+        """加载文件夹（默认顶层）下所有子文件夹的内容"""
+        for _ in self.walk(folder):
+            pass
+    
+    def trim(self, keep=None):
+        """已加载的文件夹超过上限时，卸载最久未打开的文件夹内容（keep及其上级文件夹除外）"""
+        if self.loader is None or len(self.loaded) <= self.MAX_LOADED_FOLDERS:
+            return
+        pinned = [self.nodes[folder_id] for folder_id in self.pinned if folder_id in self.nodes]
+        if keep is not None:
+            pinned.append(keep)
+        for folder_id in list(self.loaded):
+            if len(self.loaded) <= self.MAX_LOADED_FOLDERS:
+                break
+            # 已随上级文件夹一起卸载
+            folder = self.nodes.get(folder_id)
+            if folder is None or folder_id not in self.loaded:
+                continue
+            if any(self.is_inside(node, folder) for node in pinned):
+                continue
+            if self.evictable is not None and not self.evictable(folder_id):
+                continue
+            self.evict(folder)
+    
+    def evict(self, folder):
+        """卸载文件夹的内容，下次访问时重新加载"""
+        folder_id = folder["id"]
+        removed = list(self.walk(folder, load=False))
+        parents = {node["id"]: self.parents[node["id"]] for node in removed}
+        for node in removed:
+            node_id = node["id"]
+            del self.nodes[node_id]
+            del self.parents[node_id]
+            self.children.pop(node_id, None)
+            self.unloaded.discard(node_id)
+            self.loaded.pop(node_id, None)
+        self.children[folder_id] = {}
+        self.unloaded.add(folder_id)
+        self.loaded.pop(folder_id, None)
+        for listener in self.listeners:
+            listener.tools_evicted(removed, parents)
+    
+    def pin(self, folder):
+        """文件夹窗口打开期间不卸载其内容"""
+        self.pinned[folder["id"]] = self.pinned.get(folder["id"], 0) + 1
+    
+    def unpin(self, folder):
+        count = self.pinned.get(folder["id"], 0) - 1
+        if count > 0:
+            self.pinned[folder["id"]] = count
+        else:
+            self.pinned.pop(folder["id"], None)
+    
+    def get(self, tool_id):
+        """按ID查找工具"""
+        return self.nodes.get(tool_id)
+    
+    def __contains__(self, tool):
+        return tool.get("id") in self.nodes
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def parent(self, tool):
+        """获取工具所在的文件夹，顶层工具返回None"""
+        folder_id = self.parents.get(tool.get("id"))
+        if folder_id is None:
+            return None
+        return self.nodes[folder_id]
+    
+    def children_of(self, folder=None):
+        """获取文件夹（默认顶层）中的工具列表"""
+        folder_id = folder["id"] if folder is not None else None
+        if folder_id in self.unloaded:
+            self.ensure_loaded(folder_id)
+        elif folder_id in self.loaded:
+            self.loaded.move_to_end(folder_id)
+        self.trim(folder)
+        return list(self.children.get(folder_id, {}).values())
+    
+    def walk(self, folder=None, load=True):
+        """遍历文件夹（默认顶层）下的所有工具，load为False时跳过尚未加载的文件夹内容"""
+        folder_id = folder["id"] if folder is not None else None
+        stack = [folder_id]
+        while stack:
+            folder_id = stack.pop()
+            if load:
+                self.ensure_loaded(folder_id)
+            for child_id, child in self.children.get(folder_id, {}).items():
+                yield child
+                if child_id in self.children:
+                    stack.append(child_id)
+    
+    def add(self, tool, folder=None):
+        """添加工具到文件夹（默认顶层），返回工具记录"""
+        folder_id = folder["id"] if folder is not None else None
+        self.ensure_loaded(folder_id)
+        tool = self.insert(tool, folder_id)
+        self.changed.add(folder_id)
+        return tool
+    
+    def remove(self, tool):
+        """删除工具（文件夹连同其中的工具），返回被删除的所有工具"""
+        tool_id = tool["id"]
+        removed = [tool] + list(self.walk(tool))
+        del self.children[self.parents[tool_id]][tool_id]
+        self.changed.add(self.parents[tool_id])
+        for node in removed:
+            node_id = node["id"]
+            del self.nodes[node_id]
+            del self.parents[node_id]
+            self.children.pop(node_id, None)
+            self.loaded.pop(node_id, None)
+        return removed
+    
+    def move(self, tool, folder=None):
+        """移动工具到另一个文件夹（默认顶层）"""
+        tool_id = tool["id"]
+        folder_id = folder["id"] if folder is not None else None
+        if folder is not None and self.is_inside(folder, tool):
+            raise ValueError("不能将文件夹移动到自身或其子文件夹中")
+        self.ensure_loaded(folder_id)
+        del self.children[self.parents[tool_id]][tool_id]
+        self.children[folder_id][tool_id] = tool
+        self.changed.add(self.parents[tool_id])
+        self.changed.add(folder_id)
+        self.parents[tool_id] = folder_id
+    
+    def make_folder(self, tool):
+        """工具改为文件夹类型"""
+        if tool["id"] not in self.children:
+            self.children[tool["id"]] = {}
+            self.changed.add(tool["id"])
+    
+    def make_tool(self, tool):
+        """文件夹改为普通工具，删除其中的工具，返回被删除的工具"""
+        removed = []
+        for child in self.children_of(tool):
+            removed.extend(self.remove(child))
+        self.children.pop(tool["id"], None)
+        self.loaded.pop(tool["id"], None)
+        return removed
+    
+    def is_inside(self, node, folder):
+        """判断node是否为folder本身或位于folder中（folder为None表示顶层）"""
+        if folder is None:
+            return True
+        folder_id = folder["id"]
+        node_id = node["id"] if node is not None else None
+        while node_id is not None:
+            if node_id == folder_id:
+                return True
+            node_id = self.parents.get(node_id)
+        return False
+    
+    def path(self, tool, root=None):
+        """获取工具所在的文件夹路径（从root下一级开始的文件夹名称列表）"""
+        root_id = root["id"] if root is not None else None
+        names = []
+        folder_id = self.parents.get(tool["id"])
+        while folder_id is not None and folder_id != root_id:
+            folder = self.nodes[folder_id]
+            names.append(folder["name"])
+            folder_id = self.parents.get(folder_id)
+        names.reverse()
+        return names
+    
+    def to_json(self, folder_id=None):
+        """转换为ai_tools.json的嵌套列表格式"""
+        result = []
+        for child_id, child in self.children.get(folder_id, {}).items():
+            item = child.to_dict()
+            if child_id in self.children:
+                item["children"] = self.to_json(child_id)
+            result.append(item)
+        return result
+
+class ToolSearchIndex:
+    """工具搜索索引，对小写后的名称、描述、功能和URL建立一元、二元和三元组倒排索引
+    
+    按需加载的目录中，尚未加载的文件夹内容在分批建立索引时通过loader读取（不加入工具目录），
+    文件夹内容卸载后仍保留在索引中；搜索时只加载包含匹配工具的文件夹
+    """
+    SEARCH_FIELDS = Tool.SEARCH_FIELDS
+    
+    def __init__(self, catalog):
+        self.catalog = catalog
+        catalog.listeners.append(self)
+        self.clear()
+    
+    def clear(self):
+        """清空索引"""
+        # 文档编号 -> (工具ID, 小写搜索文本, 所在文件夹ID)，删除后置为None；
+        # 所在文件夹ID只用于查找不在内存中的工具
+        self.docs = []
+        # 工具ID -> 文档编号
+        self.doc_ids = {}
+        # 长度1到3的子串 -> 文档编号列表（编号递增追加，删除的文档在查询时跳过）
+        self.postings = {}
+        self.removed = 0
+        # 分批建立索引时尚未加入索引的(工具, 所在文件夹ID)
+        self.pending = None
+        # 建立索引期间搜索时一次读出的剩余部分（pending从中依次取出），以及其中工具所在的文件夹ID
+        self.tail = None
+        self.tail_parents = {}
+    
+    @staticmethod
+    def search_text(tool):
+        """工具的小写搜索文本（工具记录中缓存）"""
+        return tool.search_key
+    
+    def rebuild(self, incremental=False):
+        """根据工具目录重建索引（包含尚未加载的文件夹内容）
+        
+        incremental为True时只记下要索引的工具，由build_step分批建立，建立完成前搜索时逐个检查剩余部分
+        """
+        self.clear()
+        self.pending = self.collect()
+        if not incremental:
+            self.finish()
+    
+    def collect(self):
+        """依次产生要索引的(工具, 所在文件夹ID)：先是已加载的工具，再是通过loader读取的未加载文件夹内容"""
+        catalog = self.catalog
+        parents = catalog.parents
+        for tool in list(catalog.walk(load=False)):
+            yield tool, parents.get(tool["id"])
+        stack = list(catalog.unloaded)
+        while stack:
+            folder_id = stack.pop()
+            # 已经加载的文件夹由tools_loaded加入索引
+            if catalog.loader is None or (folder_id in catalog.nodes and folder_id not in catalog.unloaded):
+                continue
+            items = [(tool, folder_id) for tool in catalog.loader(folder_id)]
+            while items:
+                tool, parent_id = items.pop()
+                children = None
+                if not isinstance(tool, Tool):
+                    tool = dict(tool)
+                    children = tool.pop("children", None)
+                    tool = Tool.from_dict(tool)
+                yield tool, parent_id
+                if children is not None:
+                    items.extend((child, tool["id"]) for child in children)
+                elif tool.is_folder:
+                    stack.append(tool["id"])
+    
+    def build_step(self, count=2000):
+        """继续分批建立索引，返回是否已全部完成"""
+        if self.pending is None:
+            return True
+        nodes = self.catalog.nodes
+        processed = 0
+        for tool, parent_id in islice(self.pending, count):
+            processed += 1
+            # 跳过建立索引期间已删除或已单独加入索引的工具
+            tool_id = tool.get("id")
+            if tool_id and tool_id not in self.doc_ids and nodes.get(tool_id, tool) is tool:
+                self.add(tool, parent_id)
+        if processed < count:
+            self.pending = self.tail = None
+            self.tail_parents = {}
+            return True
+        return False
+    
+    def finish(self):
+        """建立完剩余的索引"""
+        while not self.build_step(len(self.catalog) + 1):
+            pass
+    
+    def pending_tools(self):
+        """尚未加入索引的(工具, 所在文件夹ID)列表"""
+        if self.pending is None:
+            return ()
+        if self.tail is None:
+            self.tail = deque(self.pending)
+            self.tail_parents = {tool.get("id"): parent_id for tool, parent_id in self.tail}
+            self.pending = self.drain(self.tail)
+        return self.tail
+    
+    @staticmethod
+    def drain(queue):
+        while queue:
+            yield queue.popleft()
+    
+    def tools_loaded(self, tools):
+        """文件夹内容按需加载后加入索引（替换读取未加载文件夹时建立的条目）"""
+        for tool in tools:
+            self.add(tool)
+    
+    def tools_evicted(self, tools, parents):
+        """文件夹内容卸载后保留在索引中，记下卸载时所在的文件夹，搜索到时再加载"""
+        docs = self.docs
+        for tool in tools:
+            doc = self.doc_ids.get(tool["id"])
+            if doc is not None:
+                docs[doc] = (tool["id"], docs[doc][1], parents.get(tool["id"]))
+    
+    def add(self, tool, parent_id=MISSING):
+        """添加工具到索引（默认所在文件夹为工具目录中的文件夹）"""
+        if parent_id is MISSING:
+            parent_id = self.catalog.parents.get(tool["id"])
+        self.add_doc(tool["id"], self.search_text(tool), parent_id)
+    
+    def add_doc(self, tool_id, text, parent_id):
+        if tool_id in self.doc_ids:
+            self.remove_doc(tool_id)
+        doc = len(self.docs)
+        self.docs.append((tool_id, text, parent_id))
+        self.doc_ids[tool_id] = doc
+        postings = self.postings
+        # 单字和双字也建立倒排表，过短的查询同样不需要扫描所有文档
+        for gram in {text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)}:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = [doc]
+            else:
+                posting.append(doc)
+    
+    def remove(self, tool):
+        """从索引中删除工具"""
+        self.remove_doc(tool["id"])
+    
+    def remove_doc(self, tool_id):
+        doc = self.doc_ids.pop(tool_id, None)
+        if doc is None:
+            return
+        self.docs[doc] = None
+        self.removed += 1
+        # 删除的文档过多时重新压缩索引
+        if self.removed > 1024 and self.removed > len(self.doc_ids):
+            self.compact()
+    
+    def update(self, tool):
+        """工具内容修改后更新索引"""
+        self.remove(tool)
+        self.add(tool)
+    
+    def compact(self):
+        """去掉已删除的文档，重建倒排表"""
+        entries = [entry for entry in self.docs if entry is not None]
+        pending, tail, tail_parents = self.pending, self.tail, self.tail_parents
+        self.clear()
+        for entry in entries:
+            self.add_doc(*entry)
+        self.pending, self.tail, self.tail_parents = pending, tail, tail_parents
+    
+    def match(self, search_text):
+        """查找匹配小写搜索文本的所有工具，返回(工具ID, 所在文件夹ID)列表"""
+        docs = self.docs
+        if not search_text:
+            candidates = range(len(docs))
+        elif len(search_text) < 3:
+            # 单字和双字查询直接使用对应的倒排表
+            candidates = self.postings.get(search_text, ())
+        else:
+            # 从最短的倒排表开始，再用子串匹配校验
+            candidates = None
+            for i in range(len(search_text) - 2):
+                posting = self.postings.get(search_text[i:i + 3])
+                if posting is None:
+                    candidates = ()
+                    break
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+        
+        results = []
+        for doc in candidates:
+            entry = docs[doc]
+            if entry is not None and search_text in entry[1]:
+                results.append((entry[0], entry[2]))
+        # 索引还没建立完时，不在GUI线程中等待建立完，剩余部分直接逐个匹配
+        doc_ids = self.doc_ids
+        nodes = self.catalog.nodes
+        for tool, parent_id in self.pending_tools():
+            tool_id = tool.get("id")
+            if tool_id and tool_id not in doc_ids and nodes.get(tool_id, tool) is tool and search_text in self.search_text(tool):
+                results.append((tool_id, parent_id))
+        return results
+    
+    def parent_id(self, tool_id, parent_id=MISSING):
+        """工具所在的文件夹ID：在内存中时取自工具目录，否则取自索引；未知时返回MISSING"""
+        catalog = self.catalog
+        if tool_id in catalog.nodes:
+            return catalog.parents[tool_id]
+        if parent_id is MISSING:
+            doc = self.doc_ids.get(tool_id)
+            if doc is None:
+                return self.tail_parents.get(tool_id, MISSING)
+            parent_id = self.docs[doc][2]
+        return parent_id
+    
+    def ancestors(self, tool_id, parent_id=MISSING):
+        """工具所在的文件夹及其上级文件夹ID（由近到远，不包含顶层）；路径中有未知的文件夹时返回None"""
+        chain = []
+        folder_id = self.parent_id(tool_id, parent_id)
+        while folder_id is not None:
+            if folder_id is MISSING or folder_id in chain:
+                return None
+            chain.append(folder_id)
+            folder_id = self.parent_id(folder_id)
+        return chain
+    
+    def resolve(self, tool_id, chain):
+        """加载工具所在的文件夹（由上到下），返回工具记录；工具已不存在时从索引中删除并返回None"""
+        catalog = self.catalog
+        tool = catalog.get(tool_id)
+        if tool is None:
+            for folder_id in reversed(chain):
+                if folder_id not in catalog.nodes:
+                    break
+                catalog.ensure_loaded(folder_id)
+            tool = catalog.get(tool_id)
+            if tool is None:
+                self.remove_doc(tool_id)
+        return tool
+    
+    def search(self, search_text, folder=None, recursive=False):
+        """查找文件夹（默认顶层）中匹配搜索文本的工具，recursive为True时包含所有子文件夹"""
+        with tracer.span("search", text=search_text, recursive=recursive):
+            return self.search_tools(search_text, folder, recursive)
+    
+    def search_tools(self, search_text, folder, recursive):
+        folder_id = folder["id"] if folder is not None else None
+        if not recursive:
+            self.catalog.ensure_loaded(folder_id)
+        results = []
+        for tool_id, parent_id in self.match(search_text.lower()):
+            chain = self.ancestors(tool_id, parent_id)
+            if chain is None:
+                continue
+            if recursive:
+                if folder_id is not None and folder_id not in chain:
+                    continue
+            elif (chain[0] if chain else None) != folder_id:
+                continue
+            # 只加载包含匹配工具的文件夹
+            tool = self.resolve(tool_id, chain)
+            if tool is not None:
+                results.append(tool)
+        return results
+    
+    def search_paths(self, tools, root=None):
+        """获取搜索结果的文件夹路径，root下一级的工具不包含在结果中"""
+        paths = {}
+        for tool in tools:
+            names = self.catalog.path(tool, root)
+            if names:
+                paths[tool_key(tool)] = " / ".join(names)
+        return paths
+
+class FtsSearchIndex(ToolSearchIndex):
+    """使用SQLite FTS5全文索引的搜索，索引随存储的修改一起更新，不占用内存"""
+    def __init__(self, catalog, store):
+        self.store = store
+        super().__init__(catalog)
+    
+    def rebuild(self, incremental=False):
+        pass
+    
+    def add(self, tool):
+        pass
+    
+    def remove(self, tool):
+        pass
+    
+    def update(self, tool):
+        pass
+    
+    def match(self, search_text):
+        """查找匹配小写搜索文本的所有工具，返回(工具ID, 所在文件夹ID)列表"""
+        results = []
+        for tool_id, parent_id in self.store.search_ids(search_text):
+            tool = self.catalog.get(tool_id)
+            # 已加载的工具按内存中的内容校验（全文索引只对ASCII字母忽略大小写）
+            if tool is None or search_text in self.search_text(tool):
+                results.append((tool_id, parent_id))
+        return results
+    
+    def parent_id(self, tool_id, parent_id=MISSING):
+        """工具所在的文件夹ID：在内存中时取自工具目录，否则取自数据库"""
+        if tool_id in self.catalog.nodes:
+            return self.catalog.parents[tool_id]
+        if parent_id is MISSING:
+            return self.store.parent_of(tool_id)
+        return parent_id
+
+class BinaryCatalog:
+    """二进制工具目录（ai_tools.bzc）的只读视图，文件内存映射后按需解码工具
+    
+    文件结构：文件头 | 定长记录 | 字符串偏移表 | UTF-8字符串数据
+    记录按层序排列，每个文件夹的子工具是连续的一段记录，顶层工具为最前面的root_count条记录；
+    字段以字符串编号保存，相同的字符串只存一份，编号0表示没有该字段
+    """
+    MAGIC = b"BZC1"
+    VERSION = 1
+    # 标识、版本、记录数、顶层工具数、字符串数、来源JSON文件的修改时间和大小
+    HEADER = struct.Struct("<4sHxxIIIQQ")
+    # 标志、第一个子工具的记录编号、子工具数、各字段的字符串编号
+    RECORD = struct.Struct("<BxxxII8I")
+    FIELDS = ("id", "type", "name", "description", "features", "url", "icon_path")
+    # 记录标志：包含子工具列表
+    HAS_CHILDREN = 1
+    
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.record_count, self.root_count, string_count, mtime_ns, size = self.HEADER.unpack_from(self.data, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError("不支持的工具目录格式")
+            self.stamp = (mtime_ns, size)
+            self.records_offset = self.HEADER.size
+            self.strings_offset = self.records_offset + self.record_count * self.RECORD.size
+            self.blob_offset = self.strings_offset + (string_count + 1) * 4
+            if self.blob_offset > len(self.data):
+                raise ValueError("工具目录文件不完整")
+        except (ValueError, struct.error):
+            self.data.close()
+            raise
+    
+    def close(self):
+        self.data.close()
+    
+    def string(self, index):
+        """按编号解码字符串"""
+        start, end = struct.unpack_from("<II", self.data, self.strings_offset + (index - 1) * 4)
+        return self.data[self.blob_offset + start:self.blob_offset + end].decode('utf-8')
+    
+    def record(self, index):
+        """解码一条记录，返回(工具, 子工具的记录编号范围)，子工具不解码"""
+        flags, first_child, child_count, *fields = self.RECORD.unpack_from(self.data, self.records_offset + index * self.RECORD.size)
+        tool = {}
+        for name, string_index in zip(self.FIELDS, fields):
+            if string_index:
+                tool[name] = self.string(string_index)
+        if fields[-1]:
+            tool.update(json.loads(self.string(fields[-1])))
+        children = range(first_child, first_child + child_count) if flags & self.HAS_CHILDREN else None
+        return tool, children
+    
+    def to_json(self, indexes=None):
+        """导出为ai_tools.json的嵌套列表格式"""
+        result = []
+        for index in indexes if indexes is not None else range(self.root_count):
+            tool, children = self.record(index)
+            if children is not None:
+                tool["children"] = self.to_json(children)
+            result.append(tool)
+        return result
+
+def write_binary_catalog(file_path, tools, stamp=(0, 0)):
+    """将ai_tools.json格式的嵌套工具列表写入二进制工具目录，stamp为来源JSON文件的(修改时间, 大小)"""
+    fields = BinaryCatalog.FIELDS
+    string_ids = {}
+    blob = bytearray()
+    offsets = []
+    
+    def intern(value):
+        index = string_ids.get(value)
+        if index is None:
+            encoded = value.encode('utf-8')
+            offsets.append(len(blob))
+            blob.extend(encoded)
+            index = string_ids[value] = len(offsets)
+        return index
+    
+    # 按层序排列，使每个文件夹的子工具位于连续的记录中
+    order = list(tools)
+    records = bytearray()
+    index = 0
+    while index < len(order):
+        tool = order[index]
+        children = tool.get("children")
+        first_child = len(order)
+        if children is not None:
+            order.extend(children)
+        values = []
+        extra = {}
+        for name in fields:
+            value = tool.get(name)
+            if isinstance(value, str):
+                values.append(intern(value))
+            else:
+                values.append(0)
+                if name in tool:
+                    extra[name] = value
+        for name, value in tool.items():
+            if name not in fields and name != "children":
+                extra[name] = value
+        values.append(intern(json.dumps(extra, ensure_ascii=False)) if extra else 0)
+        records += BinaryCatalog.RECORD.pack(
+            BinaryCatalog.HAS_CHILDREN if children is not None else 0,
+            first_child, len(children) if children is not None else 0, *values
+        )
+        index += 1
+    
+    offsets.append(len(blob))
+    content = bytearray(BinaryCatalog.HEADER.pack(
+        BinaryCatalog.MAGIC, BinaryCatalog.VERSION, len(order), len(tools), len(offsets) - 1, *stamp
+    ))
+    content += records
+    content += struct.pack(f"<{len(offsets)}I", *offsets)
+    content += blob
+    write_file_atomic(file_path, bytes(content))
+
+class JsonCatalogStore(QObject):
+    """JSON文件存储（ai_tools.json），每次修改都在后台重写整个文件"""
+    error = pyqtSignal(str)
+    saver_class = CatalogSaver
+    
+    def __init__(self, data_file, catalog, parent=None):
+        super().__init__(parent)
+        self.data_file = data_file
+        self.catalog = catalog
+        # 后台保存工具目录
+        self.saver = self.saver_class(data_file, self.snapshot, parent=self)
+        self.saver.error.connect(self.error)
+    
+    def snapshot(self):
+        """获取保存用的目录快照（在GUI线程中调用）"""
+        return self.catalog.to_json()
+    
+    def load(self):
+        """从数据文件加载工具目录"""
+        if not os.path.exists(self.data_file):
+            return
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            tools = json.load(f)
+        # 旧数据文件中的工具分配ID后写回
+        if self.catalog.load(tools):
+            self.save_all()
+    
+    def create_search_index(self):
+        """创建搜索索引"""
+        return ToolSearchIndex(self.catalog)
+    
+    def save_all(self):
+        """保存整个工具目录"""
+        self.saver.schedule()
+    
+    def tool_added(self, tool):
+        self.save_all()
+    
+    def tool_updated(self, tool):
+        self.save_all()
+    
+    def tool_moved(self, tool):
+        self.save_all()
+    
+    def tools_removed(self, tools):
+        self.save_all()
+    
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        self.saver.flush()
+    
+    def close(self):
+        """写入所有修改并结束后台保存线程"""
+        self.saver.stop()
+
+class JournalCatalogStore(JsonCatalogStore):
+    """日志存储：ai_tools.json作为快照，每次修改只向日志文件追加一条记录，日志过大时在后台合并为新快照
+    
+    崩溃恢复：启动时依次重放快照、旧日志（合并未完成时残留）和当前日志；日志末尾写入不完整的记录会被忽略，
+    重放操作是幂等的，因此快照已写入但旧日志尚未删除时重复重放也不会出错。
+    """
+    # 日志超过该大小时合并为新快照
+    COMPACT_BYTES = 256 * 1024
+    
+    def __init__(self, data_file, catalog, parent=None):
+        super().__init__(data_file, catalog, parent)
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        # 合并期间已写入快照的日志
+        self.old_journal_file = self.journal_file + ".old"
+        self.journal = None
+        self.compacting = False
+        self.saver.saved.connect(self.on_compacted)
+        self.saver.error.connect(self.on_compact_error)
+    
+    def load(self):
+        """加载快照并重放日志"""
+        tools = []
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                tools = json.load(f)
+        assigned = self.catalog.load(tools)
+        for journal_file in (self.old_journal_file, self.journal_file):
+            self.replay(journal_file)
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        # 旧数据文件中的工具分配了新ID、或上次合并未完成时重新合并
+        if assigned or os.path.exists(self.old_journal_file) or self.journal_size() > self.COMPACT_BYTES:
+            self.compact()
+    
+    def replay(self, journal_file):
+        """重放日志文件中的修改记录"""
+        if not os.path.exists(journal_file):
+            return
+        with open(journal_file, 'rb+') as f:
+            valid = 0
+            for line in f:
+                try:
+                    # 没有换行符的记录也是写入不完整的（之后追加的记录会接在同一行）
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # 崩溃时写入不完整的最后一条记录，截掉以免之后追加的记录无法读取
+                    f.truncate(valid)
+                    break
+                self.apply(record)
+                valid += len(line)
+    
+    def apply(self, record):
+        """将一条修改记录应用到工具目录（重复应用结果相同）"""
+        catalog = self.catalog
+        op = record.get("op")
+        if op == "add" or op == "update":
+            data = record["tool"]
+            tool = catalog.get(data["id"])
+            if tool is None:
+                parent = catalog.get(record.get("parent"))
+                catalog.add(dict(data), parent if parent is not None and parent["id"] in catalog.children else None)
+                return
+            # 原地更新，保持工具对象不变
+            tool.clear()
+            tool.update(data)
+            if tool.is_folder:
+                catalog.make_folder(tool)
+            else:
+                catalog.make_tool(tool)
+        elif op == "remove":
+            for tool_id in record["ids"]:
+                tool = catalog.get(tool_id)
+                if tool is not None:
+                    catalog.remove(tool)
+        elif op == "move":
+            tool = catalog.get(record["id"])
+            parent = catalog.get(record.get("parent"))
+            if tool is not None:
+                try:
+                    catalog.move(tool, parent)
+                except (ValueError, KeyError):
+                    pass
+    
+    def append(self, record):
+        """向日志追加一条记录并同步到磁盘，日志过大时合并"""
+        try:
+            self.journal.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+        except OSError as e:
+            self.error.emit(f"保存失败: {str(e)}")
+            return
+        if not self.compacting and self.journal_size() > self.COMPACT_BYTES:
+            self.compact()
+    
+    def journal_size(self):
+        """当前日志的大小"""
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+    
+    def compact(self):
+        """将当前工具目录写入新快照（后台进行），完成后删除已合并的日志"""
+        if self.compacting:
+            return
+        self.compacting = True
+        # 当前日志转为旧日志，之后的修改写入新日志
+        self.journal.close()
+        if os.path.exists(self.old_journal_file):
+            # 上次合并失败残留的旧日志，追加到其末尾
+            with open(self.journal_file, 'r', encoding='utf-8') as src, \
+                    open(self.old_journal_file, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_file)
+        elif os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.old_journal_file)
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+        # 快照与日志转换在同一时刻获取，之后的修改都在新日志中
+        self.saver.save_now()
+    
+    def on_compacted(self):
+        """新快照写入完成"""
+        if self.compacting:
+            self.compacting = False
+            if os.path.exists(self.old_journal_file):
+                os.remove(self.old_journal_file)
+    
+    def on_compact_error(self, error_msg):
+        """新快照写入失败，旧日志保留到下次合并"""
+        self.compacting = False
+    
+    def parent_id(self, tool):
+        parent = self.catalog.parent(tool)
+        return parent["id"] if parent is not None else None
+    
+    def save_all(self):
+        self.compact()
+    
+    def tool_added(self, tool):
+        self.append({"op": "add", "parent": self.parent_id(tool), "tool": tool.to_dict()})
+    
+    def tool_updated(self, tool):
+        self.append({"op": "update", "tool": tool.to_dict()})
+    
+    def tool_moved(self, tool):
+        self.append({"op": "move", "id": tool["id"], "parent": self.parent_id(tool)})
+    
+    def tools_removed(self, tools):
+        if tools:
+            self.append({"op": "remove", "ids": [tool["id"] for tool in tools]})
+    
+    def close(self):
+        """写入所有修改并关闭日志"""
+        super().close()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+class ShardedCatalogStore(QObject):
+    """按文件夹分片的存储：catalog/manifest.json保存顶层工具，catalog/folders/<文件夹ID>.json保存文件夹中的工具
+    
+    子文件夹在上级分片中只保存自身的字段，内容在第一次打开时才读取，
+    因此启动时间和内存只与顶层工具的数量有关；修改只重新写入受影响的分片，保存耗时与目录大小无关
+    """
+    error = pyqtSignal(str)
+    VERSION = 1
+    
+    def __init__(self, catalog_dir, json_file, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog_dir = catalog_dir
+        self.folder_dir = os.path.join(catalog_dir, "folders")
+        self.manifest_file = os.path.join(catalog_dir, "manifest.json")
+        # 迁移用的ai_tools.json
+        self.json_file = json_file
+        self.catalog = catalog
+        # 工具字段有修改、需要重新写入的分片（文件夹ID，顶层为None）
+        self.dirty = set()
+        # 已删除、需要删除分片文件的文件夹ID
+        self.deleted = set()
+        os.makedirs(self.folder_dir, exist_ok=True)
+        self.saver = ShardSaver(self.manifest_file, self.snapshot, parent=self)
+        self.saver.error.connect(self.error)
+        # 有尚未写入的修改时不卸载文件夹内容
+        catalog.evictable = self.evictable
+    
+    def load(self):
+        """读取根清单，文件夹内容按需加载；没有清单时从ai_tools.json迁移"""
+        if not os.path.exists(self.manifest_file):
+            self.migrate()
+            return
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if self.catalog.load(manifest.get("tools", []), self.read_shard):
+            self.save_all()
+    
+    def migrate(self):
+        """将ai_tools.json中的工具目录拆分为分片"""
+        tools = []
+        if os.path.exists(self.json_file):
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                tools = json.load(f)
+        self.catalog.load(tools)
+        self.catalog.loader = self.read_shard
+        self.save_all()
+        self.flush()
+    
+    def shard_file(self, folder_id):
+        return os.path.join(self.folder_dir, f"{folder_id}.json")
+    
+    def read_shard(self, folder_id):
+        """读取文件夹中的工具（不包含子文件夹的内容）"""
+        try:
+            with open(self.shard_file(folder_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            self.error.emit(f"加载文件夹失败: {str(e)}")
+            return []
+    
+    def evictable(self, folder_id):
+        """文件夹及其已加载的子文件夹都没有尚未写入的修改时才能卸载"""
+        # 提交快照时已清除修改标记，分片写入完成前卸载会从旧的分片重新读取
+        if self.saver.busy():
+            return False
+        dirty = self.dirty | self.catalog.changed
+        if not dirty:
+            return True
+        if folder_id in dirty:
+            return False
+        folder = self.catalog.get(folder_id)
+        return not any(tool["id"] in dirty for tool in self.catalog.walk(folder, load=False))
+    
+    def depth(self, folder_id):
+        """文件夹的层级（顶层为0）"""
+        depth = 0
+        while folder_id is not None:
+            folder_id = self.catalog.parents.get(folder_id)
+            depth += 1
+        return depth
+    
+    def snapshot(self):
+        """获取修改过的分片（在GUI线程中调用）"""
+        catalog = self.catalog
+        dirty = self.dirty | catalog.changed
+        self.dirty = set()
+        catalog.changed.clear()
+        files = []
+        # 子文件夹的分片先于上级写入，根清单最后写入
+        for folder_id in sorted(dirty - {None}, key=self.depth, reverse=True):
+            children = catalog.children.get(folder_id)
+            if children is not None and folder_id not in catalog.unloaded:
+                files.append((self.shard_file(folder_id), [child.to_dict() for child in children.values()]))
+        if None in dirty:
+            files.append((self.manifest_file, {
+                "version": self.VERSION,
+                "tools": [child.to_dict() for child in catalog.children[None].values()],
+            }))
+        deleted = [self.shard_file(folder_id) for folder_id in self.deleted if folder_id not in catalog.children]
+        self.deleted.clear()
+        return files, deleted
+    
+    def create_search_index(self):
+        """创建搜索索引"""
+        return ToolSearchIndex(self.catalog)
+    
+    def save_all(self):
+        """重新写入所有已加载的分片"""
+        catalog = self.catalog
+        self.dirty.update(folder_id for folder_id in catalog.children if folder_id not in catalog.unloaded)
+        self.saver.schedule()
+    
+    def tool_added(self, tool):
+        # 所在文件夹已由工具目录标记为修改
+        self.saver.schedule()
+    
+    def tool_updated(self, tool):
+        self.dirty.add(self.catalog.parents.get(tool["id"]))
+        # 文件夹改为普通工具后删除其分片
+        if tool["id"] not in self.catalog.children:
+            self.deleted.add(tool["id"])
+        self.saver.schedule()
+    
+    def tool_moved(self, tool):
+        self.saver.schedule()
+    
+    def tools_removed(self, tools):
+        for tool in tools:
+            if tool.is_folder:
+                self.deleted.add(tool["id"])
+        self.saver.schedule()
+    
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        self.saver.flush()
+    
+    def close(self):
+        """写入所有修改并结束后台保存线程"""
+        self.saver.stop()
+
+class BinarySaver(CatalogSaver):
+    """写入ai_tools.json后同时生成对应的二进制工具目录"""
+    def write(self, data):
+        write_json_atomic(self.data_file, data)
+        stat = os.stat(self.data_file)
+        write_binary_catalog(os.path.splitext(self.data_file)[0] + ".bzc", data, (stat.st_mtime_ns, stat.st_size))
+
+class BinaryCatalogStore(JsonCatalogStore):
+    """ai_tools.json加二进制副本ai_tools.bzc：启动时内存映射二进制文件，只解码顶层工具，文件夹内容打开时才解码
+    
+    二进制文件记录了生成时ai_tools.json的修改时间和大小，JSON被修改过时重新从JSON加载；
+    保存时先解码全部工具，再写入JSON和新的二进制文件
+    """
+    saver_class = BinarySaver
+    
+    def __init__(self, data_file, catalog, parent=None):
+        super().__init__(data_file, catalog, parent)
+        self.binary_file = os.path.splitext(data_file)[0] + ".bzc"
+        self.binary = None
+        # 文件夹ID -> 记录中子工具的编号范围
+        self.child_records = {}
+        # 有尚未保存的修改时不卸载文件夹内容（卸载后会从旧的二进制文件重新解码）
+        catalog.evictable = lambda folder_id: not self.saver.busy()
+    
+    def load(self):
+        """优先从二进制文件加载，没有或已过期时从JSON加载并生成二进制文件"""
+        try:
+            self.binary = BinaryCatalog(self.binary_file)
+        except (OSError, ValueError):
+            self.binary = None
+        if self.binary is not None:
+            try:
+                stat = os.stat(self.data_file)
+                current = self.binary.stamp == (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                current = False
+            if current:
+                self.catalog.load(self.read_records(range(self.binary.root_count)), self.read_folder)
+                return
+            self.close_binary()
+        super().load()
+        # 生成二进制文件供下次启动使用
+        self.save_all()
+    
+    def read_records(self, indexes):
+        """解码一段记录，记下文件夹的子工具范围"""
+        tools = []
+        for index in indexes:
+            tool, children = self.binary.record(index)
+            if children is not None:
+                if tool.get("type", "tool") == "folder":
+                    self.child_records[tool["id"]] = children
+                else:
+                    # 带子工具的普通工具不会被打开，直接解码其子工具
+                    tool["children"] = self.binary.to_json(children)
+            tools.append(tool)
+        return tools
+    
+    def read_folder(self, folder_id):
+        """按需解码文件夹中的工具（保留编号范围，文件夹内容卸载后可以再次解码）"""
+        children = self.child_records.get(folder_id)
+        if children is None or self.binary is None:
+            return []
+        return self.read_records(children)
+    
+    def close_binary(self):
+        """解除内存映射（替换二进制文件前需要先关闭）"""
+        if self.binary is not None:
+            self.binary.close()
+            self.binary = None
+        self.child_records.clear()
+    
+    def snapshot(self):
+        """解码全部工具后获取目录快照，之后不再需要内存映射"""
+        if self.binary is not None:
+            self.catalog.load_all()
+            self.catalog.loader = None
+            self.close_binary()
+        return self.catalog.to_json()
+    
+    def close(self):
+        super().close()
+        self.close_binary()
+
+class SqliteCatalogStore(QObject):
+    """SQLite存储（ai_tools.db），修改只写入相关的行，并使用FTS5全文索引搜索
+    
+    启动时只读取顶层工具，文件夹内容在第一次打开时按parent_id读取
+    """
+    error = pyqtSignal(str)
+    TOOL_FIELDS = ("name", "description", "features", "url", "icon_path")
+    FOLDER_FIELDS = ("name", "description", "features", "icon_path")
+    SEARCH_FIELDS = ("name", "description", "features", "url")
+    
+    def __init__(self, db_file, json_file, catalog, parent=None):
+        super().__init__(parent)
+        self.db_file = db_file
+        # 首次使用时从该JSON文件迁移数据
+        self.json_file = json_file
+        self.catalog = catalog
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+        # 全局递增序号：同一文件夹中按序号排列，同时作为全文索引的rowid
+        row = self.conn.execute(
+            "SELECT MAX(seq) FROM (SELECT seq FROM tools UNION ALL SELECT seq FROM folders)"
+        ).fetchone()
+        self.next_seq = (row[0] or 0) + 1
+    
+    def create_tables(self):
+        """创建数据表"""
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS folders ("
+                "id TEXT PRIMARY KEY, parent_id TEXT, seq INTEGER NOT NULL, "
+                "name TEXT NOT NULL, description TEXT, features TEXT, icon_path TEXT, extra TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tools ("
+                "id TEXT PRIMARY KEY, parent_id TEXT, seq INTEGER NOT NULL, "
+                "name TEXT NOT NULL, description TEXT, features TEXT, url TEXT, icon_path TEXT, extra TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS folders_parent ON folders(parent_id, seq)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tools_parent ON tools(parent_id, seq)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS tool_search USING fts5("
+                    "id UNINDEXED, name, description, features, url, tokenize='trigram')"
+                )
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite版本过低（不支持FTS5或trigram分词），改用内存搜索索引
+            self.fts = False
+    
+    def load(self):
+        """从数据库加载工具目录，首次使用时从ai_tools.json迁移"""
+        migrated = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+        if migrated is None:
+            self.migrate()
+            return
         
-        return None
+        # 文件夹内容按需加载
+        self.catalog.load(self.read_folder(None), self.read_folder)
+    
+    def read_folder(self, folder_id):
+        """读取文件夹（None为顶层）中的工具，按序号排列，不包含子文件夹的内容"""
+        if self.conn is None:
+            return []
+        condition = "parent_id IS ?"
+        if folder_id is None:
+            # 所在文件夹不存在的工具放到顶层
+            condition += " OR parent_id NOT IN (SELECT id FROM folders)"
+        rows = []
+        for row in self.conn.execute(
+            "SELECT id, parent_id, seq, name, description, features, icon_path, extra FROM folders WHERE " + condition, (folder_id,)
+        ):
+            rows.append((row[2], self.row_to_tool(row, "folder", self.FOLDER_FIELDS)))
+        for row in self.conn.execute(
+            "SELECT id, parent_id, seq, name, description, features, url, icon_path, extra FROM tools WHERE " + condition, (folder_id,)
+        ):
+            rows.append((row[2], self.row_to_tool(row, "tool", self.TOOL_FIELDS)))
+        rows.sort(key=lambda row: row[0])
+        return [tool for _, tool in rows]
+    
+    def migrate(self):
+        """一次性从ai_tools.json迁移数据（保留原JSON文件）"""
+        tools = []
+        if os.path.exists(self.json_file):
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                tools = json.load(f)
+        self.catalog.load(tools)
+        tools = list(self.catalog.walk())
+        def write_migration():
+            # 迁移标记与数据在同一个事务中写入，写入失败时下次启动重新迁移
+            self.write_all(tools)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (os.path.basename(self.json_file),)
+            )
+        self.execute(write_migration)
+    
+    @staticmethod
+    def row_to_tool(row, tool_type, fields):
+        """数据库行转换为工具"""
+        tool = {"id": row[0], "type": tool_type}
+        for field, value in zip(fields, row[3:]):
+            if value is not None:
+                tool[field] = value
+        extra = row[-1]
+        if extra:
+            tool.update(json.loads(extra))
+        return tool
+    
+    def row_values(self, tool, parent_id, seq):
+        """工具转换为数据库行，返回(是否文件夹, 行数据)"""
+        is_folder = tool.is_folder
+        fields = self.FOLDER_FIELDS if is_folder else self.TOOL_FIELDS
+        known = set(fields) | {"id", "type", "children"}
+        extra = {key: value for key, value in tool.items() if key not in known}
+        values = (tool["id"], parent_id, seq) + tuple(tool.get(field, "") for field in fields)
+        return is_folder, values + (json.dumps(extra, ensure_ascii=False) if extra else None,)
+    
+    def write_tool(self, tool, seq):
+        """写入工具所在的行和全文索引"""
+        parent = self.catalog.parent(tool)
+        is_folder, values = self.row_values(tool, parent["id"] if parent is not None else None, seq)
+        if is_folder:
+            self.conn.execute(
+                "INSERT INTO folders (id, parent_id, seq, name, description, features, icon_path, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values
+            )
+        else:
+            self.conn.execute(
+                "INSERT INTO tools (id, parent_id, seq, name, description, features, url, icon_path, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values
+            )
+        if self.fts:
+            self.conn.execute(
+                "INSERT INTO tool_search (rowid, id, name, description, features, url) VALUES (?, ?, ?, ?, ?, ?)",
+                (seq, tool["id"]) + tuple(tool.get(field, "") or "" for field in self.SEARCH_FIELDS)
+            )
+    
+    def delete_tool(self, tool_id):
+        """删除工具所在的行和全文索引，返回原来的序号"""
+        row = self.conn.execute(
+            "SELECT seq FROM tools WHERE id = ? UNION ALL SELECT seq FROM folders WHERE id = ?",
+            (tool_id, tool_id)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("DELETE FROM tools WHERE id = ?", (tool_id,))
+        self.conn.execute("DELETE FROM folders WHERE id = ?", (tool_id,))
+        if self.fts:
+            self.conn.execute("DELETE FROM tool_search WHERE rowid = ?", (row[0],))
+        return row[0]
+    
+    def take_seq(self):
+        """分配新的序号"""
+        seq = self.next_seq
+        self.next_seq += 1
+        return seq
     
-    def download_update(self, asset_url, save_path):
-        """下载更新文件"""
+    def execute(self, operation, *args):
+        """在事务中执行写入，失败时回滚并发出错误信号"""
         try:
-            self.download_progress.emit(0, "准备下载...")
-            response = requests.get(asset_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        progress = int((downloaded / total_size) * 100)
-                        self.download_progress.emit(progress, f"下载中: {progress}%")
-            
-            self.download_complete.emit(save_path)
-        except Exception as e:
-            self.error.emit(f"下载失败: {str(e)}")
+            with self.conn:
+                operation(*args)
+        except sqlite3.Error as e:
+            self.error.emit(f"保存失败: {str(e)}")
+    
+    def create_search_index(self):
+        """创建搜索索引（不支持FTS5时使用内存索引）"""
+        if self.fts:
+            return FtsSearchIndex(self.catalog, self)
+        return ToolSearchIndex(self.catalog)
+    
+    def search_ids(self, search_text):
+        """查找包含搜索文本的工具，返回(工具ID, 所在文件夹ID)列表（不需要加载工具所在的文件夹）"""
+        if len(search_text) >= 3:
+            query = '"' + search_text.replace('"', '""') + '"'
+            return self.conn.execute(
+                "SELECT tool_search.id, COALESCE(tools.parent_id, folders.parent_id) FROM tool_search "
+                "LEFT JOIN tools ON tools.id = tool_search.id LEFT JOIN folders ON folders.id = tool_search.id "
+                "WHERE tool_search MATCH ?", (query,)
+            ).fetchall()
+        # 三元组分词无法匹配过短的查询，在数据库中逐行比较
+        pattern = "%" + search_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        results = []
+        for table, fields in (("folders", ("name", "description", "features")), ("tools", self.SEARCH_FIELDS)):
+            condition = " OR ".join(f"{field} LIKE ? ESCAPE '\\'" for field in fields)
+            results.extend(self.conn.execute(
+                f"SELECT id, parent_id FROM {table} WHERE {condition}", (pattern,) * len(fields)
+            ))
+        return results
+    
+    def parent_of(self, tool_id):
+        """数据库中工具所在的文件夹ID，工具不存在时返回MISSING"""
+        row = self.conn.execute(
+            "SELECT parent_id FROM tools WHERE id = ? UNION ALL SELECT parent_id FROM folders WHERE id = ?",
+            (tool_id, tool_id)
+        ).fetchone()
+        return row[0] if row is not None else MISSING
+    
+    def write_all(self, tools):
+        """清空数据表后写入工具列表（在事务中调用）"""
+        self.conn.execute("DELETE FROM tools")
+        self.conn.execute("DELETE FROM folders")
+        if self.fts:
+            self.conn.execute("DELETE FROM tool_search")
+        self.next_seq = 1
+        for tool in tools:
+            self.write_tool(tool, self.take_seq())
+    
+    def save_all(self):
+        """重新写入整个工具目录"""
+        # 先加载全部文件夹内容，再清空数据表
+        self.execute(self.write_all, list(self.catalog.walk()))
+    
+    def tool_added(self, tool):
+        self.execute(lambda: self.write_tool(tool, self.take_seq()))
+    
+    def tool_updated(self, tool):
+        def rewrite():
+            # 保留原来的序号（类型变化时工具会换到另一个表）
+            seq = self.delete_tool(tool["id"])
+            self.write_tool(tool, seq if seq is not None else self.take_seq())
+        self.execute(rewrite)
+    
+    def tool_moved(self, tool):
+        def move():
+            parent = self.catalog.parent(tool)
+            parent_id = parent["id"] if parent is not None else None
+            self.conn.execute("UPDATE tools SET parent_id = ? WHERE id = ?", (parent_id, tool["id"]))
+            self.conn.execute("UPDATE folders SET parent_id = ? WHERE id = ?", (parent_id, tool["id"]))
+        self.execute(move)
+    
+    def tools_removed(self, tools):
+        def delete_all():
+            for tool in tools:
+                self.delete_tool(tool["id"])
+        self.execute(delete_all)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
-class UpdateDialog(QDialog):
-    """更新对话框"""
-    def __init__(self, parent=None, current_version="1.0.0", repo_owner="Ta1phy", repo_name="bingz_toolkit"):
+# 创建工具目录存储
+def create_catalog_store(data_dir, catalog, parent=None):
+    """根据环境变量BINGZ_CATALOG_BACKEND（journal、json、binary、shards或sqlite）选择存储
+    
+    已有数据库、分片目录或二进制目录时默认使用对应的存储，否则默认使用快照+日志存储
+    """
+    json_file = os.path.join(data_dir, "ai_tools.json")
+    db_file = os.path.join(data_dir, "ai_tools.db")
+    catalog_dir = os.path.join(data_dir, "catalog")
+    backend = os.getenv("BINGZ_CATALOG_BACKEND", "").lower()
+    if backend == "sqlite" or (not backend and os.path.exists(db_file)):
+        return SqliteCatalogStore(db_file, json_file, catalog, parent)
+    if backend == "shards" or (not backend and os.path.exists(os.path.join(catalog_dir, "manifest.json"))):
+        return ShardedCatalogStore(catalog_dir, json_file, catalog, parent)
+    if backend == "json":
+        return JsonCatalogStore(json_file, catalog, parent)
+    if backend == "binary" or (not backend and os.path.exists(os.path.join(data_dir, "ai_tools.bzc"))):
+        return BinaryCatalogStore(json_file, catalog, parent)
+    return JournalCatalogStore(json_file, catalog, parent)
+
+# 工具标识
+def tool_key(tool):
+    """获取工具在网格中的稳定标识"""
+    return tool["id"]
+
+class ToolListModel(QAbstractListModel):
+    """工具网格数据模型，刷新时只更新有变化的工具项"""
+    ToolRole = Qt.UserRole + 1
+    PathRole = Qt.UserRole + 2
+    # 单次刷新的增删移动操作超过该数量时直接重置模型（视图整体重新布局更快）
+    MAX_DIFF_OPERATIONS = 64
+    
+    # 工具列表即将变化，参数为新列表中的工具项标识（用于取消过期的图标解码请求）
+    tools_about_to_change = pyqtSignal(object)
+    # 刷新完成，参数为本次刷新的统计信息
+    refreshed = pyqtSignal(dict)
+    
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.current_version = current_version
-        self.repo_owner = repo_owner
-        self.repo_name = repo_name
-        self.update_checker = None
-        self.downloading = False
-        self.init_ui()
-        self.check_for_updates()
+        self._tools = []
+        # 每个工具项绘制相关的内容，用于判断工具项是否需要重绘
+        self._signatures = []
+        # 工具标识 -> 所在文件夹路径（仅搜索子文件夹时使用）
+        self._paths = {}
+        # 工具目录加载前显示的占位工具项数量
+        self._skeleton_rows = 0
+        self.last_refresh_stats = {}
     
-    def init_ui(self):
-        """初始化更新对话框"""
-        self.setWindowTitle("检查更新")
-        self.setFixedSize(400, 200)
-        self.setWindowModality(Qt.ApplicationModal)
-        
-        # 主布局
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(15)
-        
-        # 标题
-        title_label = QLabel("BingZ工具包 - 更新检查")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        title_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(title_label)
-        
-        # 当前版本
-        version_label = QLabel(f"当前版本: {self.current_version}")
-        version_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(version_label)
-        
-        # 状态标签
-        self.status_label = QLabel("正在检查更新...")
-        self.status_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(self.status_label)
-        
-        # 进度条
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 100)
-        self.progress_bar.setValue(0)
-        layout.addWidget(self.progress_bar)
-        
-        # 按钮布局
-        button_layout = QHBoxLayout()
-        
-        # 取消按钮
-        self.cancel_button = QPushButton("取消")
-        self.cancel_button.clicked.connect(self.close)
-        button_layout.addWidget(self.cancel_button)
-        
-        # 更新按钮（初始隐藏）
-        self.update_button = QPushButton("立即更新")
-        self.update_button.clicked.connect(self.download_update)
-        self.update_button.hide()
-        button_layout.addWidget(self.update_button)
-        
-        button_layout.addStretch()
-        layout.addLayout(button_layout)
+    def set_skeleton(self, count):
+        """显示count个占位工具项，直到第一次设置工具列表"""
+        self.beginResetModel()
+        self._tools = []
+        self._signatures = []
+        self._skeleton_rows = count
+        self.endResetModel()
     
-    def check_for_updates(self):
-        """开始检查更新"""
-        self.update_checker = UpdateChecker(self.current_version, self.repo_owner, self.repo_name)
-        self.update_checker.update_available.connect(self.on_update_available)
-        self.update_checker.no_update.connect(self.on_no_update)
-        self.update_checker.error.connect(self.on_error)
-        self.update_checker.progress.connect(self.update_progress)
-        self.update_checker.start()
+    def signature(self, tool):
+        """工具项绘制相关的内容"""
+        return (tool.is_folder, tool["name"], tool.get("icon_path", ""), self._paths.get(tool_key(tool)))
     
-    def update_progress(self, progress, status):
-        """更新进度"""
-        self.progress_bar.setValue(progress)
-        self.status_label.setText(status)
+    def set_tools(self, tools, paths=None):
+        """替换模型中的工具列表，按工具标识对比新旧列表，只增删、移动或更新有变化的工具项"""
+        tools = list(tools)
+        self.tools_about_to_change.emit({tool_key(tool) for tool in tools})
+        self._paths = paths or {}
+        stats = self.apply_diff(tools)
+        if stats is None:
+            # 变化过多，整体重置
+            self.beginResetModel()
+            self._tools = tools
+            self._signatures = [self.signature(tool) for tool in tools]
+            self._skeleton_rows = 0
+            self.endResetModel()
+            stats = {"mode": "reset", "inserted": len(tools), "removed": 0, "moved": 0, "updated": 0, "unchanged": 0}
+        stats["touched"] = stats["inserted"] + stats["removed"] + stats["moved"] + stats["updated"]
+        self.last_refresh_stats = stats
+        self.refreshed.emit(stats)
     
-    def on_update_available(self, update_data):
-        """发现更新"""
-        self.update_data = update_data
-        self.status_label.setText(f"发现新版本: {update_data['version']}")
-        self.cancel_button.setText("关闭")
-        self.update_button.show()
+    def plan_diff(self, new_keys):
+        """估算对比刷新需要的增删移动操作数量"""
+        new_key_set = set(new_keys)
+        old_keys = [tool_key(tool) for tool in self._tools]
+        kept = [key for key in old_keys if key in new_key_set]
+        kept_set = set(kept)
+        operations = 0
+        # 连续删除的工具项合并为一次操作
+        previous_removed = False
+        for key in old_keys:
+            removed = key not in new_key_set
+            if removed and not previous_removed:
+                operations += 1
+            previous_removed = removed
+        # 连续插入的工具项合并为一次操作
+        previous_inserted = False
+        for key in new_keys:
+            inserted = key not in kept_set
+            if inserted and not previous_inserted:
+                operations += 1
+            previous_inserted = inserted
+        # 保留的工具项相对顺序变化时需要移动
+        kept_in_new_order = [key for key in new_keys if key in kept_set]
+        operations += sum(1 for a, b in zip(kept, kept_in_new_order) if a != b)
+        return operations
     
-    def on_no_update(self):
-        """没有更新"""
-        self.status_label.setText("已是最新版本")
-        self.cancel_button.setText("关闭")
+    def apply_diff(self, tools):
+        """按对比结果更新模型，变化过多时返回None"""
+        new_keys = [tool_key(tool) for tool in tools]
+        if not self._tools or not tools or self._skeleton_rows or self.plan_diff(new_keys) > self.MAX_DIFF_OPERATIONS:
+            return None
+        stats = {"mode": "diff", "inserted": 0, "removed": 0, "moved": 0, "updated": 0, "unchanged": 0}
+        new_key_set = set(new_keys)
+        
+        # 删除不再显示的工具项（从后向前，连续的工具项一起删除）
+        row = len(self._tools) - 1
+        while row >= 0:
+            if tool_key(self._tools[row]) in new_key_set:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and tool_key(self._tools[row]) not in new_key_set:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self._tools[row + 1:last + 1]
+            del self._signatures[row + 1:last + 1]
+            self.endRemoveRows()
+            stats["removed"] += last - row
+        
+        # 按新顺序移动已有工具项、插入新增工具项
+        current_keys = [tool_key(tool) for tool in self._tools]
+        current_key_set = set(current_keys)
+        row = 0
+        while row < len(tools):
+            key = new_keys[row]
+            if row < len(current_keys) and current_keys[row] == key:
+                row += 1
+                continue
+            if key in current_key_set:
+                # 已有工具项移动到新位置
+                source = current_keys.index(key, row)
+                self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), row)
+                self._tools.insert(row, self._tools.pop(source))
+                self._signatures.insert(row, self._signatures.pop(source))
+                current_keys.insert(row, current_keys.pop(source))
+                self.endMoveRows()
+                stats["moved"] += 1
+                row += 1
+                continue
+            # 插入连续的新增工具项
+            end = row
+            while end < len(tools) and new_keys[end] not in current_key_set:
+                end += 1
+            self.beginInsertRows(QModelIndex(), row, end - 1)
+            self._tools[row:row] = tools[row:end]
+            self._signatures[row:row] = [self.signature(tool) for tool in tools[row:end]]
+            current_keys[row:row] = new_keys[row:end]
+            self.endInsertRows()
+            stats["inserted"] += end - row
+            row = end
+        
+        # 内容有变化的工具项只重绘自身
+        for row, tool in enumerate(tools):
+            self._tools[row] = tool
+            signature = self.signature(tool)
+            if signature != self._signatures[row]:
+                self._signatures[row] = signature
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                stats["updated"] += 1
+        stats["unchanged"] = max(0, len(tools) - stats["inserted"] - stats["moved"] - stats["updated"])
+        return stats
     
-    def on_error(self, error_msg):
-        """错误处理"""
-        self.status_label.setText(error_msg)
-        self.cancel_button.setText("关闭")
+    def tool_at(self, row):
+        """获取指定行的工具"""
+        if 0 <= row < len(self._tools):
+            return self._tools[row]
+        return None
     
-    def download_update(self):
-        """下载更新"""
-        self.downloading = True
-        self.update_button.hide()
-        self.cancel_button.setText("取消")
-        
-        # 创建下载目录
-        download_dir = os.path.join(get_user_data_dir(), "downloads")
-        if not os.path.exists(download_dir):
-            os.makedirs(download_dir)
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._tools) or self._skeleton_rows
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        tool = self.tool_at(index.row())
+        if tool is None:
+            return None
+        if role == Qt.DisplayRole:
+            return tool["name"]
+        if role == self.ToolRole:
+            return tool
+        if role == self.PathRole:
+            return self._paths.get(tool_key(tool))
+        if role == Qt.ToolTipRole:
+            path = self._paths.get(tool_key(tool))
+            if path:
+                return f"{path} / {tool['name']}"
+            return None
+        return None
+
+class ToolItemDelegate(QStyledItemDelegate):
+    """工具网格项绘制委托，只绘制可见的工具项"""
+    TILE_WIDTH = 80
+    TILE_HEIGHT = 100
+    ICON_SIZE = 50
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 后台图标解码，完成后刷新视图
+        self.loader = IconLoader(self)
+        if parent is not None:
+            self.loader.icon_loaded.connect(parent.viewport().update)
+    
+    def sizeHint(self, option, index):
+        return QSize(self.TILE_WIDTH, self.TILE_HEIGHT)
+    
+    def paint(self, painter, option, index):
+        tool = index.data(ToolListModel.ToolRole)
+        if tool is None:
+            self.paint_skeleton(painter, option)
+            return
         
-        # 设置保存路径
-        asset_name = self.update_data["asset"]["name"]
-        save_path = os.path.join(download_dir, asset_name)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        
+        # 工具项区域（在网格单元内居中）
+        rect = option.rect
+        tile_x = rect.x() + (rect.width() - self.TILE_WIDTH) // 2
+        tile_y = rect.y() + (rect.height() - self.TILE_HEIGHT) // 2
+        button_rect = QRect(tile_x + 10, tile_y + 5, 60, 60)
+        icon_rect = button_rect.adjusted(5, 5, -5, -5)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        is_folder = tool.is_folder
+        
+        # 图标按钮背景
+        if is_folder:
+            # 文件夹类型样式
+            painter.setPen(QPen(QColor("#2196F3"), 2))
+            painter.setBrush(QColor("#BBDEFB") if hovered else QColor("#E3F2FD"))
+            painter.drawRoundedRect(QRectF(button_rect).adjusted(1, 1, -1, -1), 12, 12)
+        elif hovered:
+            # 普通工具悬停样式
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(0, 0, 0, 25))
+            painter.drawRoundedRect(QRectF(button_rect), 12, 12)
         
-        # 更新进度信号连接
-        self.update_checker.download_progress.connect(self.update_progress)
-        self.update_checker.download_complete.connect(self.on_download_complete)
-        self.update_checker.error.connect(self.on_error)
+        # 绘制图标
+        # 图标未缓存时提交后台解码，先显示占位图标
+        dpr = painter.device().devicePixelRatioF()
+        key = icon_cache_key(tool.get("icon_path", ""), self.ICON_SIZE, True, dpr)
+        pixmap = icon_cache.get(key) if key is not None else None
+        if pixmap is None and key is not None:
+            self.loader.request(key, tool_key(tool))
+        if pixmap is not None:
+            target = QRect(0, 0, round(pixmap.width() / dpr), round(pixmap.height() / dpr))
+            target.moveCenter(icon_rect.center())
+            painter.drawPixmap(target, pixmap)
+        elif is_folder:
+            # 默认文件夹图标
+            font = painter.font()
+            font.setPixelSize(32)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(QColor("#2196F3"))
+            painter.drawText(icon_rect, Qt.AlignCenter, "📁")
+        else:
+            # 默认图标（使用文字）
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#4CAF50"))
+            painter.drawRoundedRect(QRectF(icon_rect), 10, 10)
+            font = painter.font()
+            font.setPixelSize(20)
+            font.setBold(True)
+            painter.setFont(font)
+            painter.setPen(Qt.white)
+            painter.drawText(icon_rect, Qt.AlignCenter, tool["name"][:1])
         
-        # 开始下载
-        self.update_checker.download_update(self.update_data["asset"]["browser_download_url"], save_path)
+        # 名称（小字体，固定在图标正下方）
+        name_rect = QRect(tile_x + 10, button_rect.bottom() + 6, 60, 25)
+        font = painter.font()
+        font.setPixelSize(10)
+        font.setBold(False)
+        painter.setFont(font)
+        painter.setPen(QColor("#333333"))
+        painter.drawText(name_rect, Qt.AlignHCenter | Qt.AlignTop | Qt.TextWordWrap, tool["name"])
+        
+        # 子文件夹中的搜索结果，在名称下方显示所在文件夹路径
+        path = index.data(ToolListModel.PathRole)
+        if path:
+            path_rect = QRect(tile_x, name_rect.bottom() + 1, self.TILE_WIDTH, 12)
+            font.setPixelSize(9)
+            painter.setFont(font)
+            painter.setPen(QColor("#2196F3"))
+            path_text = painter.fontMetrics().elidedText("📁 " + path, Qt.ElideLeft, path_rect.width())
+            painter.drawText(path_rect, Qt.AlignHCenter | Qt.AlignTop, path_text)
+        
+        painter.restore()
+
+    def paint_skeleton(self, painter, option):
+        """绘制工具目录加载前的占位工具项"""
+        rect = option.rect
+        tile_x = rect.x() + (rect.width() - self.TILE_WIDTH) // 2
+        tile_y = rect.y() + (rect.height() - self.TILE_HEIGHT) // 2
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#EEEEEE"))
+        painter.drawRoundedRect(QRectF(tile_x + 15, tile_y + 10, 50, 50), 10, 10)
+        painter.drawRoundedRect(QRectF(tile_x + 15, tile_y + 71, 50, 10), 5, 5)
+        painter.restore()
+
+class TraceOverlay(QLabel):
+    """在窗口角落显示最近的绘制、刷新和搜索耗时（开启跟踪时使用）"""
+    NAMES = (("paint grid", "绘制"), ("display_tools", "刷新"), ("search", "搜索"))
     
-    def on_download_complete(self, save_path):
-        """下载完成"""
-        self.status_label.setText("更新下载完成！")
-        self.cancel_button.setText("关闭")
-        QMessageBox.information(self, "下载完成", f"更新已下载到: {save_path}\n请手动安装。")
-        self.close()
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setStyleSheet("background-color: #303030; color: #7CFC00; font-size: 10px; padding: 2px 4px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+    
+    def refresh(self):
+        lines = []
+        for name, label in self.NAMES:
+            times = list(tracer.recent.get(name, ()))
+            if times:
+                lines.append(f"{label} 最近{times[-1]:.1f} 平均{sum(times) / len(times):.1f} 最大{max(times):.1f} ms（{len(times)}次）")
+        text = "\n".join(lines) or "暂无耗时数据"
+        if text == self.text():
+            return
+        self.setText(text)
+        self.adjustSize()
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - 4, parent.height() - self.height() - 4)
+        self.raise_()
+
+class ToolGridView(QListView):
+    """工具网格视图（一行4个，只为可见区域绘制工具项）"""
+    # 第一次绘制完成
+    first_painted = pyqtSignal()
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
+        self.setGridSize(QSize(92, 120))
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMouseTracking(True)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.setStyleSheet("QListView { border: none; background-color: white; }")
+        self.painted = False
+    
+    def paintEvent(self, event):
+        with tracer.span("paint grid"):
+            super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            self.first_painted.emit()
 
 class AIToolManager(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.tools = []
+        self.catalog = ToolCatalog()
         
         # 版本信息
         self.current_version = "1.1"
@@ -308,14 +3973,27 @@ class AIToolManager(QMainWindow):
         # 设置数据文件路径
         self.data_file = os.path.join(self.data_dir, "ai_tools.json")
         
-        # 如果数据文件不存在，从程序目录复制初始数据
-        initial_data_file = resource_path("ai_tools.json")
-        if not os.path.exists(self.data_file) and os.path.exists(initial_data_file):
-            import shutil
-            shutil.copy(initial_data_file, self.data_file)
+        # 工具目录存储（JSON文件或SQLite数据库）
+        self.store = create_catalog_store(self.data_dir, self.catalog, self)
+        self.store.error.connect(self.on_save_error)
+        self.search_index = self.store.create_search_index()
+        # 打开的文件夹窗口的刷新函数，工具修改后一起刷新
+        self.toolkit_refreshers = []
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.store.close)
+        
+        # 启动耗时（毫秒）：首次绘制、可交互（工具显示完成）、搜索索引建立完成
+        self.startup_times = {}
+        # 显示工具后分批建立搜索索引，避免阻塞界面
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(0)
+        self.index_timer.timeout.connect(self.build_search_index)
         
         self.init_ui()
-        self.load_tools()
+        # 先显示带占位工具项的窗口，第一次绘制后再加载工具目录
+        self.tool_model.set_skeleton(12)
+        self.tool_view.first_painted.connect(self.on_first_paint)
         
     def init_ui(self):
         self.setWindowTitle("BingZv1.0")
@@ -351,6 +4029,8 @@ class AIToolManager(QMainWindow):
             "width: 150px;"
         )
         self.search_input.textChanged.connect(self.filter_tools)
+        # 工具目录加载完成前不能搜索和添加
+        self.search_input.setEnabled(False)
         top_layout.addWidget(self.search_input)
         
         # 添加工具按钮（圆角矩形样式）
@@ -367,6 +4047,8 @@ class AIToolManager(QMainWindow):
             " } "
         )
         add_button.clicked.connect(self.add_tool_dialog)
+        add_button.setEnabled(False)
+        self.add_button = add_button
 
         # 检查更新按钮（圆角矩形样式）
         update_button = QPushButton("检查更新")
@@ -390,217 +4072,141 @@ class AIToolManager(QMainWindow):
         
         main_layout.addLayout(top_layout)
         
-        # 工具展示区域（网格布局）
-        self.tools_container = QWidget()
-        self.tools_container.setFixedSize(400, 400)  # 设置固定尺寸，确保图标位置不变
-        self.tools_layout = QGridLayout(self.tools_container)
-        self.tools_layout.setSpacing(20)  # 减小间距，实现紧凑布局
-        self.tools_layout.setContentsMargins(10, 10, 10, 10)  # 左右各10px边距，确保留白均匀
-        self.tools_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)  # 设置顶部水平居中对齐
-        
-        # 设置每列宽度相等，确保均匀分布
-        for col in range(4):
-            self.tools_layout.setColumnStretch(col, 1)
-        
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(False)  # 关闭自动调整大小，确保图标位置固定
-        scroll_area.setWidget(self.tools_container)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        main_layout.addWidget(scroll_area)
+        # 工具展示区域（虚拟化网格视图）
+        self.tool_view, self.tool_model = self.create_tool_view()
+        main_layout.addWidget(self.tool_view)
         
         self.setCentralWidget(central_widget)
+        
+        # 开启跟踪时显示最近的耗时
+        if tracer.overlay:
+            self.trace_overlay = TraceOverlay(central_widget)
+    
+    
+    
+    def on_first_paint(self):
+        """窗口第一次绘制完成后加载工具目录"""
+        self.mark_startup("first_paint_ms")
+        QTimer.singleShot(0, self.load_tools)
     
+    def mark_startup(self, name):
+        """记录从程序启动到当前的耗时"""
+        if name not in self.startup_times:
+            self.startup_times[name] = (time.perf_counter() - STARTUP_TIME) * 1000
     
+    def report_startup(self):
+        """设置环境变量BINGZ_STARTUP_TIMING时输出启动耗时，值为exit时输出后退出（用于基准测试）"""
+        mode = os.getenv("BINGZ_STARTUP_TIMING", "")
+        if not mode:
+            return
+        print(json.dumps({name: round(value, 1) for name, value in self.startup_times.items()}), file=sys.stderr)
+        if mode == "exit":
+            QApplication.quit()
     
+    @traced("load_tools")
     def load_tools(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                self.tools = json.load(f)
-            self.display_tools()
+        # 如果数据文件不存在，从程序目录复制初始数据
+        initial_data_file = resource_path("ai_tools.json")
+        if not os.path.exists(self.data_file) and os.path.exists(initial_data_file):
+            import shutil
+            shutil.copy(initial_data_file, self.data_file)
+        
+        # 从存储加载按ID索引的工具目录
+        self.store.load()
+        self.display_tools()
+        self.search_input.setEnabled(True)
+        self.add_button.setEnabled(True)
+        self.mark_startup("interactive_ms")
+        # 搜索索引在显示后分批建立，建立完成前搜索时逐个匹配尚未加入索引的工具
+        self.search_index.rebuild(incremental=True)
+        self.index_timer.start()
     
+    def build_search_index(self):
+        """分批建立搜索索引"""
+        if self.search_index.build_step():
+            self.index_timer.stop()
+            self.mark_startup("index_ready_ms")
+            self.report_startup()
+    
+    @traced("save_tools")
     def save_tools(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.tools, f, ensure_ascii=False, indent=2)
+        """保存整个工具目录"""
+        self.store.save_all()
+    
+    def on_save_error(self, error_msg):
+        """保存失败"""
+        QMessageBox.warning(self, "错误", error_msg)
     
-    def display_tools(self, tools=None):
+    def closeEvent(self, event):
+        """关闭窗口前写入尚未保存的修改"""
+        self.store.close()
+        super().closeEvent(event)
+    
+    @traced("display_tools")
+    def display_tools(self, tools=None, paths=None):
         # 使用传入的工具列表，如果没有则使用所有工具
-        display_tools = tools if tools is not None else self.tools
+        display_tools = tools if tools is not None else self.catalog.children_of()
         
         # 对工具进行排序，文件夹类型置顶
-        sorted_tools = sorted(display_tools, key=lambda x: (x.get('type', 'tool') != 'folder', x['name']))
-        
-        # 清空现有工具
-        for i in reversed(range(self.tools_layout.count())):
-            widget = self.tools_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.deleteLater()
-        
-        # 显示工具（网格排列，一行4个，紧凑布局）
-        rows = 0
-        cols = 4  # 4列布局，紧凑排列
-        for i, tool in enumerate(sorted_tools):
-            tool_widget = self.create_tool_widget(tool)
-            row = i // cols
-            col = i % cols
-            self.tools_layout.addWidget(tool_widget, row, col)
-            rows = row + 1
-    
-    def filter_tools(self):
-        """根据搜索文本过滤工具"""
-        search_text = self.search_input.text().lower().strip()
+        sorted_tools = sorted(display_tools, key=lambda x: (not x.is_folder, x['name']))
         
-        if not search_text:
-            # 搜索文本为空，显示所有工具
-            self.display_tools()
+        # 更新网格模型，只有可见的工具项会被绘制
+        self.tool_model.set_tools(sorted_tools, paths)
+    
+    def create_tool_view(self):
+        """创建工具网格视图和数据模型"""
+        view = ToolGridView()
+        model = ToolListModel(view)
+        view.setModel(model)
+        delegate = ToolItemDelegate(view)
+        view.setItemDelegate(delegate)
+        # 重新过滤时取消过期的图标解码请求
+        model.tools_about_to_change.connect(delegate.loader.cancel_pending)
+        view.clicked.connect(self.on_tool_clicked)
+        view.customContextMenuRequested.connect(lambda pos, v=view: self.on_tool_context_menu(v, pos))
+        return view, model
+    
+    def on_tool_clicked(self, index):
+        """点击工具项"""
+        tool = index.data(ToolListModel.ToolRole)
+        if tool is None:
             return
-        
-        # 过滤工具，匹配名称、描述、功能等
-        filtered_tools = []
-        for tool in self.tools:
-            # 检查工具的各个字段是否包含搜索文本
-            if (search_text in tool["name"].lower() or
-                search_text in tool["description"].lower() or
-                search_text in tool["features"].lower() or
-                search_text in tool["url"].lower()):
-                filtered_tools.append(tool)
-        
-        # 显示过滤后的工具
-        self.display_tools(filtered_tools)
-    
-    def create_tool_widget(self, tool):
-        widget = QWidget()
-        widget.setFixedSize(80, 100)  # 适合网格布局的工具项大小
-        layout = QVBoxLayout(widget)
-        layout.setContentsMargins(5, 5, 5, 5)  # 内部边距
-        layout.setSpacing(5)  # 内部间距
-        layout.setAlignment(Qt.AlignCenter)  # 内部元素居中对齐
-        
-        # 确定工具类型，默认为普通工具
-        tool_type = tool.get("type", "tool")
-        
-        # 图标按钮（网格风格）
-        icon_button = QPushButton()
-        icon_button.setFixedSize(60, 60)  # 图标按钮大小
-        
-        if tool_type == "folder":
-            # 文件夹类型样式
-            icon_button.setStyleSheet(
-                "QPushButton {border: 2px solid #2196F3; background-color: #E3F2FD; border-radius: 12px;}"
-                "QPushButton:hover {background-color: #BBDEFB;}"
-            )
+        if tool.is_folder:
             # 文件夹点击事件
-            icon_button.clicked.connect(lambda: self.open_toolkit(tool))
+            self.open_toolkit(tool)
         else:
-            # 普通工具样式
-            icon_button.setStyleSheet(
-                "QPushButton {border: none; background: transparent; border-radius: 12px;}"
-                "QPushButton:hover {background-color: rgba(0, 0, 0, 0.1);}"
-            )
             # 普通工具点击事件
-            icon_button.clicked.connect(lambda: self.show_tool_detail(tool))
-        
-        # 设置右键菜单
-        icon_button.setContextMenuPolicy(Qt.CustomContextMenu)
-        icon_button.customContextMenuRequested.connect(lambda pos, btn=icon_button, t=tool: self.show_context_menu(pos, btn, t))
-        
-        # 绘制图标
-        icon_label = QLabel(icon_button)
-        icon_label.setGeometry(5, 5, 50, 50)
-        icon_label.setAlignment(Qt.AlignCenter)
-        
-        if tool_type == "folder":
-            # 文件夹图标
-            icon_path = tool.get("icon_path", "")
-            
-            # 处理相对路径
-            if icon_path.startswith("./"):
-                icon_path = resource_path(icon_path[2:])
+            self.show_tool_detail(tool)
+    
+    def on_tool_context_menu(self, view, pos):
+        """在工具项上请求右键菜单"""
+        index = view.indexAt(pos)
+        tool = index.data(ToolListModel.ToolRole) if index.isValid() else None
+        if tool is not None:
+            self.show_context_menu(pos, view.viewport(), tool)
+    
+    def filter_tools(self):
+        """根据搜索文本过滤工具"""
+        # 作为textChanged的槽函数，不能使用traced装饰器（参数个数会变化）
+        with tracer.span("filter_tools"):
+            search_text = self.search_input.text().lower().strip()
             
-            if icon_path and os.path.exists(icon_path):
-                # 检查文件扩展名，支持SVG和其他图片格式
-                file_ext = os.path.splitext(icon_path)[1].lower()
-                
-                if file_ext == ".svg":
-                    # SVG图标处理
-                    svg_widget = QSvgWidget(icon_path, icon_button)
-                    svg_widget.setGeometry(5, 5, 50, 50)
-                    icon_label.hide()  # 隐藏文字标签
-                else:
-                    # 其他图片格式处理
-                    pixmap = QPixmap(icon_path)
-                    scaled_pixmap = pixmap.scaled(50, 50, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    
-                    # 创建圆角矩形遮罩
-                    rounded_pixmap = QPixmap(scaled_pixmap.size())
-                    rounded_pixmap.fill(Qt.transparent)
-                    painter = QPainter(rounded_pixmap)
-                    painter.setRenderHint(QPainter.Antialiasing)
-                    painter.setBrush(QBrush(scaled_pixmap))
-                    painter.setPen(Qt.NoPen)
-                    painter.drawRoundedRect(0, 0, scaled_pixmap.width(), scaled_pixmap.height(), 10, 10)
-                    painter.end()
-                    
-                    icon_label.setPixmap(rounded_pixmap)
-            else:
-                # 默认文件夹图标
-                icon_label.setStyleSheet(
-                    "QLabel {"
-                    "    font-size: 32px; font-weight: bold; color: #2196F3;"
-                    "    background-color: transparent;"
-                    "}"
-                )
-                icon_label.setText("📁")
-        else:
-            # 普通工具图标
-            icon_path = tool.get("icon_path", "")
+            if not search_text:
+                # 搜索文本为空，显示所有工具
+                self.display_tools()
+                return
             
-            # 处理相对路径
-            if icon_path.startswith("./"):
-                icon_path = resource_path(icon_path[2:])
+            # 通过搜索索引过滤所有文件夹中的工具，匹配名称、描述、功能等
+            filtered_tools = self.search_index.search(search_text, recursive=True)
             
-            if icon_path and os.path.exists(icon_path):
-                # 检查文件扩展名，支持SVG和其他图片格式
-                file_ext = os.path.splitext(icon_path)[1].lower()
-                
-                if file_ext == ".svg":
-                    # SVG图标处理
-                    svg_widget = QSvgWidget(icon_path, icon_button)
-                    svg_widget.setGeometry(5, 5, 50, 50)
-                    icon_label.hide()  # 隐藏文字标签
-                else:
-                    # 其他图片格式处理
-                    pixmap = QPixmap(icon_path)
-                    scaled_pixmap = pixmap.scaled(50, 50, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    
-                    # 创建圆角矩形遮罩
-                    rounded_pixmap = QPixmap(scaled_pixmap.size())
-                    rounded_pixmap.fill(Qt.transparent)
-                    painter = QPainter(rounded_pixmap)
-                    painter.setRenderHint(QPainter.Antialiasing)
-                    painter.setBrush(QBrush(scaled_pixmap))
-                    painter.setPen(Qt.NoPen)
-                    painter.drawRoundedRect(0, 0, scaled_pixmap.width(), scaled_pixmap.height(), 10, 10)
-                    painter.end()
-                    
-                    icon_label.setPixmap(rounded_pixmap)
-            else:
-                # 默认图标（使用文字，网格布局大小）
-                icon_label.setText(tool["name"][0])
-                icon_label.setStyleSheet("font-size: 20px; font-weight: bold; background-color: #4CAF50; color: white; border-radius: 10px; width: 50px; height: 50px;")
-        
-        layout.addWidget(icon_button)
-        
-        # 名称（小字体，固定在图标正下方）
-        name_label = QLabel(tool["name"])
-        name_label.setAlignment(Qt.AlignCenter)
-        name_label.setStyleSheet("font-size: 10px; color: #333333;")  # 适合网格布局的字体大小
-        name_label.setWordWrap(True)
-        name_label.setFixedWidth(60)  # 固定宽度，与图标同宽
-        name_label.setFixedHeight(25)  # 固定高度，确保文字完整显示
-        layout.addWidget(name_label, alignment=Qt.AlignCenter)  # 确保居中对齐
-        
-        return widget
+            # 显示过滤后的工具（子文件夹中的工具附带所在路径）
+            self.display_tools(filtered_tools, self.search_index.search_paths(filtered_tools))
+    
+    def refresh_views(self):
+        """工具修改后刷新主窗口（保留搜索结果）和打开的文件夹窗口"""
+        self.filter_tools()
+        for refresh in list(self.toolkit_refreshers):
+            refresh()
     
     def open_toolkit(self, tool):
         """打开嵌套工具包"""
@@ -670,66 +4276,35 @@ class AIToolManager(QMainWindow):
         
         top_layout.addStretch()
         
-        # 工具展示区域
-        tools_container = QWidget()
-        tools_container.setFixedSize(400, 400)
-        tools_layout = QGridLayout(tools_container)
-        tools_layout.setSpacing(20)
-        tools_layout.setContentsMargins(10, 10, 10, 10)
-        tools_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
+        # 工具展示区域（虚拟化网格视图）
+        tool_view, tool_model = self.create_tool_view()
         
-        # 设置每列宽度相等
-        for col in range(4):
-            tools_layout.setColumnStretch(col, 1)
-        
-        # 滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(False)
-        scroll_area.setWidget(tools_container)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
-        # 获取嵌套工具
-        nested_tools = tool.get("children", [])
         
         # 显示嵌套工具（初始排序）
-        def show_tools(tools_list):
+        def show_tools(tools_list, paths=None):
             # 对工具进行排序，文件夹类型置顶
-            sorted_tools = sorted(tools_list, key=lambda x: (x.get('type', 'tool') != 'folder', x['name']))
+            sorted_tools = sorted(tools_list, key=lambda x: (not x.is_folder, x['name']))
             
-            # 清空现有工具
-            for j in reversed(range(tools_layout.count())):
-                widget = tools_layout.itemAt(j).widget()
-                if widget is not None:
-                    widget.deleteLater()
-            
-            # 显示过滤后的工具
-            for j, nested_tool in enumerate(sorted_tools):
-                tool_widget = self.create_tool_widget(nested_tool)
-                row = j // cols
-                col = j % cols
-                tools_layout.addWidget(tool_widget, row, col)
+            # 更新网格模型
+            tool_model.set_tools(sorted_tools, paths)
         
         # 初始显示嵌套工具
-        show_tools(nested_tools)
+        show_tools(self.catalog.children_of(tool))
         
         # 定义搜索过滤函数
         def filter_nested_tools():
             search_text = search_input.text().lower().strip()
             
             if not search_text:
-                display_tools = nested_tools
+                display_tools = self.catalog.children_of(tool)
+                paths = None
             else:
-                display_tools = []
-                for nested_tool in nested_tools:
-                    if (search_text in nested_tool["name"].lower() or
-                        search_text in nested_tool.get("description", "").lower() or
-                        search_text in nested_tool.get("features", "").lower() or
-                        search_text in nested_tool.get("url", "").lower()):
-                        display_tools.append(nested_tool)
+                # 通过搜索索引查找当前文件夹及其子文件夹中的工具
+                display_tools = self.search_index.search(search_text, tool, recursive=True)
+                paths = self.search_index.search_paths(display_tools, tool)
             
             # 显示过滤后的工具（排序后）
-            show_tools(display_tools)
+            show_tools(display_tools, paths)
         
         # 连接搜索信号
         search_input.textChanged.connect(filter_nested_tools)
@@ -871,19 +4446,15 @@ class AIToolManager(QMainWindow):
                         "children": []
                     }
                 
-                # 添加到文件夹的children列表
-                if "children" not in tool:
-                    tool["children"] = []
-                tool["children"].append(new_tool)
+                # 添加到文件夹
+                new_tool = self.catalog.add(new_tool, tool)
+                self.search_index.add(new_tool)
                 
                 # 保存到数据文件
-                self.save_tools()
-                
-                # 更新嵌套工具列表
-                nested_tools.append(new_tool)
+                self.store.tool_added(new_tool)
                 
                 # 刷新显示
-                filter_nested_tools()
+                self.refresh_views()
                 
                 add_dialog.close()
                 QMessageBox.information(self, "成功", f"工具已添加到 {tool['name']}")
@@ -909,9 +4480,16 @@ class AIToolManager(QMainWindow):
         add_button.clicked.connect(add_tool_to_folder)
         
         layout.addLayout(top_layout)
-        layout.addWidget(scroll_area)
+        layout.addWidget(tool_view)
         
-        toolkit_window.exec_()
+        # 窗口打开期间不卸载文件夹内容，右键菜单修改工具后刷新显示
+        self.catalog.pin(tool)
+        self.toolkit_refreshers.append(filter_nested_tools)
+        try:
+            toolkit_window.exec_()
+        finally:
+            self.toolkit_refreshers.remove(filter_nested_tools)
+            self.catalog.unpin(tool)
     
     def show_tool_detail(self, tool):
         detail_window = QDialog()
@@ -938,31 +4516,17 @@ class AIToolManager(QMainWindow):
         icon_layout.setContentsMargins(0, 0, 0, 0)
         icon_layout.setAlignment(Qt.AlignCenter)
         
-        icon_path = tool.get("icon_path", "")
-        
-        # 处理相对路径
-        if icon_path.startswith("./"):
-            icon_path = resource_path(icon_path[2:])
+        # 从图标缓存读取（SVG和其他图片格式统一栅格化为图片显示）
+        icon_label = QLabel()
+        pixmap = load_tool_pixmap(tool.get("icon_path", ""), 80, dpr=icon_label.devicePixelRatioF())
         
-        if icon_path and os.path.exists(icon_path):
-            # 检查文件扩展名，支持SVG和其他图片格式
-            file_ext = os.path.splitext(icon_path)[1].lower()
-            
-            if file_ext == ".svg":
-                # SVG图标处理
-                svg_widget = QSvgWidget(icon_path)
-                svg_widget.setFixedSize(80, 80)
-                icon_layout.addWidget(svg_widget)
-            else:
-                # 其他图片格式处理
-                icon_label = QLabel()
-                pixmap = QPixmap(icon_path)
-                icon_label.setPixmap(pixmap.scaled(80, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                icon_label.setAlignment(Qt.AlignCenter)
-                icon_layout.addWidget(icon_label)
+        if pixmap is not None:
+            icon_label.setPixmap(pixmap)
+            icon_label.setAlignment(Qt.AlignCenter)
+            icon_layout.addWidget(icon_label)
         else:
             # 默认图标（使用文字）
-            icon_label = QLabel(tool["name"][0])
+            icon_label.setText(tool["name"][0])
             icon_label.setStyleSheet("font-size: 32px; font-weight: bold; background-color: #4CAF50; color: white; border-radius: 10px; width: 80px; height: 80px;")
             icon_label.setAlignment(Qt.AlignCenter)
             icon_layout.addWidget(icon_label)
@@ -1019,7 +4583,7 @@ class AIToolManager(QMainWindow):
             "border: 1px solid black; "
             " } "
         )
-        open_button.clicked.connect(lambda checked, url=tool["url"]: webbrowser.open(url))
+        open_button.clicked.connect(lambda checked, url=tool["url"]: open_url(url))
         button_layout.addWidget(open_button)
         
         layout.addLayout(button_layout)
@@ -1050,12 +4614,19 @@ class AIToolManager(QMainWindow):
     
     def delete_tool(self, tool):
         """删除AI工具"""
+        # 工具可能已被删除，或所在文件夹卸载后重新加载为新的记录
+        tool = self.catalog.get(tool["id"])
+        if tool is None:
+            return
         reply = QMessageBox.question(self, '确认删除', f'确定要删除{tool["name"]}吗？', 
                                     QMessageBox.No | QMessageBox.Yes, QMessageBox.Yes)
         if reply == QMessageBox.Yes:
-            self.tools.remove(tool)
-            self.save_tools()
-            self.display_tools()
+            # 从工具目录中删除（文件夹连同其中的工具）
+            removed_tools = self.catalog.remove(tool)
+            for removed_tool in removed_tools:
+                self.search_index.remove(removed_tool)
+            self.store.tools_removed(removed_tools)
+            self.refresh_views()
             QMessageBox.information(self, '删除成功', f'{tool["name"]}已成功删除')
     
     def change_tool_icon(self, tool):
@@ -1063,11 +4634,12 @@ class AIToolManager(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择图标", "", "Image Files (*.png *.jpg *.jpeg *.ico *.svg)"
         )
-        if file_path:
+        tool = self.catalog.get(tool["id"])
+        if file_path and tool is not None:
             # 更新工具图标路径
             tool["icon_path"] = file_path
-            self.save_tools()
-            self.display_tools()
+            self.store.tool_updated(tool)
+            self.refresh_views()
             QMessageBox.information(self, '成功', f'{tool["name"]}的图标已更新')
     
     def add_tool_dialog(self):
@@ -1224,9 +4796,10 @@ class AIToolManager(QMainWindow):
             }
         
         # 添加到工具列表
-        self.tools.append(new_tool)
-        self.save_tools()
-        self.display_tools()
+        new_tool = self.catalog.add(new_tool)
+        self.search_index.add(new_tool)
+        self.store.tool_added(new_tool)
+        self.refresh_views()
         
         dialog.close()
         QMessageBox.information(self, "成功", f"{name}已成功添加")
@@ -1364,6 +4937,11 @@ class AIToolManager(QMainWindow):
     
     def save_edited_tool(self, dialog, tool, name_input, desc_input, features_input, url_input, icon_input, is_tool):
         """保存修改后的工具"""
+        # 对话框打开期间工具可能已被删除，或所在文件夹卸载后重新加载为新的记录
+        tool = self.catalog.get(tool["id"])
+        if tool is None:
+            dialog.close()
+            return
         name = name_input.text().strip()
         desc = desc_input.text().strip()
         features = features_input.toPlainText().strip()
@@ -1385,9 +4963,11 @@ class AIToolManager(QMainWindow):
             tool["url"] = url
             tool["icon_path"] = icon_path
             
-            # 如果之前是文件夹，删除children字段
-            if "children" in tool:
-                del tool["children"]
+            # 如果之前是文件夹，删除其中的工具
+            removed_tools = self.catalog.make_tool(tool)
+            for removed_tool in removed_tools:
+                self.search_index.remove(removed_tool)
+            self.store.tools_removed(removed_tools)
         else:
             # 文件夹类型验证
             if not name:
@@ -1406,12 +4986,14 @@ class AIToolManager(QMainWindow):
             if "icon_path" in tool:
                 del tool["icon_path"]
             
-            # 确保children字段存在
-            if "children" not in tool:
-                tool["children"] = []
+            # 确保文件夹可以添加工具
+            self.catalog.make_folder(tool)
         
-        self.save_tools()
-        self.display_tools()
+        # 更新搜索索引
+        self.search_index.update(tool)
+        
+        self.store.tool_updated(tool)
+        self.refresh_views()
         
         dialog.close()
         QMessageBox.information(self, "成功", f"{name}已成功修改")
@@ -1422,7 +5004,15 @@ class AIToolManager(QMainWindow):
         update_dialog.exec_()
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    app = QApplication(configure_tracing(sys.argv))
     window = AIToolManager()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    # 等待后台图标解码任务结束
+    QThreadPool.globalInstance().clear()
+    QThreadPool.globalInstance().waitForDone()
+    thumbnail_cache.flush()
+    if tracer.enabled:
+        tracer.export()
+        print(f"耗时跟踪已导出: {tracer.output}", file=sys.stderr)
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+import tempfile
+import json
+import tracemalloc
+import subprocess
+import statistics
+import platform
+import hashlib
+import threading
+from functools import partial
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# 离屏运行，不需要显示器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QGridLayout, QPushButton, QLabel, QScrollArea
+)
+from PyQt5.QtSvg import QSvgWidget
+from PyQt5.QtGui import QImage, QColor, QPainter
+from PyQt5.QtCore import Qt, QThreadPool, QTimer, QT_VERSION_STR
+
+import ai_tool_manager
+
+##
+# 功能：BingZ工具包性能基准测试
+# 用法：python benchmark.py --svg-tools 500 --catalog-sizes 1000,10000,100000
+#       python benchmark.py --suites hot --hot-tools 5000 --depth 2 --output results.json --baseline baseline.json
+#       python benchmark.py --output benchmark_baseline.json --baseline ""   （更新提交在仓库中的基线）
+#       python benchmark.py --suites download --download-size 64 --download-rate 20
+#
+##
+
+# 生成测试用的SVG图标
+def make_svg_icons(icon_dir, count):
+    """以icon目录中的SVG图标为模板生成count个内容不同的SVG图标，返回文件路径列表"""
+    template_dir = ai_tool_manager.resource_path("icon")
+    templates = []
+    for name in sorted(os.listdir(template_dir)):
+        if name.lower().endswith(".svg"):
+            with open(os.path.join(template_dir, name), 'r', encoding='utf-8') as f:
+                templates.append(f.read())
+    paths = []
+    for i in range(count):
+        path = os.path.join(icon_dir, f"icon_{i}.svg")
+        with open(path, 'w', encoding='utf-8') as f:
+            # 追加注释使每个文件内容不同，避免缩略图按内容哈希共用
+            f.write(templates[i % len(templates)] + f"\n<!-- {i} -->\n")
+        paths.append(path)
+    return paths
+
+# 生成测试用的PNG/JPG图标
+def make_raster_icons(icon_dir, count, fmt):
+    """生成count个颜色不同的fmt（png或jpg）图标，返回文件路径列表"""
+    paths = []
+    for i in range(count):
+        image = QImage(128, 128, QImage.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 37 % 360, 160, 220))
+        painter = QPainter(image)
+        painter.setPen(Qt.white)
+        font = painter.font()
+        font.setPixelSize(64)
+        painter.setFont(font)
+        painter.drawText(image.rect(), Qt.AlignCenter, str(i % 10))
+        painter.end()
+        path = os.path.join(icon_dir, f"icon_{fmt}_{i}.{fmt}")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+# 生成PNG/JPG/SVG混合的图标
+def make_mixed_icons(icon_dir, count):
+    """每种格式各生成count个图标，返回交错排列的文件路径列表"""
+    groups = [make_raster_icons(icon_dir, count, "png"), make_raster_icons(icon_dir, count, "jpg"), make_svg_icons(icon_dir, count)]
+    return [path for paths in zip(*groups) for path in paths]
+
+# 旧版实现：每个工具一个按钮+QSvgWidget+名称标签
+def create_legacy_tile(tool):
+    """按原来的create_tool_widget方式创建工具项"""
+    widget = QWidget()
+    widget.setFixedSize(80, 100)
+    layout = QVBoxLayout(widget)
+    layout.setContentsMargins(5, 5, 5, 5)
+    layout.setSpacing(5)
+    icon_button = QPushButton()
+    icon_button.setFixedSize(60, 60)
+    svg_widget = QSvgWidget(tool["icon_path"], icon_button)
+    svg_widget.setGeometry(5, 5, 50, 50)
+    layout.addWidget(icon_button)
+    name_label = QLabel(tool["name"])
+    name_label.setFixedSize(60, 25)
+    layout.addWidget(name_label, alignment=Qt.AlignCenter)
+    return widget
+
+# 计时重绘
+def time_paint(widget, repeat):
+    """重复重绘控件，返回平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        widget.grab()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+# 全SVG工具目录的网格测试
+def bench_svg_grid(app, count, repeat):
+    """对比旧版逐个创建控件与虚拟化网格在全SVG目录下的控件数和绘制耗时"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 缩略图写入临时目录，避免影响用户数据
+        ai_tool_manager.thumbnail_cache = ai_tool_manager.ThumbnailCache(os.path.join(temp_dir, "thumbs"))
+        ai_tool_manager.icon_cache.clear()
+        tools = [
+            ai_tool_manager.Tool.from_dict({"id": f"svg{i}", "type": "tool", "name": f"SVG工具{i}", "description": "", "features": "", "url": "", "icon_path": path})
+            for i, path in enumerate(make_svg_icons(temp_dir, count))
+        ]
+
+        # 旧版：网格布局 + 每个工具一组控件
+        start = time.perf_counter()
+        container = QWidget()
+        grid = QGridLayout(container)
+        grid.setSpacing(20)
+        for i, tool in enumerate(tools):
+            grid.addWidget(create_legacy_tile(tool), i // 4, i % 4)
+        scroll_area = QScrollArea()
+        scroll_area.setFixedSize(405, 440)
+        scroll_area.setWidget(container)
+        scroll_area.show()
+        app.processEvents()
+        results["legacy_build_ms"] = (time.perf_counter() - start) * 1000
+        results["legacy_widgets"] = len(container.findChildren(QWidget)) + 1
+        results["legacy_paint_ms"] = time_paint(scroll_area.viewport(), repeat)
+        scroll_area.close()
+        container.deleteLater()
+
+        # 新版：虚拟化网格 + 栅格化缓存
+        manager = ai_tool_manager.AIToolManager.__new__(ai_tool_manager.AIToolManager)
+        view, model = ai_tool_manager.AIToolManager.create_tool_view(manager)
+        view.setFixedSize(405, 440)
+        start = time.perf_counter()
+        model.set_tools(tools)
+        view.show()
+        app.processEvents()
+        results["grid_build_ms"] = (time.perf_counter() - start) * 1000
+        results["grid_widgets"] = len(view.findChildren(QWidget)) + 1
+        # 首次绘制会提交后台栅格化，等待完成后再测量稳定状态的绘制耗时
+        results["grid_first_paint_ms"] = time_paint(view.viewport(), 1)
+        QThreadPool.globalInstance().waitForDone()
+        app.processEvents()
+        results["grid_paint_ms"] = time_paint(view.viewport(), repeat)
+        view.close()
+        ai_tool_manager.thumbnail_cache.flush()
+    return results
+
+# 生成嵌套的工具目录
+def make_catalog(count, depth=1, icons=None, folder_size=100, fan_out=10):
+    """生成count个工具、depth层文件夹的目录
+    
+    每folder_size个工具放在一个最内层文件夹中，外层每个文件夹包含fan_out个子文件夹；
+    icons为图标路径列表时工具依次使用其中的图标
+    """
+    level = [
+        {"type": "tool", "name": f"工具{i}", "description": f"第{i}个测试工具", "features": "测试",
+         "url": f"https://example.com/{i}", "icon_path": icons[i % len(icons)] if icons else ""}
+        for i in range(count)
+    ]
+    for d in range(depth):
+        size = folder_size if d == 0 else fan_out
+        level = [
+            {"type": "folder", "name": f"文件夹{d}_{k}", "description": "", "features": "", "url": "", "icon_path": "",
+             "children": level[k * size:(k + 1) * size]}
+            for k in range((len(level) + size - 1) // size)
+        ]
+    return level
+
+# 临时切换用户目录
+@contextmanager
+def temporary_home(home_dir):
+    """将用户目录切换到home_dir，返回其中的程序数据目录"""
+    saved_env = {name: os.environ.get(name) for name in ("HOME", "APPDATA")}
+    os.environ.update(HOME=home_dir, APPDATA=home_dir)
+    try:
+        yield ai_tool_manager.get_user_data_dir()
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+# 计时模态对话框
+def time_modal(function, *args):
+    """调用会打开模态对话框的函数，对话框显示后立即关闭，返回耗时（毫秒）"""
+    def close():
+        dialog = QApplication.activeModalWidget()
+        if dialog is None:
+            QTimer.singleShot(0, close)
+            return
+        dialog.done(0)
+    QTimer.singleShot(0, close)
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+# 主窗口热点路径
+def bench_hot_paths(app, count, depth, repeat):
+    """在合成的工具目录上对主窗口的加载、保存、显示、搜索、绘制和对话框计时（毫秒）"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ai_tool_manager.thumbnail_cache = ai_tool_manager.ThumbnailCache(os.path.join(temp_dir, "thumbs"))
+        ai_tool_manager.icon_cache.clear()
+        icon_dir = os.path.join(temp_dir, "icons")
+        os.makedirs(icon_dir)
+        icons = make_mixed_icons(icon_dir, 20)
+        with temporary_home(temp_dir) as data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            ai_tool_manager.write_json_atomic(os.path.join(data_dir, "ai_tools.json"), make_catalog(count, depth, icons))
+            window = ai_tool_manager.AIToolManager()
+        window.show()
+        
+        start = time.perf_counter()
+        window.load_tools()
+        results["load_tools_ms"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        window.search_index.finish()
+        results["index_build_ms"] = (time.perf_counter() - start) * 1000
+        window.index_timer.stop()
+        
+        # 整体重置显示
+        elapsed = 0
+        for _ in range(repeat):
+            window.tool_model.set_tools([])
+            start = time.perf_counter()
+            window.display_tools()
+            app.processEvents()
+            elapsed += time.perf_counter() - start
+        results["display_tools_ms"] = elapsed * 1000 / repeat
+        
+        # 搜索框输入（包含递归搜索和网格刷新）
+        queries = ["工具", "工具1", "工具12", "测试工具3", "example.com/4", "不存在的工具"]
+        elapsed = 0
+        for _ in range(repeat):
+            for query in queries:
+                start = time.perf_counter()
+                window.search_input.setText(query)
+                app.processEvents()
+                elapsed += time.perf_counter() - start
+            window.search_input.setText("")
+        results["filter_tools_ms"] = elapsed * 1000 / (repeat * len(queries))
+        
+        # 网格绘制（替代原来的create_tool_widget），图标解码完成后测量稳定状态
+        window.display_tools(window.catalog.children_of(window.catalog.children_of()[0]) if depth else None)
+        viewport = window.tool_view.viewport()
+        results["grid_first_paint_ms"] = time_paint(viewport, 1)
+        QThreadPool.globalInstance().waitForDone()
+        app.processEvents()
+        results["grid_paint_ms"] = time_paint(viewport, repeat)
+        
+        folders = [tool for tool in window.catalog.children_of() if tool.is_folder]
+        if folders:
+            results["open_toolkit_ms"] = statistics.median(time_modal(window.open_toolkit, folders[0]) for _ in range(repeat))
+        tools = [tool for tool in window.catalog.walk() if not tool.is_folder]
+        results["show_tool_detail_ms"] = statistics.median(time_modal(window.show_tool_detail, tools[0]) for _ in range(repeat))
+        
+        # 修改一个工具后保存
+        tool = tools[-1]
+        elapsed = 0
+        for i in range(repeat):
+            tool["description"] = f"修改{i}"
+            start = time.perf_counter()
+            window.store.tool_updated(tool)
+            window.store.flush()
+            elapsed += time.perf_counter() - start
+        results["save_edit_ms"] = elapsed * 1000 / repeat
+        start = time.perf_counter()
+        window.save_tools()
+        window.store.flush()
+        results["save_tools_ms"] = (time.perf_counter() - start) * 1000
+        
+        window.store.close()
+        window.close()
+        QThreadPool.globalInstance().waitForDone()
+        ai_tool_manager.thumbnail_cache.flush()
+    return results
+
+# 单次修改的保存耗时
+def bench_catalog_save(count, repeat):
+    """在文件夹中添加一个工具后保存，对比整体重写JSON与只写入修改过的分片的耗时（毫秒）"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = os.path.join(temp_dir, "ai_tools.json")
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(make_catalog(count), f, ensure_ascii=False)
+        stores = {
+            "json": lambda catalog: ai_tool_manager.JsonCatalogStore(json_file, catalog),
+            "shards": lambda catalog: ai_tool_manager.ShardedCatalogStore(os.path.join(temp_dir, "catalog"), json_file, catalog),
+        }
+        for name, create_store in stores.items():
+            catalog = ai_tool_manager.ToolCatalog()
+            store = create_store(catalog)
+            store.load()
+            store.flush()
+            folder = catalog.children_of()[-1]
+            elapsed = 0
+            for i in range(repeat):
+                tool = catalog.add({"type": "tool", "name": f"新工具{i}", "description": "", "features": "", "url": "", "icon_path": ""}, folder)
+                store.tool_added(tool)
+                start = time.perf_counter()
+                store.flush()
+                elapsed += time.perf_counter() - start
+            store.close()
+            results[f"{name}_save_ms"] = elapsed * 1000 / repeat
+    return results
+
+# 启动时加载工具目录的耗时
+def bench_catalog_load(count):
+    """对比json.load解析整个ai_tools.json与内存映射二进制目录的加载耗时（毫秒）"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = os.path.join(temp_dir, "ai_tools.json")
+        ai_tool_manager.write_json_atomic(json_file, make_catalog(count))
+        # 生成二进制目录
+        store = ai_tool_manager.BinaryCatalogStore(json_file, ai_tool_manager.ToolCatalog())
+        store.load()
+        store.close()
+        results["json_bytes"] = os.path.getsize(json_file)
+        results["binary_bytes"] = os.path.getsize(store.binary_file)
+        
+        start = time.perf_counter()
+        with open(json_file, 'r', encoding='utf-8') as f:
+            tools = json.load(f)
+        results["json_load_ms"] = (time.perf_counter() - start) * 1000
+        ai_tool_manager.ToolCatalog().load(tools)
+        results["json_catalog_ms"] = (time.perf_counter() - start) * 1000
+        
+        catalog = ai_tool_manager.ToolCatalog()
+        store = ai_tool_manager.BinaryCatalogStore(json_file, catalog)
+        start = time.perf_counter()
+        store.load()
+        results["binary_load_ms"] = (time.perf_counter() - start) * 1000
+        # 首次搜索时解码全部工具
+        start = time.perf_counter()
+        catalog.load_all()
+        results["binary_decode_all_ms"] = (time.perf_counter() - start) * 1000
+        store.close()
+    return results
+
+# 工具记录的内存占用
+def bench_record_memory(count):
+    """对比count个工具保存为字典与工具记录（Tool）时的内存占用（字节，包含字段值）"""
+    content = json.dumps([
+        {"id": ai_tool_manager.ToolCatalog.new_id(), "type": "tool", "name": f"工具{i}", "description": f"第{i}个测试工具",
+         "features": "测试", "url": f"https://example.com/{i}", "icon_path": "./icon/ChatGPT.jpg"}
+        for i in range(count)
+    ], ensure_ascii=False)
+    results = {}
+    tracemalloc.start()
+    tools = json.loads(content)
+    results["dict_bytes"] = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tools
+    tracemalloc.start()
+    tools = [ai_tool_manager.Tool.from_dict(tool) for tool in json.loads(content)]
+    results["record_bytes"] = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tools
+    results["saved_bytes_per_tool"] = (results["dict_bytes"] - results["record_bytes"]) // count
+    return results
+
+# 启动耗时
+def bench_startup(count, runs):
+    """在独立进程中启动程序，统计首次绘制、可交互和搜索索引建立完成的耗时（毫秒，取中位数）"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = dict(os.environ, HOME=temp_dir, APPDATA=temp_dir, BINGZ_STARTUP_TIMING="exit")
+        # 写入测试用的工具目录
+        with temporary_home(temp_dir) as data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            ai_tool_manager.write_json_atomic(os.path.join(data_dir, "ai_tools.json"), make_catalog(count))
+        
+        samples = {}
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(ai_tool_manager.__file__)],
+                env=env, capture_output=True, text=True, timeout=300
+            )
+            lines = [line for line in result.stderr.splitlines() if line.startswith("{")]
+            if not lines:
+                raise RuntimeError(f"启动失败: {result.stderr[-500:]}")
+            for name, value in json.loads(lines[-1]).items():
+                samples.setdefault(name, []).append(value)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+# 本地HTTP服务器
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """提供静态文件，支持单个Range请求；rate为每个连接的限速（字节/秒，0为不限速），模拟CDN的单连接带宽"""
+    rate = 0
+    ranges = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        header = self.headers.get("Range", "")
+        if self.ranges and header.startswith("bytes="):
+            first, _, last = header[len("bytes="):].partition("-")
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes" if self.ranges else "none")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        
+        begin = time.perf_counter()
+        sent = 0
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while sent < end - start + 1:
+                chunk = f.read(min(64 * 1024, end - start + 1 - sent))
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return
+                sent += len(chunk)
+                if self.rate:
+                    delay = sent / self.rate - (time.perf_counter() - begin)
+                    if delay > 0:
+                        time.sleep(delay)
+
+@contextmanager
+def serve_directory(directory, rate=0, ranges=True):
+    """在后台线程中启动本地HTTP服务器，返回基础URL"""
+    handler = type("Handler", (RangeRequestHandler,), {"rate": rate, "ranges": ranges})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# 更新下载吞吐量
+def bench_download(size_mb, rate_mb, runs):
+    """从本地服务器下载size_mb的文件，对比单连接、分段并发和服务器不支持Range时的耗时（毫秒，取中位数）、吞吐量（MB/s）和请求数"""
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        serve_dir = os.path.join(temp_dir, "release")
+        os.makedirs(serve_dir)
+        content = os.urandom(size_mb * 1024 * 1024)
+        with open(os.path.join(serve_dir, "update.bin"), 'wb') as f:
+            f.write(content)
+        sha256 = hashlib.sha256(content).hexdigest()
+        save_path = os.path.join(temp_dir, "update.bin")
+        
+        for name, ranges, segment_count in (("single", True, 1), ("segmented", True, None), ("no_range", False, None)):
+            with serve_directory(serve_dir, int(rate_mb * 1024 * 1024), ranges) as base_url:
+                ai_tool_manager.network.metrics.clear()
+                samples = []
+                for _ in range(runs):
+                    downloader = ai_tool_manager.UpdateDownloader(base_url + "update.bin", save_path, sha256, segment_count=segment_count)
+                    errors = []
+                    downloader.error.connect(errors.append)
+                    start = time.perf_counter()
+                    downloader.run()
+                    samples.append(time.perf_counter() - start)
+                    if errors:
+                        raise RuntimeError(errors[0])
+                    os.remove(save_path)
+            elapsed = statistics.median(samples)
+            results[f"{name}_ms"] = elapsed * 1000
+            results[f"{name}_mb_per_s"] = size_mb / elapsed
+            # 每次下载的HTTP请求数（来自网络访问层的记录）
+            results[f"{name}_requests"] = len(ai_tool_manager.network.metrics) // runs
+    return results
+
+# 提交在仓库中的基线结果，默认与其对比
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# 改变测试规模的参数，与基线不同时结果不可比
+SCALE_ARGUMENTS = ("hot_tools", "depth", "svg_tools", "record_count", "download_size", "download_rate")
+
+# 与基线对比
+def find_regressions(results, baseline, threshold, min_delta=1.0):
+    """找出比基线慢（或占用更多内存）超过threshold比例的指标，耗时指标的差值还需超过min_delta毫秒"""
+    regressions = []
+    for suite, metrics in results.items():
+        for name, value in metrics.items():
+            base = baseline.get(suite, {}).get(name)
+            if not isinstance(base, (int, float)) or not base or not (name.endswith("_ms") or name.endswith("_bytes")):
+                continue
+            if name.endswith("_ms") and value - base < min_delta:
+                continue
+            if value > base * (1 + threshold):
+                regressions.append((suite, name, base, value))
+    return regressions
+
+def print_results(title, results):
+    print("=" * 50)
+    print(title)
+    for name, value in results.items():
+        print(f"  {name:<22} {value:10.2f}" if isinstance(value, float) else f"  {name:<22} {value:10d}")
+
+def main():
+    parser = argparse.ArgumentParser(description="BingZ工具包性能基准测试")
+    parser.add_argument("--suites", default="hot,svg,memory,startup,load,save,download", help="要运行的测试（逗号分隔）")
+    parser.add_argument("--hot-tools", type=int, default=5000, help="热点路径测试的工具数量")
+    parser.add_argument("--depth", type=int, default=2, help="热点路径测试的文件夹层数")
+    parser.add_argument("--svg-tools", type=int, default=500, help="全SVG目录的工具数量")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    parser.add_argument("--record-count", type=int, default=100000, help="内存测试的工具数量")
+    parser.add_argument("--startup-runs", type=int, default=5, help="启动测试的运行次数")
+    parser.add_argument("--catalog-sizes", default="1000,10000,100000", help="启动、加载和保存测试的工具数量（逗号分隔）")
+    parser.add_argument("--download-size", type=int, default=64, help="下载测试的文件大小（MB）")
+    parser.add_argument("--download-rate", type=float, default=20, help="下载测试中服务器每个连接的限速（MB/s，0为不限速）")
+    parser.add_argument("--download-runs", type=int, default=3, help="下载测试的运行次数")
+    parser.add_argument("--output", help="将结果写入JSON文件")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="与之前保存的结果文件对比，有性能回退时返回非零退出码（默认为benchmark_baseline.json，为空时不对比）")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回退的变慢比例")
+    args = parser.parse_args()
+    suites = set(args.suites.split(","))
+
+    app = QApplication(sys.argv)
+    results = {}
+    
+    if "hot" in suites:
+        results["hot"] = bench_hot_paths(app, args.hot_tools, args.depth, args.repeat)
+        print_results(f"主窗口热点路径测试（{args.hot_tools}个工具，{args.depth}层文件夹）", results["hot"])
+    if "svg" in suites:
+        results["svg_grid"] = bench_svg_grid(app, args.svg_tools, args.repeat)
+        print_results(f"全SVG工具目录网格测试（{args.svg_tools}个工具）", results["svg_grid"])
+    if "memory" in suites:
+        results["memory"] = bench_record_memory(args.record_count)
+        print_results(f"工具记录内存测试（{args.record_count}个工具）", results["memory"])
+    if "download" in suites:
+        results["download"] = bench_download(args.download_size, args.download_rate, args.download_runs)
+        print_results(f"更新下载测试（{args.download_size}MB，每个连接限速{args.download_rate:g}MB/s）", results["download"])
+    for count in map(int, args.catalog_sizes.split(",")):
+        if "startup" in suites:
+            results[f"startup_{count}"] = bench_startup(count, args.startup_runs)
+            print_results(f"启动测试（{count}个工具）", results[f"startup_{count}"])
+        if "load" in suites:
+            results[f"load_{count}"] = bench_catalog_load(count)
+            print_results(f"工具目录加载测试（{count}个工具）", results[f"load_{count}"])
+        if "save" in suites:
+            results[f"save_{count}"] = bench_catalog_save(count, args.repeat)
+            print_results(f"工具目录保存测试（{count}个工具，每次添加一个工具）", results[f"save_{count}"])
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "environment": {"python": platform.python_version(), "qt": QT_VERSION_STR, "platform": platform.platform()},
+                "arguments": vars(args),
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        base_arguments = baseline.get("arguments", {})
+        changed = [name for name in SCALE_ARGUMENTS if name in base_arguments and base_arguments[name] != getattr(args, name)]
+        if changed:
+            print("=" * 50)
+            print(f"测试规模与基线不同（{', '.join(changed)}），不与基线对比")
+            return 0
+        regressions = find_regressions(results, baseline.get("results", {}), args.threshold)
+        print("=" * 50)
+        if not regressions:
+            print(f"与基线相比没有超过{args.threshold:.0%}的性能回退")
+            return 0
+        print(f"性能回退（超过{args.threshold:.0%}）：")
+        for suite, name, base, value in regressions:
+            print(f"  {suite}.{name:<22} {base:10.2f} -> {value:10.2f}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
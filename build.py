@@ -3,6 +3,8 @@ import os
 import sys
 import subprocess
 import platform
+import hashlib
+import json
 
 # Install dependencies
 def install_dependencies():
@@ -69,8 +71,86 @@ def build_windows():
     
 
 
+# 生成增量更新包
+def build_deltas(previous_dir, dist_dir, previous_version):
+    """为dist_dir中每个在previous_dir里有同名旧版本的产物生成“文件名-from-旧版本号.bzdelta”"""
+    from ai_tool_manager import make_delta, DELTA_SUFFIX
+    previous_version = previous_version.lstrip("vV")
+    for name in sorted(os.listdir(dist_dir)):
+        new_path = os.path.join(dist_dir, name)
+        old_path = os.path.join(previous_dir, name)
+        if name.endswith(DELTA_SUFFIX) or not os.path.isfile(new_path) or not os.path.isfile(old_path):
+            continue
+        with open(old_path, "rb") as f:
+            old = f.read()
+        with open(new_path, "rb") as f:
+            new = f.read()
+        delta = make_delta(old, new)
+        # 增量更新包不够小时没有意义，客户端会下载完整更新包
+        if len(delta) > len(new) // 2:
+            print(f"Skipping delta for {name}: {len(delta)} bytes")
+            continue
+        delta_path = os.path.join(dist_dir, f"{name}-from-{previous_version}{DELTA_SUFFIX}")
+        with open(delta_path, "wb") as f:
+            f.write(delta)
+        print(f"Delta {delta_path}: {len(delta)} bytes (full {len(new)} bytes)")
+
+# 生成更新清单
+def build_manifest(release_dir, version, notes=""):
+    """为镜像或共享目录中的更新文件生成更新清单version.json（各平台的文件名、大小和SHA-256），
+    设置了环境变量BINGZ_SIGNING_KEY（私钥种子，十六进制）时同时签名"""
+    assets = []
+    for name in sorted(os.listdir(release_dir)):
+        path = os.path.join(release_dir, name)
+        lower = name.lower()
+        if not os.path.isfile(path) or name == "version.json":
+            continue
+        # 平台判断与UpdateChecker.get_platform_asset一致
+        if "mac" in lower or "darwin" in lower:
+            asset_platform = "darwin"
+        elif "win" in lower:
+            asset_platform = "win32"
+        elif "linux" in lower:
+            asset_platform = "linux"
+        else:
+            continue
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        assets.append({"platform": asset_platform, "name": name, "size": os.path.getsize(path), "sha256": digest.hexdigest()})
+    manifest = {"version": version.lstrip("vV"), "notes": notes, "assets": assets}
+    signing_key = os.getenv("BINGZ_SIGNING_KEY")
+    if signing_key:
+        from ai_tool_manager import Ed25519, manifest_payload
+        manifest["signature"] = Ed25519.sign(bytes.fromhex(signing_key), manifest_payload(manifest)).hex()
+    with open(os.path.join(release_dir, "version.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"Manifest {os.path.join(release_dir, 'version.json')}: {len(assets)} assets")
+
+# 生成更新清单签名密钥
+def generate_signing_key():
+    """生成Ed25519密钥对：私钥种子发布时通过BINGZ_SIGNING_KEY使用（不要提交），公钥填入UPDATE_PUBLIC_KEY"""
+    from ai_tool_manager import Ed25519
+    seed = os.urandom(32)
+    print(f"BINGZ_SIGNING_KEY={seed.hex()}")
+    print(f"UPDATE_PUBLIC_KEY={Ed25519.public_key(seed).hex()}")
+
 # 主函数
 def main():
+    # python build.py delta <上一版本的产物目录> <本次产物目录> <上一版本号>
+    if len(sys.argv) == 5 and sys.argv[1] == "delta":
+        build_deltas(*sys.argv[2:5])
+        return
+    # python build.py manifest <镜像或共享目录> <版本号> [更新说明]
+    if len(sys.argv) in (4, 5) and sys.argv[1] == "manifest":
+        build_manifest(*sys.argv[2:])
+        return
+    # python build.py keygen
+    if len(sys.argv) == 2 and sys.argv[1] == "keygen":
+        generate_signing_key()
+        return
+    
     print("=" * 50)
     
     # 检测当前平台
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# 离屏运行，不需要显示器
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """整个测试过程共用一个QApplication"""
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """用户目录指向临时目录，避免读写真实的用户数据"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,74 @@
+import json
+import os
+import time
+
+import pytest
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+
+from ai_tool_manager import CatalogSaver, write_file_atomic
+
+
+def test_changes_are_coalesced_into_one_write(qapp, tmp_path):
+    """延迟期间的多次修改合并为一次写入，写入的是最新的快照"""
+    data_file = tmp_path / "ai_tools.json"
+    state = {"version": 0, "snapshots": 0}
+
+    def snapshot():
+        state["snapshots"] += 1
+        return [{"version": state["version"]}]
+
+    saver = CatalogSaver(str(data_file), snapshot, delay=50)
+    saved = []
+    saver.saved.connect(lambda: saved.append(True), Qt.DirectConnection)
+    for version in range(1, 6):
+        state["version"] = version
+        saver.schedule()
+    assert saver.busy() and not data_file.exists()
+    deadline = time.time() + 5
+    while not saved and time.time() < deadline:
+        QTest.qWait(10)
+    assert state["snapshots"] == 1 and len(saved) == 1
+    assert json.loads(data_file.read_text(encoding="utf-8")) == [{"version": 5}]
+
+    # 退出时立即写入尚未提交的修改
+    state["version"] = 6
+    saver.schedule()
+    saver.stop()
+    assert not saver.isRunning() and not saver.busy()
+    assert json.loads(data_file.read_text(encoding="utf-8")) == [{"version": 6}]
+
+
+def test_write_error_is_reported(qapp, tmp_path):
+    """写入失败时通过error信号报告，之后的修改仍会写入"""
+    saver = CatalogSaver(str(tmp_path / "missing" / "ai_tools.json"), lambda: [], delay=0)
+    errors = []
+    saver.error.connect(errors.append, Qt.DirectConnection)
+    saver.save_now()
+    saver.flush()
+    assert len(errors) == 1 and errors[0].startswith("保存失败")
+
+    (tmp_path / "missing").mkdir()
+    saver.save_now()
+    saver.stop()
+    assert (tmp_path / "missing" / "ai_tools.json").read_text(encoding="utf-8") == "[]"
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    """替换文件前失败时原文件不变，也不留下临时文件"""
+    data_file = tmp_path / "ai_tools.json"
+    data_file.write_bytes(b"old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_file_atomic(str(data_file), b"new")
+    assert data_file.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["ai_tools.json"]
+
+    monkeypatch.undo()
+    write_file_atomic(str(data_file), b"new")
+    assert data_file.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["ai_tools.json"]
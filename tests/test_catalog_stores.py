@@ -0,0 +1,162 @@
+import json
+import sqlite3
+import threading
+
+from ai_tool_manager import BinaryCatalogStore, ShardedCatalogStore, ShardSaver, SqliteCatalogStore, ToolCatalog
+
+
+def make_folders(folder_count, tool_count):
+    """生成folder_count个文件夹，每个文件夹中有tool_count个工具"""
+    return [
+        {"id": f"f{i}", "type": "folder", "name": f"文件夹{i}", "description": "", "features": "", "icon_path": "",
+         "children": [
+             {"id": f"f{i}t{j}", "type": "tool", "name": f"工具{i}-{j}", "description": "", "features": "",
+              "url": "", "icon_path": ""}
+             for j in range(tool_count)
+         ]}
+        for i in range(folder_count)
+    ]
+
+
+def test_binary_store_reopens_evicted_folders(qapp, tmp_path):
+    """文件夹内容卸载后再次打开，仍能从二进制文件解码，保存时不会丢失"""
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(make_folders(5, 3), ensure_ascii=False), encoding="utf-8")
+    # 第一次加载时生成二进制文件
+    store = BinaryCatalogStore(str(json_file), ToolCatalog())
+    store.load()
+    store.close()
+
+    catalog = ToolCatalog()
+    catalog.MAX_LOADED_FOLDERS = 2
+    store = BinaryCatalogStore(str(json_file), catalog)
+    store.load()
+    assert store.binary is not None
+    try:
+        for _ in range(2):
+            for folder in catalog.children_of():
+                assert len(catalog.children_of(folder)) == 3
+        assert len(catalog.loaded) <= 2
+
+        store.tool_added(catalog.add({"type": "tool", "name": "新工具", "description": "", "features": "", "url": "", "icon_path": ""}))
+        store.flush()
+    finally:
+        store.close()
+
+    saved = json.loads(json_file.read_text(encoding="utf-8"))
+    folders = [tool for tool in saved if tool.get("type") == "folder"]
+    assert len(folders) == 5
+    assert all(len(folder["children"]) == 3 for folder in folders)
+
+
+def test_sharded_store_keeps_folders_loaded_until_written(qapp, tmp_path, monkeypatch):
+    """分片写入完成前不卸载修改过的文件夹，卸载后重新读取的是修改后的内容"""
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(make_folders(4, 3), ensure_ascii=False), encoding="utf-8")
+    catalog_dir = str(tmp_path / "catalog")
+    store = ShardedCatalogStore(catalog_dir, str(json_file), ToolCatalog())
+    store.load()
+    store.close()
+
+    # 分片写入在后台线程中等待，直到released被设置
+    released = threading.Event()
+    write = ShardSaver.write
+    monkeypatch.setattr(ShardSaver, "write", lambda self, data: (released.wait(10), write(self, data)))
+
+    catalog = ToolCatalog()
+    catalog.MAX_LOADED_FOLDERS = 1
+    store = ShardedCatalogStore(catalog_dir, str(json_file), catalog)
+    store.load()
+    try:
+        folders = catalog.children_of()
+        tool = catalog.children_of(folders[0])[0]
+        tool["name"] = "修改后的名称"
+        store.tool_updated(tool)
+        store.saver.save_now()
+        assert store.saver.busy()
+        for folder in folders[1:]:
+            catalog.children_of(folder)
+        assert catalog.get(tool["id"]) is tool
+
+        released.set()
+        store.flush()
+        assert not store.saver.busy()
+        for folder in folders[1:]:
+            catalog.children_of(folder)
+        assert folders[0]["id"] in catalog.unloaded
+        assert catalog.children_of(folders[0])[0]["name"] == "修改后的名称"
+    finally:
+        released.set()
+        store.close()
+
+
+def test_sqlite_store_loads_folders_on_demand(qapp, tmp_path):
+    """SQLite存储启动时只读取顶层，搜索只加载包含匹配工具的文件夹，全部重写后内容不变"""
+    tools = make_folders(5, 3)
+    tools[2]["children"].append({"id": "sub", "type": "folder", "name": "子文件夹", "children": [
+        {"id": "deep", "type": "tool", "name": "深层工具", "url": ""}]})
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(tools, ensure_ascii=False), encoding="utf-8")
+    db_file = str(tmp_path / "ai_tools.db")
+    store = SqliteCatalogStore(db_file, str(json_file), ToolCatalog())
+    store.load()
+    store.close()
+
+    catalog = ToolCatalog()
+    store = SqliteCatalogStore(db_file, str(json_file), catalog)
+    store.load()
+    try:
+        assert len(catalog) == 5
+        index = store.create_search_index()
+        index.rebuild()
+        # 全文索引和过短查询的逐行比较都不需要先加载文件夹
+        assert [tool["id"] for tool in index.search("深层工", recursive=True)] == ["deep"]
+        assert set(catalog.loaded) == {"f2", "sub"}
+        assert sorted(tool["id"] for tool in index.search("4-", recursive=True)) == ["f4t0", "f4t1", "f4t2"]
+        assert set(catalog.loaded) == {"f2", "sub", "f4"}
+        assert index.search_paths([catalog.get("deep")]) == {"deep": "文件夹2 / 子文件夹"}
+
+        store.save_all()
+    finally:
+        store.close()
+
+    catalog = ToolCatalog()
+    store = SqliteCatalogStore(db_file, str(json_file), catalog)
+    store.load()
+    try:
+        assert len(list(catalog.walk())) == 5 + 15 + 2
+    finally:
+        store.close()
+
+
+def test_sqlite_migration_failure_is_retried(qapp, tmp_path, monkeypatch):
+    """迁移写入失败时不写入迁移标记，下次启动重新从JSON迁移"""
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(make_folders(3, 3), ensure_ascii=False), encoding="utf-8")
+    db_file = str(tmp_path / "ai_tools.db")
+
+    write_tool = SqliteCatalogStore.write_tool
+    calls = []
+
+    def failing_write_tool(self, tool, seq):
+        calls.append(tool["id"])
+        if len(calls) == 5:
+            raise sqlite3.OperationalError("disk I/O error")
+        write_tool(self, tool, seq)
+
+    monkeypatch.setattr(SqliteCatalogStore, "write_tool", failing_write_tool)
+    store = SqliteCatalogStore(db_file, str(json_file), ToolCatalog())
+    errors = []
+    store.error.connect(errors.append)
+    store.load()
+    assert len(errors) == 1
+    assert store.conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0
+    assert store.conn.execute("SELECT COUNT(*) FROM tools").fetchone()[0] == 0
+    store.close()
+    monkeypatch.undo()
+
+    catalog = ToolCatalog()
+    store = SqliteCatalogStore(db_file, str(json_file), catalog)
+    store.load()
+    store.close()
+    assert len(list(catalog.walk())) == 3 + 9
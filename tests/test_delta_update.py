@@ -0,0 +1,84 @@
+import hashlib
+import os
+import random
+
+import pytest
+
+from ai_tool_manager import UpdateChecker, apply_delta, make_delta
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def new_version(source):
+    """模拟新版本：修改、删除、插入和移动部分内容，末尾追加新数据"""
+    rng = random.Random(1)
+    target = bytearray(source)
+    target[1000:1010] = b"x" * 10
+    del target[50000:52000]
+    target[90000:90000] = rng.randbytes(3000)
+    target = target[150000:] + target[:150000]
+    return bytes(target) + rng.randbytes(500)
+
+
+def test_delta_round_trip(tmp_path):
+    """增量更新包应用到旧版本后得到新版本，大小远小于新版本"""
+    source = random.Random(0).randbytes(200 * 1024)
+    target = new_version(source)
+    delta = make_delta(source, target)
+    assert len(delta) < len(target) // 20
+    source_path = write(tmp_path / "old.bin", source)
+    delta_path = write(tmp_path / "update.bzdelta", delta)
+    output_path = str(tmp_path / "new.bin")
+    expected = hashlib.sha256(target).hexdigest()
+    assert apply_delta(source_path, delta_path, output_path, expected) == expected
+    with open(output_path, "rb") as f:
+        assert f.read() == target
+
+    # 没有相同内容或文件比块还小时全部作为插入数据
+    for old, new in ((b"", b"new"), (b"abc", b"")):
+        write(tmp_path / "old.bin", old)
+        write(tmp_path / "update.bzdelta", make_delta(old, new))
+        apply_delta(source_path, delta_path, output_path)
+        with open(output_path, "rb") as f:
+            assert f.read() == new
+
+
+def test_delta_rejects_mismatched_base(tmp_path):
+    """基准文件不是生成增量更新包时的旧版本、目标与完整更新包不一致或包已损坏时抛出ValueError，不留下输出文件"""
+    source = random.Random(0).randbytes(64 * 1024)
+    target = new_version(source)
+    delta = make_delta(source, target)
+    delta_path = write(tmp_path / "update.bzdelta", delta)
+    output_path = tmp_path / "new.bin"
+
+    modified = bytearray(source)
+    modified[100] ^= 1
+    for base in (bytes(modified), source[:-1]):
+        with pytest.raises(ValueError, match="不匹配"):
+            apply_delta(write(tmp_path / "old.bin", base), delta_path, str(output_path))
+    source_path = write(tmp_path / "old.bin", source)
+    with pytest.raises(ValueError, match="不一致"):
+        apply_delta(source_path, delta_path, str(output_path), "0" * 64)
+    write(tmp_path / "update.bzdelta", delta[:-20])
+    with pytest.raises(ValueError, match="损坏"):
+        apply_delta(source_path, delta_path, str(output_path))
+    write(tmp_path / "update.bzdelta", b"BZD0" + delta[4:])
+    with pytest.raises(ValueError):
+        apply_delta(source_path, delta_path, str(output_path))
+    assert sorted(os.listdir(tmp_path)) == ["old.bin", "update.bzdelta"]
+
+
+def test_delta_asset_selected_for_current_version(home):
+    """只使用从当前版本生成的增量更新包（v1.1和1.1.0视为相同版本）"""
+    assets = [
+        {"name": "BingZ-linux.tar.gz", "platform": "linux"},
+        {"name": "BingZ-linux.tar.gz-from-1.0.bzdelta"},
+        {"name": "BingZ-linux.tar.gz-from-1.1.bzdelta"},
+    ]
+    checker = UpdateChecker("v1.1.0", "owner", "repo", sources=[])
+    asset = checker.with_delta(assets[0], assets)
+    assert asset["delta"]["name"] == "BingZ-linux.tar.gz-from-1.1.bzdelta"
+    assert "delta" not in UpdateChecker("1.2", "owner", "repo", sources=[]).with_delta(assets[0], assets)
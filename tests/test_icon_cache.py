@@ -0,0 +1,55 @@
+from PyQt5.QtGui import QPixmap
+
+import ai_tool_manager
+from ai_tool_manager import IconCache, ThumbnailCache, load_tool_pixmap
+
+
+def make_pixmap(size):
+    pixmap = QPixmap(size, size)
+    pixmap.fill()
+    return pixmap
+
+
+def test_lru_eviction_within_budget(qapp):
+    """超出内存预算时淘汰最久未使用的图标，读取会刷新使用顺序"""
+    cost = IconCache.pixmap_bytes(make_pixmap(10))
+    cache = IconCache(max_bytes=3 * cost)
+    for key in "abc":
+        cache.put(key, make_pixmap(10))
+    assert cache.get("a") is not None
+    cache.put("d", make_pixmap(10))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.current_bytes == 3 * cost
+    assert cache.stats()["evictions"] == 1
+
+    # 替换同一键时不重复计算内存
+    cache.put("a", make_pixmap(10))
+    assert cache.current_bytes == 3 * cost and cache.stats()["entries"] == 3
+
+    # 超过整个预算的图标不缓存，也不淘汰已有图标
+    cache.put("big", make_pixmap(100))
+    assert cache.get("big") is None and cache.stats()["entries"] == 3
+
+    cache.set_max_bytes(cost)
+    assert cache.stats()["entries"] == 1 and cache.get("a") is not None
+    stats = cache.stats()
+    assert (stats["bytes"], stats["evictions"]) == (cost, 3)
+    assert stats["hits"] > 0 and stats["misses"] == 2
+
+
+def test_icon_loaded_once_for_all_views(qapp, tmp_path, monkeypatch):
+    """同一图标、同一尺寸只解码一次，之后各处从共享缓存读取"""
+    monkeypatch.setattr(ai_tool_manager, "icon_cache", IconCache())
+    monkeypatch.setattr(ai_tool_manager, "thumbnail_cache", ThumbnailCache(str(tmp_path / "thumbs")))
+    icon_path = str(tmp_path / "icon.png")
+    make_pixmap(64).save(icon_path, "PNG")
+    decoded = []
+    original = ai_tool_manager.load_source_image
+    monkeypatch.setattr(ai_tool_manager, "load_source_image", lambda path: decoded.append(path) or original(path))
+
+    first = load_tool_pixmap(icon_path, 50, True)
+    assert first is not None and decoded == [icon_path]
+    assert load_tool_pixmap(icon_path, 50, True) is first
+    assert decoded == [icon_path]
+    assert ai_tool_manager.icon_cache.stats()["hits"] == 1
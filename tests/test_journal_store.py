@@ -0,0 +1,94 @@
+import json
+
+from PyQt5.QtWidgets import QApplication
+
+from ai_tool_manager import JournalCatalogStore, ToolCatalog
+
+from test_catalog_stores import make_folders
+
+
+def new_tool(name):
+    return {"id": name, "type": "tool", "name": name, "description": "", "features": "", "url": "", "icon_path": ""}
+
+
+def close_store(store):
+    """关闭存储，并处理合并完成的信号（删除旧日志）"""
+    store.close()
+    QApplication.processEvents()
+
+
+def open_store(data_file):
+    catalog = ToolCatalog()
+    store = JournalCatalogStore(str(data_file), catalog)
+    store.load()
+    return catalog, store
+
+
+def add_tool(data_file, name):
+    """重新打开存储，添加一个工具后关闭，返回添加前工具目录中的工具ID"""
+    catalog, store = open_store(data_file)
+    ids = {tool["id"] for tool in catalog.walk()}
+    store.tool_added(catalog.add(new_tool(name)))
+    close_store(store)
+    return ids
+
+
+def tool_ids(data_file):
+    catalog, store = open_store(data_file)
+    ids = {tool["id"] for tool in catalog.walk()}
+    close_store(store)
+    return ids
+
+
+def make_snapshot(tmp_path):
+    data_file = tmp_path / "ai_tools.json"
+    data_file.write_text(json.dumps(make_folders(1, 1), ensure_ascii=False), encoding="utf-8")
+    return data_file
+
+
+def test_torn_tail_is_truncated(qapp, tmp_path):
+    """日志末尾写入一半的记录被截掉，之后追加的记录可以正常重放"""
+    data_file = make_snapshot(tmp_path)
+    journal_file = tmp_path / "ai_tools.journal"
+    add_tool(data_file, "B")
+    with open(journal_file, "ab") as f:
+        f.write(b'{"op":"add","tool":{"id":"tor')
+    assert "B" in tool_ids(data_file)
+    add_tool(data_file, "C")
+    assert {"B", "C"} <= tool_ids(data_file)
+
+
+def test_record_without_newline_is_dropped(qapp, tmp_path):
+    """缺少换行符的最后一条记录视为写入不完整，不会与之后追加的记录连在一起"""
+    data_file = make_snapshot(tmp_path)
+    journal_file = tmp_path / "ai_tools.journal"
+    add_tool(data_file, "A")
+    add_tool(data_file, "B")
+    journal_file.write_bytes(journal_file.read_bytes().rstrip(b"\n"))
+
+    ids = tool_ids(data_file)
+    assert "A" in ids and "B" not in ids
+    assert journal_file.read_bytes().endswith(b"\n")
+    add_tool(data_file, "C")
+    ids = tool_ids(data_file)
+    assert {"A", "C"} <= ids and "B" not in ids
+
+
+def test_crash_during_compaction_replays_old_journal(qapp, tmp_path):
+    """合并时崩溃（旧日志残留），重启后重放旧日志和当前日志并重新合并；重复重放已合并的记录结果相同"""
+    data_file = make_snapshot(tmp_path)
+    journal_file = tmp_path / "ai_tools.journal"
+    old_journal_file = tmp_path / "ai_tools.journal.old"
+    add_tool(data_file, "A")
+    # 日志已转为旧日志，快照尚未写入
+    journal_file.replace(old_journal_file)
+    add_tool(data_file, "B")
+    assert not old_journal_file.exists()
+    snapshot = json.loads(data_file.read_text(encoding="utf-8"))
+    assert "A" in {tool["id"] for tool in snapshot}
+    assert tool_ids(data_file) == {"f0", "f0t0", "A", "B"}
+
+    # 快照已写入，旧日志尚未删除
+    old_journal_file.write_text(json.dumps({"op": "add", "parent": None, "tool": new_tool("A")}) + "\n", encoding="utf-8")
+    assert tool_ids(data_file) == {"f0", "f0t0", "A", "B"}
+    assert not old_journal_file.exists()
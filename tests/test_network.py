@@ -0,0 +1,98 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from ai_tool_manager import NetworkService
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """/fail/N：前N次请求返回503；/slow：等待后返回，记录最大并发数"""
+    lock = threading.Lock()
+    counts = {}
+    active = 0
+    max_active = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.counts[self.path] = cls.counts.get(self.path, 0) + 1
+            count = cls.counts[self.path]
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            if self.path == "/slow":
+                time.sleep(0.1)
+            status = 503 if self.path.startswith("/fail/") and count <= int(self.path.split("/")[2]) else 200
+            body = b"ok" * 50
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+@contextmanager
+def serve_flaky():
+    handler = type("Handler", (FlakyHandler,), {"counts": {}, "active": 0, "max_active": 0, "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", handler
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def service():
+    service = NetworkService()
+    service.RETRY_DELAY = 0
+    return service
+
+
+def test_retries_and_metrics(service):
+    """503在重试次数内重试，超过后把最后的响应交给调用方；每个请求记录状态、尝试次数和字节数"""
+    with serve_flaky() as (base_url, handler):
+        response = service.get(base_url + "/fail/2")
+        assert response.status_code == 200 and response.content == b"ok" * 50
+        response = service.get(base_url + "/fail/5")
+        assert response.status_code == 503
+        assert handler.counts == {"/fail/2": 3, "/fail/5": 3}
+
+    first, second = service.metrics
+    assert (first["status"], first["attempts"], first["bytes"], first["error"]) == (200, 3, 100, None)
+    assert (second["status"], second["attempts"]) == (503, 3)
+    assert first["latency_ms"] <= first["duration_ms"]
+    summary = service.summary()[first["host"]]
+    assert (summary["requests"], summary["errors"], summary["bytes"]) == (2, 1, 200)
+
+
+def test_connection_errors_are_retried(service):
+    """连接失败时重试，全部失败后抛出异常并记录错误"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        service.get(f"http://127.0.0.1:{port}/", retries=1)
+    metric = service.metrics[-1]
+    assert metric["attempts"] == 2 and metric["status"] is None and metric["error"]
+
+
+def test_per_host_concurrency_limit(service):
+    """同一主机的并发请求数不超过MAX_PER_HOST"""
+    service.MAX_PER_HOST = 2
+    with serve_flaky() as (base_url, handler):
+        futures = [service.submit(service.get, base_url + "/slow") for _ in range(6)]
+        assert all(future.result().status_code == 200 for future in futures)
+        assert handler.counts["/slow"] == 6
+        assert handler.max_active == 2
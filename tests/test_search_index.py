@@ -0,0 +1,134 @@
+import json
+
+from ai_tool_manager import ShardedCatalogStore, ToolCatalog, ToolSearchIndex
+
+from test_catalog_stores import make_folders
+
+
+def open_sharded(tmp_path, tools):
+    """迁移ai_tools.json为分片后重新打开，返回只加载了顶层的工具目录和存储"""
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(tools, ensure_ascii=False), encoding="utf-8")
+    store = ShardedCatalogStore(str(tmp_path / "catalog"), str(json_file), ToolCatalog())
+    store.load()
+    store.flush()
+    store.close()
+
+    catalog = ToolCatalog()
+    store = ShardedCatalogStore(str(tmp_path / "catalog"), str(json_file), catalog)
+    store.load()
+    return catalog, store
+
+
+def test_search_loads_only_matching_folders(qapp, tmp_path):
+    """递归搜索只加载包含匹配工具的文件夹，不加载整个目录"""
+    tools = make_folders(20, 3)
+    tools[4]["children"].append({"id": "sub", "type": "folder", "name": "子文件夹", "children": [
+        {"id": "deep", "type": "tool", "name": "深层工具", "url": ""}]})
+    catalog, store = open_sharded(tmp_path, tools)
+    try:
+        assert not catalog.loaded
+        index = ToolSearchIndex(catalog)
+        index.rebuild()
+        assert not catalog.loaded
+
+        assert [tool["id"] for tool in index.search("工具3-1", recursive=True)] == ["f3t1"]
+        assert set(catalog.loaded) == {"f3"}
+
+        assert [tool["id"] for tool in index.search("深层", recursive=True)] == ["deep"]
+        assert set(catalog.loaded) == {"f3", "f4", "sub"}
+
+        # 限定在文件夹中搜索时不加载其他文件夹
+        assert index.search("工具", catalog.get("f3"), recursive=True) == catalog.children_of(catalog.get("f3"))
+        assert set(catalog.loaded) == {"f3", "f4", "sub"}
+    finally:
+        store.close()
+
+
+def test_search_finds_tools_in_evicted_folders(qapp, tmp_path):
+    """文件夹内容卸载后仍能搜索到，搜索时重新加载"""
+    catalog, store = open_sharded(tmp_path, make_folders(5, 3))
+    catalog.MAX_LOADED_FOLDERS = 2
+    try:
+        index = ToolSearchIndex(catalog)
+        index.rebuild()
+        for folder in catalog.children_of():
+            catalog.children_of(folder)
+        assert "f0" in catalog.unloaded
+
+        assert [tool["id"] for tool in index.search("工具0-2", recursive=True)] == ["f0t2"]
+        assert len(index.search("工具", recursive=True)) == 15
+        # 删除的工具不再出现在结果中
+        for tool in catalog.remove(catalog.get("f0t2")):
+            index.remove(tool)
+        assert index.search("工具0-2", recursive=True) == []
+    finally:
+        store.close()
+
+
+def test_short_queries_use_postings():
+    """单字和双字查询通过倒排表查找，结果与逐个比较一致"""
+    catalog = ToolCatalog()
+    catalog.load(make_folders(10, 10))
+    index = ToolSearchIndex(catalog)
+    index.rebuild()
+    index.docs.append(("unindexed", "工具", None))
+    for query in ["工", "具9", "9-", "7", "文件夹", "无"]:
+        expected = {tool["id"] for tool in catalog.walk() if query in tool.search_key}
+        assert {tool_id for tool_id, _ in index.match(query)} == expected
+
+
+def test_search_during_incremental_build(qapp, tmp_path):
+    """索引分批建立期间搜索时逐个匹配剩余部分，不在搜索中建立完索引"""
+    tools = make_folders(30, 5)
+    tools[7]["children"].append({"id": "sub", "type": "folder", "name": "子文件夹", "children": [
+        {"id": "deep", "type": "tool", "name": "深层工具", "url": ""}]})
+    catalog, store = open_sharded(tmp_path, tools)
+    try:
+        index = ToolSearchIndex(catalog)
+        index.rebuild(incremental=True)
+        assert not index.build_step(40)
+        indexed = len(index.doc_ids)
+
+        assert index.search("不存在", recursive=True) == []
+        assert len(index.doc_ids) == indexed
+        assert [tool["id"] for tool in index.search("深层", recursive=True)] == ["deep"]
+        expected = sorted(f"f{i}t3" for i in range(30))
+        assert sorted(tool["id"] for tool in index.search("-3", recursive=True)) == expected
+        assert index.tail
+
+        # 剩余部分加入索引后结果不变
+        while not index.build_step(40):
+            pass
+        assert index.tail is None
+        assert len(index.doc_ids) == 30 * 6 + 2
+        assert sorted(tool["id"] for tool in index.search("-3", recursive=True)) == expected
+        assert [tool["id"] for tool in index.search("深层", recursive=True)] == ["deep"]
+    finally:
+        store.close()
+
+
+def test_recursive_search_paths(qapp):
+    """递归搜索包含所有子文件夹中的工具并给出文件夹路径，非递归只搜索当前文件夹"""
+    catalog = ToolCatalog()
+    catalog.load([
+        {"id": "top", "type": "tool", "name": "Chat顶层", "url": ""},
+        {"id": "a", "type": "folder", "name": "A", "children": [
+            {"id": "a1", "type": "tool", "name": "chat助手", "url": ""},
+            {"id": "b", "type": "folder", "name": "B", "children": [
+                {"id": "b1", "type": "tool", "name": "绘图", "description": "支持CHAT", "url": ""}]}]},
+    ])
+    index = ToolSearchIndex(catalog)
+    index.rebuild()
+
+    results = index.search("CHAT", recursive=True)
+    assert sorted(tool["id"] for tool in results) == ["a1", "b1", "top"]
+    paths = index.search_paths(results)
+    assert paths == {"a1": "A", "b1": "A / B"}
+    assert [tool["id"] for tool in index.search("chat")] == ["top"]
+
+    folder = catalog.get("a")
+    results = index.search("chat", folder, recursive=True)
+    assert sorted(tool["id"] for tool in results) == ["a1", "b1"]
+    assert index.search_paths(results, folder) == {"b1": "B"}
+    assert [tool["id"] for tool in index.search("chat", folder)] == ["a1"]
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+import ai_tool_manager
+from ai_tool_manager import AIToolManager
+
+from test_catalog_stores import make_folders
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_heavy_modules_not_imported_at_startup(tmp_path):
+    """导入主模块时不导入requests、QtSvg和webbrowser，用到时才导入"""
+    env = dict(os.environ, HOME=str(tmp_path), APPDATA=str(tmp_path), QT_QPA_PLATFORM="offscreen")
+    code = "import sys, ai_tool_manager; print([name for name in ('requests', 'PyQt5.QtSvg', 'webbrowser') if name in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_window_shows_before_catalog_loads(qapp, home, monkeypatch):
+    """窗口先显示占位工具项，第一次绘制后才加载工具目录，之后分批建立搜索索引"""
+    monkeypatch.setenv("BINGZ_CATALOG_BACKEND", "json")
+    data_dir = ai_tool_manager.get_user_data_dir()
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "ai_tools.json"), "w", encoding="utf-8") as f:
+        json.dump(make_folders(3, 3), f, ensure_ascii=False)
+    loads = []
+    original = AIToolManager.load_tools
+    monkeypatch.setattr(AIToolManager, "load_tools", lambda self: loads.append(True) or original(self))
+
+    window = AIToolManager()
+    try:
+        assert window.tool_model.rowCount() == 12 and window.tool_model.tool_at(0) is None
+        assert not window.search_input.isEnabled() and not window.add_button.isEnabled()
+        assert not loads
+
+        window.show()
+        deadline = time.time() + 5
+        while "index_ready_ms" not in window.startup_times and time.time() < deadline:
+            QApplication.processEvents()
+        assert loads == [True]
+        assert window.tool_model.rowCount() == 3
+        assert window.search_input.isEnabled() and window.add_button.isEnabled()
+        times = window.startup_times
+        assert times["first_paint_ms"] <= times["interactive_ms"] <= times["index_ready_ms"]
+        assert not window.index_timer.isActive()
+    finally:
+        window.index_timer.stop()
+        window.store.close()
+        window.close()
+        window.deleteLater()
@@ -0,0 +1,44 @@
+import os
+
+from ai_tool_manager import ThumbnailCache, rasterize_svg, svg_renderers
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><rect width="10" height="10" fill="{color}"/></svg>'
+
+
+def write_svg(path, color):
+    path.write_text(SVG.format(color=color), encoding="utf-8")
+    return str(path)
+
+
+def test_svg_parsed_once_per_file_version(qapp, tmp_path):
+    """同一SVG文件只解析一次，按需要的像素尺寸栅格化；文件修改后重新解析"""
+    svg_renderers.clear()
+    icon_path = write_svg(tmp_path / "icon.svg", "#ff0000")
+    small = rasterize_svg(icon_path, 50)
+    large = rasterize_svg(icon_path, 100)
+    assert (small.width(), large.width()) == (50, 100)
+    assert small.pixelColor(25, 25).name() == "#ff0000"
+    assert len(svg_renderers) == 1
+
+    write_svg(tmp_path / "icon.svg", "#0000ff")
+    stat = os.stat(icon_path)
+    os.utime(icon_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert rasterize_svg(icon_path, 50).pixelColor(25, 25).name() == "#0000ff"
+    assert len(svg_renderers) == 2
+
+    (tmp_path / "broken.svg").write_text("<svg", encoding="utf-8")
+    assert rasterize_svg(str(tmp_path / "broken.svg"), 50) is None
+    assert rasterize_svg(str(tmp_path / "missing.svg"), 50) is None
+
+
+def test_svg_thumbnails_rendered_at_pixel_size(qapp, tmp_path):
+    """SVG缩略图按实际像素尺寸栅格化，同时生成所有规格"""
+    icon_path = write_svg(tmp_path / "icon.svg", "#00ff00")
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    image = cache.load(icon_path, 50, True, 2.0)
+    assert (image.width(), image.devicePixelRatio()) == (100, 2.0)
+    assert image.pixelColor(50, 50).name() == "#00ff00"
+    content_hash = cache.content_hash(icon_path)
+    for size, rounded in ThumbnailCache.VARIANTS:
+        assert os.path.exists(cache.thumbnail_path(content_hash, size, rounded, 2.0))
+    cache.flush()
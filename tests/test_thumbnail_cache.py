@@ -0,0 +1,30 @@
+import json
+
+from ai_tool_manager import ThumbnailCache
+
+
+def test_content_hash_batches_index_writes(tmp_path, monkeypatch):
+    """新图标的哈希合并为一次索引写入，保存后新的缓存实例直接使用索引"""
+    icons = []
+    for i in range(200):
+        icon = tmp_path / f"icon{i}.png"
+        icon.write_bytes(b"icon %d" % i)
+        icons.append(str(icon))
+
+    cache = ThumbnailCache(str(tmp_path / "thumbs"))
+    cache.SAVE_DELAY = 60
+    writes = []
+    save_index = cache.save_index
+    monkeypatch.setattr(cache, "save_index", lambda index: (writes.append(len(index)), save_index(index)))
+    hashes = [cache.content_hash(icon) for icon in icons]
+    assert writes == []
+
+    cache.flush()
+    assert writes == [200]
+    cache.flush()
+    assert writes == [200]
+    assert len(json.loads((tmp_path / "thumbs" / "index.json").read_text(encoding="utf-8"))) == 200
+
+    reopened = ThumbnailCache(str(tmp_path / "thumbs"))
+    monkeypatch.setattr("hashlib.sha1", None)
+    assert [reopened.content_hash(icon) for icon in icons] == hashes
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+import ai_tool_manager
+from ai_tool_manager import AIToolManager, ToolGridView, ToolListModel
+
+from test_catalog_stores import make_folders
+
+
+@pytest.fixture
+def window(qapp, home, monkeypatch):
+    """加载了3个文件夹（每个3个工具）的主窗口，确认和选择文件的对话框直接返回"""
+    monkeypatch.setenv("BINGZ_CATALOG_BACKEND", "json")
+    monkeypatch.setattr(QMessageBox, "question", lambda *args: QMessageBox.Yes)
+    monkeypatch.setattr(QMessageBox, "information", lambda *args: None)
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", lambda *args: ("icon.png", ""))
+    data_dir = ai_tool_manager.get_user_data_dir()
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "ai_tools.json"), "w", encoding="utf-8") as f:
+        json.dump(make_folders(3, 3), f, ensure_ascii=False)
+    window = AIToolManager()
+    window.load_tools()
+    yield window
+    window.index_timer.stop()
+    window.store.close()
+    window.deleteLater()
+
+
+def shown_ids(model):
+    return [model.tool_at(row)["id"] for row in range(model.rowCount())]
+
+
+def test_delete_search_result_keeps_search(window):
+    """删除子文件夹中的搜索结果后仍显示搜索结果，重复删除同一工具不会出错"""
+    window.search_input.setText("工具1-")
+    assert shown_ids(window.tool_model) == ["f1t0", "f1t1", "f1t2"]
+    tool = window.tool_model.tool_at(1)
+    window.delete_tool(tool)
+    assert shown_ids(window.tool_model) == ["f1t0", "f1t2"]
+    window.delete_tool(tool)
+    window.change_tool_icon(tool)
+    assert window.catalog.get("f1t1") is None
+
+
+def test_delete_from_folder_window_refreshes_it(window, monkeypatch):
+    """在文件夹窗口中删除工具后，文件夹窗口不再显示该工具"""
+    shown = []
+
+    def delete_in_dialog():
+        dialog = QApplication.activeModalWidget()
+        model = dialog.findChild(ToolGridView).model()
+        window.delete_tool(model.tool_at(0))
+        shown.append(shown_ids(model))
+        dialog.close()
+
+    QTimer.singleShot(0, delete_in_dialog)
+    window.open_toolkit(window.catalog.get("f2"))
+    assert shown == [["f2t1", "f2t2"]]
+    assert window.toolkit_refreshers == []
+
+
+def test_search_shows_folder_paths(window):
+    """主搜索框搜索所有子文件夹，结果显示所在的文件夹路径；清空后回到顶层"""
+    model = window.tool_model
+    window.search_input.setText("工具2-1")
+    assert shown_ids(model) == ["f2t1"]
+    index = model.index(0)
+    assert model.data(index, ToolListModel.PathRole) == "文件夹2"
+    assert model.data(index, Qt.ToolTipRole) == "文件夹2 / 工具2-1"
+
+    window.search_input.setText("")
+    assert shown_ids(model) == ["f0", "f1", "f2"]
+    assert model.data(model.index(0), ToolListModel.PathRole) is None
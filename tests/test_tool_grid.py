@@ -0,0 +1,80 @@
+from PyQt5.QtTest import QAbstractItemModelTester
+
+from ai_tool_manager import IconLoader, Tool, ToolListModel
+
+
+class FakePool:
+    """记录提交的任务，任务都没有开始运行，可以取消"""
+    def __init__(self):
+        self.queued = []
+
+    def start(self, task):
+        self.queued.append(task)
+
+    def tryTake(self, task):
+        self.queued.remove(task)
+        return True
+
+
+def make_tool(tool_id, name=None):
+    return Tool.from_dict({"id": tool_id, "type": "tool", "name": name or tool_id, "url": "", "icon_path": f"{tool_id}.png"})
+
+
+def model_ids(model):
+    return [model.tool_at(row)["id"] for row in range(model.rowCount())]
+
+
+def test_refresh_updates_only_changed_rows(qapp):
+    """对比刷新只增删、移动和重绘有变化的工具项，变化过多时整体重置"""
+    model = ToolListModel()
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    signals = []
+    model.modelReset.connect(lambda: signals.append("reset"))
+    model.dataChanged.connect(lambda top, bottom: signals.append(("changed", top.row())))
+
+    model.set_skeleton(8)
+    assert model.rowCount() == 8 and model.tool_at(0) is None
+    tools = [make_tool(f"t{i}") for i in range(10)]
+    model.set_tools(tools)
+    assert model.last_refresh_stats["mode"] == "reset"
+    assert model_ids(model) == [f"t{i}" for i in range(10)]
+
+    signals.clear()
+    # 删除t3，在开头插入n，t5改名，t9移到t0前面
+    new_tools = [make_tool("n"), tools[9], tools[0], tools[1], tools[2], tools[4], make_tool("t5", "新名称"), tools[6], tools[7], tools[8]]
+    model.set_tools(new_tools)
+    stats = model.last_refresh_stats
+    assert stats["mode"] == "diff"
+    assert (stats["removed"], stats["inserted"], stats["moved"], stats["updated"]) == (1, 1, 1, 1)
+    assert model_ids(model) == [tool["id"] for tool in new_tools]
+    assert model.data(model.index(6)) == "新名称"
+    assert signals == [("changed", 6)]
+
+    # 倒序后每个工具项都要移动
+    many = [make_tool(f"m{i}") for i in range(ToolListModel.MAX_DIFF_OPERATIONS + 2)]
+    model.set_tools(many)
+    model.set_tools(many[::-1])
+    assert model.last_refresh_stats["mode"] == "reset"
+    assert model_ids(model) == [tool["id"] for tool in many[::-1]]
+
+
+def test_refresh_cancels_only_icons_of_removed_rows(qapp):
+    """对比刷新只取消已移除工具项的图标解码，保留仍显示的工具项的请求"""
+    loader = IconLoader()
+    loader.pool = FakePool()
+    model = ToolListModel()
+    model.tools_about_to_change.connect(loader.cancel_pending)
+    a, b, c, d = (make_tool(tool_id) for tool_id in "abcd")
+    model.set_tools([a, b])
+    for tool in (a, b):
+        loader.request((tool["icon_path"], 0, 50, True, 1.0), tool["id"])
+    # 多个工具项使用同一图标时，只要有一个仍显示就保留
+    loader.request(("b.png", 0, 50, True, 1.0), "c")
+
+    model.set_tools([a, c])
+    assert model.last_refresh_stats["mode"] == "diff"
+    assert set(loader.tasks) == {("a.png", 0, 50, True, 1.0), ("b.png", 0, 50, True, 1.0)}
+
+    model.set_tools([d])
+    assert set(loader.tasks) == set()
+    assert loader.pool.queued == [] and loader.owners == {}
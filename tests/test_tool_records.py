@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from ai_tool_manager import BinaryCatalog, BinaryCatalogStore, Folder, Tool, ToolCatalog, write_binary_catalog
+
+TOOLS = [
+    {"id": "a", "type": "tool", "name": "ChatGPT", "description": "对话", "features": "聊天", "url": "https://chat.openai.com",
+     "icon_path": "./icon/ChatGPT.jpg", "pinned": True, "tags": ["对话", "写作"]},
+    {"id": "f", "type": "folder", "name": "绘图", "icon_path": "", "children": [
+        {"id": "b", "type": "tool", "name": "Midjourney", "url": "", "description": None},
+        {"id": "g", "type": "folder", "name": "空文件夹", "children": []}]},
+]
+
+
+def test_record_dict_protocol():
+    """工具记录兼容字典的读写，未知字段保存在额外字段中，修改类型时切换工具和文件夹"""
+    tool = Tool.from_dict(dict(TOOLS[0]))
+    assert type(tool) is Tool and not tool.is_folder
+    assert not hasattr(tool, "__dict__")
+    assert tool["name"] == "ChatGPT" and tool.get("tags") == ["对话", "写作"]
+    assert "pinned" in tool and "children" not in tool and tool.get("missing", 1) == 1
+    assert tool.to_dict() == TOOLS[0]
+    with pytest.raises(KeyError):
+        tool["missing"]
+
+    assert "chatgpt" in tool.search_key
+    tool["name"] = "Claude"
+    assert "claude" in tool.search_key and "chatgpt" not in tool.search_key
+    assert tool.pop("pinned") is True and "pinned" not in tool
+    del tool["description"]
+    assert "description" not in tool and "对话" not in tool.search_key
+
+    tool["type"] = "folder"
+    assert type(tool) is Folder and tool.is_folder
+    tool.update({"type": "tool", "features": "聊天"})
+    assert type(tool) is Tool
+    # 重复较多的字段驻留后共享同一个字符串对象
+    assert tool["features"] is Tool.from_dict({"features": "".join(["聊", "天"])})["features"]
+
+
+def test_binary_catalog_round_trip(tmp_path):
+    """工具目录写入二进制格式再读出后与原列表相同（包括额外字段和非字符串的值）"""
+    file_path = str(tmp_path / "ai_tools.bzc")
+    write_binary_catalog(file_path, TOOLS, (123, 456))
+    binary = BinaryCatalog(file_path)
+    try:
+        assert binary.stamp == (123, 456)
+        assert (binary.record_count, binary.root_count) == (4, 2)
+        assert binary.to_json() == TOOLS
+    finally:
+        binary.close()
+
+    with open(file_path, "r+b") as f:
+        f.write(b"XXXX")
+    with pytest.raises(ValueError):
+        BinaryCatalog(file_path)
+
+
+def test_binary_store_reloads_after_json_changed(qapp, tmp_path):
+    """ai_tools.json在程序外被修改后，不使用过期的二进制文件，从JSON重新加载并重新生成"""
+    json_file = tmp_path / "ai_tools.json"
+    json_file.write_text(json.dumps(TOOLS, ensure_ascii=False), encoding="utf-8")
+    store = BinaryCatalogStore(str(json_file), ToolCatalog())
+    store.load()
+    store.close()
+    binary_file = tmp_path / "ai_tools.bzc"
+    assert binary_file.exists()
+
+    catalog = ToolCatalog()
+    store = BinaryCatalogStore(str(json_file), catalog)
+    store.load()
+    try:
+        assert store.binary is not None and catalog.unloaded == {"f"}
+        catalog.load_all()
+        assert catalog.to_json() == TOOLS
+    finally:
+        store.close()
+
+    edited = TOOLS[:1] + [{"id": "c", "type": "tool", "name": "新工具", "url": ""}]
+    json_file.write_text(json.dumps(edited, ensure_ascii=False), encoding="utf-8")
+    catalog = ToolCatalog()
+    store = BinaryCatalogStore(str(json_file), catalog)
+    store.load()
+    try:
+        assert catalog.to_json() == edited
+    finally:
+        store.close()
+    stat = os.stat(json_file)
+    binary = BinaryCatalog(str(binary_file))
+    try:
+        assert binary.stamp == (stat.st_mtime_ns, stat.st_size)
+        assert binary.to_json() == edited
+    finally:
+        binary.close()
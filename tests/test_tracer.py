@@ -0,0 +1,66 @@
+import json
+import threading
+
+import ai_tool_manager
+from ai_tool_manager import NULL_SPAN, Tracer, configure_tracing, traced
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("search") as span:
+        pass
+    assert span is NULL_SPAN and not tracer.events
+
+
+def test_chrome_trace_export(tmp_path):
+    """导出的Chrome trace包含各线程的名称和每个区间的开始时间、耗时和参数"""
+    tracer = Tracer(max_events=3)
+    tracer.enable(str(tmp_path / "trace.json"))
+    with tracer.span("search", text="chat"):
+        pass
+
+    def decode():
+        with tracer.span("decode icon"):
+            pass
+
+    worker = threading.Thread(target=decode, name="icon-worker")
+    worker.start()
+    worker.join()
+    tracer.export()
+
+    trace = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    events = trace["traceEvents"]
+    names = {event["tid"]: event["args"]["name"] for event in events if event["ph"] == "M"}
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert set(spans) == {"search", "decode icon"}
+    assert names[spans["decode icon"]["tid"]] == "icon-worker"
+    assert names[spans["search"]["tid"]] == threading.current_thread().name
+    assert spans["search"]["args"] == {"text": "chat"} and "args" not in spans["decode icon"]
+    assert all(span["ts"] >= 0 and span["dur"] >= 0 for span in spans.values())
+    assert len(tracer.recent["search"]) == 1
+
+    # 只保留最近的max_events个区间
+    for _ in range(5):
+        tracer.record("paint", 0, 0)
+    assert [event[0] for event in tracer.events] == ["paint"] * 3
+
+
+def test_configure_tracing(tmp_path, monkeypatch):
+    """--trace=文件和--trace-overlay开启跟踪并从命令行参数中去掉，traced装饰的函数开始记录"""
+    monkeypatch.delenv("BINGZ_TRACE", raising=False)
+    monkeypatch.delenv("BINGZ_TRACE_OVERLAY", raising=False)
+    monkeypatch.setattr(ai_tool_manager, "tracer", Tracer())
+    assert configure_tracing(["app"]) == ["app"]
+    assert not ai_tool_manager.tracer.enabled
+
+    output = str(tmp_path / "out.json")
+    assert configure_tracing(["app", f"--trace={output}", "--trace-overlay", "-x"]) == ["app", "-x"]
+    tracer = ai_tool_manager.tracer
+    assert tracer.enabled and tracer.overlay and tracer.output == output
+
+    @traced("work")
+    def work(value):
+        return value * 2
+
+    assert work(21) == 42
+    assert [event[0] for event in tracer.events] == ["work"]
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+
+from PyQt5.QtCore import Qt
+
+from ai_tool_manager import UpdateDownloader, network
+from benchmark import serve_directory
+
+
+def record_signals(downloader):
+    """记录下载线程发出的结束信号"""
+    events = []
+    downloader.downloaded.connect(lambda path, digest: events.append(("downloaded", digest)), Qt.DirectConnection)
+    downloader.error.connect(lambda message: events.append(("error", message)), Qt.DirectConnection)
+    downloader.cancelled.connect(lambda: events.append(("cancelled",)), Qt.DirectConnection)
+    return events
+
+
+def downloaded_bytes():
+    return sum(metric["bytes"] for metric in network.metrics)
+
+
+def test_download_resumes_partial_file(qapp, tmp_path):
+    """单连接下载从.part文件的末尾继续，只请求剩余部分"""
+    serve_dir = tmp_path / "release"
+    serve_dir.mkdir()
+    content = os.urandom(1024 * 1024)
+    (serve_dir / "update.bin").write_bytes(content)
+    save_path = tmp_path / "update.bin"
+    (tmp_path / "update.bin.part").write_bytes(content[:300 * 1024])
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    with serve_directory(str(serve_dir)) as base_url:
+        network.metrics.clear()
+        downloader = UpdateDownloader(base_url + "update.bin", str(save_path), sha256, segment_count=1)
+        events = record_signals(downloader)
+        downloader.run()
+
+    assert events == [("downloaded", sha256)]
+    assert save_path.read_bytes() == content
+    assert downloaded_bytes() == len(content) - 300 * 1024
+
+
+def test_cancelled_segmented_download_resumes(qapp, tmp_path):
+    """取消分段下载后保留.part和进度文件，再次下载时只请求未完成的部分"""
+    serve_dir = tmp_path / "release"
+    serve_dir.mkdir()
+    content = os.urandom(2 * 1024 * 1024)
+    (serve_dir / "update.bin").write_bytes(content)
+    save_path = tmp_path / "update.bin"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    def create_downloader(url):
+        downloader = UpdateDownloader(url, str(save_path), sha256)
+        downloader.MIN_SEGMENT_SIZE = 256 * 1024
+        return downloader
+
+    # 每个连接限速2MB/s，开始接收数据后取消
+    with serve_directory(str(serve_dir), rate=2 * 1024 * 1024) as base_url:
+        downloader = create_downloader(base_url + "update.bin")
+        events = record_signals(downloader)
+        downloader.start()
+        deadline = time.time() + 10
+        while downloader.segment_bytes == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        downloader.cancel()
+        assert downloader.wait(10000)
+        assert events == [("cancelled",)]
+        assert os.path.exists(downloader.part_path)
+        assert os.path.exists(downloader.state_path)
+        state = json.loads(open(downloader.state_path, encoding="utf-8").read())
+        assert len(state["segments"]) == 4
+        remaining = sum(end - pos + 1 for pos, end in state["segments"])
+        assert 0 < remaining < len(content)
+
+        network.metrics.clear()
+        downloader = create_downloader(base_url + "update.bin")
+        events = record_signals(downloader)
+        downloader.run()
+
+    assert events == [("downloaded", sha256)]
+    assert save_path.read_bytes() == content
+    assert not os.path.exists(downloader.state_path)
+    assert downloaded_bytes() == remaining
+
+
+def test_stale_partial_file_restarts(qapp, tmp_path):
+    """服务器对.part的长度返回416且与预期大小不一致时，删除.part从头下载"""
+    serve_dir = tmp_path / "release"
+    serve_dir.mkdir()
+    content = os.urandom(100 * 1024)
+    (serve_dir / "update.bin").write_bytes(content)
+    save_path = tmp_path / "update.bin"
+    # 旧版本留下的.part比服务器上的新文件还长
+    (tmp_path / "update.bin.part").write_bytes(os.urandom(150 * 1024))
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    with serve_directory(str(serve_dir)) as base_url:
+        downloader = UpdateDownloader(base_url + "update.bin", str(save_path), sha256, 200 * 1024, segment_count=1)
+        events = record_signals(downloader)
+        downloader.run()
+
+    assert events == [("downloaded", sha256)]
+    assert save_path.read_bytes() == content
+
+
+def test_split_covers_file():
+    """分段首尾相接覆盖整个文件，每段不小于最小分段大小"""
+    downloader = UpdateDownloader("http://example.com/update.bin", "update.bin")
+    downloader.MIN_SEGMENT_SIZE = 100
+    assert downloader.split(1000) == [[0, 249], [250, 499], [500, 749], [750, 999]]
+    assert downloader.split(350) == [[0, 116], [117, 233], [234, 349]]
+    assert downloader.split(150) == [[0, 149]]
+
+
+def test_segmented_and_single_connection_downloads(qapp, tmp_path):
+    """支持Range时分段并发下载，不支持时单连接下载；内容与SHA-256校验一致，校验失败时删除文件"""
+    serve_dir = tmp_path / "release"
+    serve_dir.mkdir()
+    content = os.urandom(1024 * 1024 + 123)
+    (serve_dir / "update.bin").write_bytes(content)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    for ranges in (True, False):
+        save_path = tmp_path / f"update-{ranges}.bin"
+        with serve_directory(str(serve_dir), ranges=ranges) as base_url:
+            network.metrics.clear()
+            downloader = UpdateDownloader(base_url + "update.bin", str(save_path), sha256, len(content))
+            downloader.MIN_SEGMENT_SIZE = 256 * 1024
+            events = record_signals(downloader)
+            downloader.run()
+        assert events == [("downloaded", sha256)]
+        assert save_path.read_bytes() == content
+        assert not os.path.exists(downloader.state_path)
+        # 分段下载时一次探测请求加4段，不支持Range时只有一次请求
+        assert len(network.metrics) == (5 if ranges else 1)
+
+    save_path = tmp_path / "bad.bin"
+    with serve_directory(str(serve_dir)) as base_url:
+        downloader = UpdateDownloader(base_url + "update.bin", str(save_path), "0" * 64, segment_count=1)
+        events = record_signals(downloader)
+        downloader.run()
+    assert events == [("error", "下载失败: 文件校验失败（SHA-256不一致）")]
+    assert not save_path.exists() and not os.path.exists(downloader.part_path)
+
+
+def test_copy_from_local_directory(qapp, tmp_path):
+    """file:地址直接复制文件"""
+    source = tmp_path / "update.bin"
+    content = os.urandom(300 * 1024)
+    source.write_bytes(content)
+    save_path = tmp_path / "downloads" / "update.bin"
+    save_path.parent.mkdir()
+    downloader = UpdateDownloader(source.as_uri(), str(save_path), hashlib.sha256(content).hexdigest())
+    events = record_signals(downloader)
+    downloader.run()
+    assert events == [("downloaded", hashlib.sha256(content).hexdigest())]
+    assert save_path.read_bytes() == content
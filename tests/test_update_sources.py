@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+import ai_tool_manager
+from ai_tool_manager import (
+    DirectorySource, Ed25519, GitHubSource, MirrorSource, UpdateChecker,
+    create_update_sources, manifest_payload, verify_manifest,
+)
+
+SEED = bytes(range(32))
+PUBLIC_KEY = Ed25519.public_key(SEED).hex()
+MANIFEST = {"version": "1.2", "notes": "", "assets": [
+    {"platform": "linux", "name": "BingZ-linux.tar.gz", "size": 3, "sha256": "ab" * 32}]}
+
+
+def signed(manifest, seed=SEED):
+    return dict(manifest, signature=Ed25519.sign(seed, manifest_payload(manifest)).hex())
+
+
+def test_ed25519_rfc8032_vector():
+    """RFC 8032第7.1节的测试向量1"""
+    seed = bytes.fromhex("9d61b19deffd5a60ba844af492ec2cc44449c5697b326919703bac031cae7f60")
+    public_key = Ed25519.public_key(seed)
+    assert public_key.hex() == "d75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a"
+    signature = Ed25519.sign(seed, b"")
+    assert signature.hex() == (
+        "e5564300c360ac729086e2cc806e828a84877f1eb8e5d974d873e06522490155"
+        "5fb8821590a33bacc61e39701cf9b46bd25bf5f0595bbe24655141438e7a100b")
+    assert Ed25519.verify(public_key, b"", signature)
+    assert not Ed25519.verify(public_key, b"x", signature)
+
+
+def test_create_update_sources(monkeypatch, tmp_path):
+    """BINGZ_UPDATE_SOURCES按逗号分隔解析为GitHub、镜像和目录更新源，为空时只使用GitHub"""
+    monkeypatch.setenv("BINGZ_UPDATE_SOURCES", f" GitHub , https://mirror.example.com/bingz, ,{tmp_path}")
+    github, mirror, directory = create_update_sources("owner", "repo")
+    assert isinstance(github, GitHubSource)
+    assert github.url == "https://api.github.com/repos/owner/repo/releases/latest"
+    assert isinstance(mirror, MirrorSource)
+    assert mirror.url == "https://mirror.example.com/bingz/version.json"
+    assert isinstance(directory, DirectorySource)
+    assert directory.url == (tmp_path / "version.json").as_uri()
+
+    monkeypatch.setenv("BINGZ_UPDATE_SOURCES", " , ")
+    assert [type(source) for source in create_update_sources("owner", "repo")] == [GitHubSource]
+    monkeypatch.delenv("BINGZ_UPDATE_SOURCES")
+    assert [type(source) for source in create_update_sources("owner", "repo")] == [GitHubSource]
+
+
+def test_http_mirror_requires_opt_in(monkeypatch):
+    """不加密的http镜像默认不访问，设置BINGZ_ALLOW_HTTP_MIRRORS=1或配置签名公钥后才使用"""
+    monkeypatch.delenv("BINGZ_ALLOW_HTTP_MIRRORS", raising=False)
+    monkeypatch.setattr(ai_tool_manager, "UPDATE_PUBLIC_KEY", "")
+    requests = []
+    monkeypatch.setattr(ai_tool_manager, "fetch_json_conditional", lambda url, cache: requests.append(url) or MANIFEST)
+    mirror = MirrorSource("http://192.168.1.2/bingz/")
+    with pytest.raises(IOError, match="http"):
+        mirror.fetch({})
+    assert requests == []
+    assert MirrorSource("https://mirror.example.com").fetch({}) == MANIFEST
+
+    monkeypatch.setenv("BINGZ_ALLOW_HTTP_MIRRORS", "1")
+    assert mirror.fetch({}) == MANIFEST
+    monkeypatch.delenv("BINGZ_ALLOW_HTTP_MIRRORS")
+    monkeypatch.setattr(ai_tool_manager, "UPDATE_PUBLIC_KEY", PUBLIC_KEY)
+    assert mirror.fetch({}) == MANIFEST
+
+
+def test_manifest_signature(monkeypatch):
+    """配置公钥后只接受签名有效、每个资产都有SHA-256的更新清单"""
+    verify_manifest(MANIFEST, "")
+    verify_manifest(signed(MANIFEST), PUBLIC_KEY)
+    with pytest.raises(ValueError, match="签名"):
+        verify_manifest(MANIFEST, PUBLIC_KEY)
+    with pytest.raises(ValueError, match="签名"):
+        verify_manifest(signed(MANIFEST, bytes(32)), PUBLIC_KEY)
+    tampered = signed(MANIFEST)
+    tampered["assets"] = [dict(MANIFEST["assets"][0], sha256="cd" * 32)]
+    with pytest.raises(ValueError, match="签名"):
+        verify_manifest(tampered, PUBLIC_KEY)
+    with pytest.raises(ValueError, match="SHA-256"):
+        verify_manifest(signed({"version": "1.2", "assets": [{"name": "a-linux"}]}), PUBLIC_KEY)
+
+    monkeypatch.setattr(ai_tool_manager, "UPDATE_PUBLIC_KEY", PUBLIC_KEY)
+    mirror = MirrorSource("https://mirror.example.com/")
+    release = mirror.to_release(signed(MANIFEST))
+    assert release["assets"][0]["digest"] == "sha256:" + "ab" * 32
+    with pytest.raises(ValueError):
+        mirror.to_release(MANIFEST)
+
+
+class FakeSource:
+    """延迟delay秒后返回版本号version，error不为None时抛出该错误"""
+    cacheable = False
+
+    def __init__(self, name, delay, version="1.2", error=None):
+        self.name = name
+        self.url = f"fake://{name}"
+        self.delay = delay
+        self.version = version
+        self.error = error
+
+    def fetch(self, cache):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        cache["data"] = {"tag_name": self.version, "body": "", "assets": []}
+        return cache["data"]
+
+    def to_release(self, data):
+        return data
+
+
+def test_fetch_fastest_uses_first_successful_source(qapp, home):
+    """使用最先成功响应的更新源，失败的更新源不影响结果"""
+    slow = FakeSource("slow", 0.3, "1.3")
+    fast = FakeSource("fast", 0.0, "1.2")
+    release, source = UpdateChecker("1.1", "owner", "repo", sources=[slow, fast]).fetch_fastest()
+    assert source is fast and release["tag_name"] == "1.2"
+
+    failing = FakeSource("failing", 0.0, error=IOError("down"))
+    slower = FakeSource("slower", 0.1, "1.4")
+    release, source = UpdateChecker("1.1", "owner", "repo", sources=[failing, slower]).fetch_fastest()
+    assert source is slower and release["tag_name"] == "1.4"
+
+
+def test_fetch_fastest_raises_first_source_error(qapp, home):
+    """全部更新源都失败时抛出第一个更新源的错误"""
+    sources = [FakeSource("first", 0.1, error=IOError("first down")), FakeSource("second", 0.0, error=IOError("second down"))]
+    with pytest.raises(IOError, match="first down"):
+        UpdateChecker("1.1", "owner", "repo", sources=sources).fetch_fastest()
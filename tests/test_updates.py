@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from PyQt5.QtWidgets import QMessageBox
+
+from ai_tool_manager import GitHubSource, UpdateChecker, UpdateDialog, network
+
+RELEASE = {"tag_name": "v1.2", "body": "", "assets": [{"name": "BingZ-linux.tar.gz", "browser_download_url": "", "size": 1}]}
+
+
+class ReleaseApiHandler(BaseHTTPRequestHandler):
+    """模拟GitHub最新版本接口：带ETag，内容未变化时返回304，status为503时模拟服务不可用"""
+    status = 200
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers))
+        if self.status != 200:
+            self.send_response(self.status)
+            self.send_header("Retry-After", "120")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1.2"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(RELEASE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"v1.2"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def serve_release_api():
+    """在后台线程中启动模拟的版本接口，返回处理类（用于修改状态和查看请求）和接口地址"""
+    handler = type("Handler", (ReleaseApiHandler,), {"status": 200, "requests": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield handler, f"http://127.0.0.1:{server.server_port}/repos/owner/repo/releases/latest"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(network, "RETRY_DELAY", 0)
+
+
+def test_release_cache_revalidation_and_back_off(qapp, home, no_retry_delay, capsys):
+    """缓存未过期时不访问网络，过期后条件请求得到304，503后退避期间使用缓存"""
+    with serve_release_api() as (api, url):
+        source = GitHubSource("owner", "repo")
+        source.url = url
+        checker = UpdateChecker("1.1", "owner", "repo", sources=[source])
+
+        assert checker.fetch_release(source) == RELEASE
+        assert len(api.requests) == 1
+        # 缓存未过期
+        assert checker.fetch_release(source) == RELEASE
+        assert len(api.requests) == 1
+
+        # 缓存过期后带ETag重新验证
+        checker.CACHE_TTL = 0
+        assert checker.fetch_release(source) == RELEASE
+        assert len(api.requests) == 2
+        assert api.requests[-1].get("If-None-Match") == '"v1.2"'
+
+        # 服务不可用：重试后记录退避时间（不少于Retry-After），使用缓存的结果
+        api.status = 503
+        assert checker.fetch_release(source) == RELEASE
+        assert len(api.requests) == 3 + network.RETRIES
+        cache = checker.load_cache(source)
+        assert cache["failures"] == 1
+        assert cache["retry_at"] >= time.time() + 100
+        # 退避期间不访问网络
+        assert checker.fetch_release(source) == RELEASE
+        assert len(api.requests) == 3 + network.RETRIES
+
+        # 没有缓存时失败，退避期间直接报错
+        checker.cache_dir = str(home / "other_cache")
+        with pytest.raises(Exception):
+            checker.fetch_release(source)
+        requests = len(api.requests)
+        with pytest.raises(IOError, match="暂时不可用"):
+            checker.fetch_release(source)
+        assert len(api.requests) == requests
+
+    # 缓存目录无法写入时静默忽略
+    checker.cache_dir = str(home / "blocked")
+    (home / "blocked").write_text("")
+    checker.save_cache(source, {"url": source.url})
+    assert capsys.readouterr().out == ""
+
+
+def test_closing_dialog_mid_download_asks_first(qapp, monkeypatch):
+    """下载中关闭更新对话框时先确认，选择否则继续下载"""
+    monkeypatch.setattr(UpdateDialog, "check_for_updates", lambda self: None)
+    answers = []
+    monkeypatch.setattr(QMessageBox, "question", lambda *args: answers.pop(0))
+    dialog = UpdateDialog()
+    dialog.show()
+    dialog.downloading = True
+
+    answers.append(QMessageBox.No)
+    dialog.reject()
+    assert dialog.isVisible() and dialog.downloading
+
+    answers.append(QMessageBox.Yes)
+    dialog.reject()
+    assert not dialog.isVisible() and not dialog.downloading
+
+    # 没有在下载时直接关闭
+    dialog.show()
+    dialog.reject()
+    assert not dialog.isVisible() and answers == []